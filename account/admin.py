@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, UserProfile
+from .models import OutboxEmail, User, UserProfile
 
 
 @admin.register(User)
@@ -14,3 +14,10 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ["user"]
     search_fields = ["user__first_name", "user__last_name"]
     list_filter = ["user__created_at"]
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ["subject", "status", "attempts", "created_at", "sent_at"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["subject", "to"]
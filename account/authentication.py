@@ -0,0 +1,204 @@
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from common.cache import LRUCache
+
+User = get_user_model()
+
+USER_CACHE = {
+    "LOCAL_MAX_SIZE": 1024,
+    "LOCAL_TTL": 5,
+    "SHARED_TTL": 300,
+    "CACHE_ALIAS": "default",
+    **getattr(settings, "AUTH_USER_CACHE", {}),
+}
+
+# The only columns cached: what authentication and permission checks read.
+# Others, the password hash included, are loaded from the database when
+# accessed.
+CACHED_USER_FIELDS = frozenset({"email", "first_name", "last_name", "is_active", "is_staff", "is_superuser", "is_verified"})
+
+# Per-process cache in front of the shared one. Other processes can't clear
+# it on invalidation, so its short TTL bounds how stale a user can get there.
+local_user_cache = LRUCache(USER_CACHE["LOCAL_MAX_SIZE"], ttl=USER_CACHE["LOCAL_TTL"])
+
+
+TOKEN_CACHE = {
+    "MAX_SIZE": 4096,
+    **getattr(settings, "AUTH_TOKEN_CACHE", {}),
+}
+
+# Tokens whose signature and claims were already verified, keyed by a digest
+# of the raw token and expiring with the token itself.
+verified_token_cache = LRUCache(TOKEN_CACHE["MAX_SIZE"])
+
+
+def _shared_cache():
+    return caches[USER_CACHE["CACHE_ALIAS"]]
+
+
+def _cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """
+    Return the user for a token's user id from the local LRU, the shared
+    cache or the database, in that order, with CACHED_USER_FIELDS loaded.
+    Callers get their own copy, so changes made during a request never leak
+    into the cache.
+    """
+    key = _cache_key(user_id)
+    user = local_user_cache.get(key)
+    if user is None:
+        user = _shared_cache().get(key)
+        if user is None:
+            user = User.objects.only(*CACHED_USER_FIELDS).get(**{api_settings.USER_ID_FIELD: user_id})
+            _shared_cache().set(key, user, USER_CACHE["SHARED_TTL"])
+        local_user_cache.set(key, user)
+    return copy.copy(user)
+
+
+async def aget_cached_user(user_id):
+    """
+    get_cached_user() for async callers.
+    """
+    key = _cache_key(user_id)
+    user = local_user_cache.get(key)
+    if user is None:
+        user = await _shared_cache().aget(key)
+        if user is None:
+            user = await User.objects.only(*CACHED_USER_FIELDS).aget(**{api_settings.USER_ID_FIELD: user_id})
+            await _shared_cache().aset(key, user, USER_CACHE["SHARED_TTL"])
+        local_user_cache.set(key, user)
+    return copy.copy(user)
+
+
+def invalidate_cached_user(user_id):
+    invalidate_cached_users([user_id])
+
+
+def invalidate_cached_users(user_ids):
+    """
+    Drop users from the shared cache and this process's LRU. Other
+    processes keep theirs for up to LOCAL_TTL seconds.
+    """
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    for key in keys:
+        local_user_cache.delete(key)
+    _shared_cache().delete_many(keys)
+
+
+def get_verified_token(token_class, raw_token):
+    """
+    Return a validated `token_class` instance for `raw_token`, decoding and
+    verifying its signature only the first time the token is seen. Raises
+    TokenError like the token class itself. Tokens that must be checked
+    against the blacklist on every use are never cached.
+    """
+    if hasattr(token_class, "check_blacklist"):
+        return token_class(raw_token)
+
+    if isinstance(raw_token, str):
+        raw_token = raw_token.encode()
+    key = f"{token_class.token_type}:{hashlib.sha256(raw_token).hexdigest()}"
+
+    token = verified_token_cache.get(key)
+    if token is None:
+        token = token_class(raw_token)
+        ttl = token["exp"] - time.time()
+        if ttl > 0:
+            verified_token_cache.set(key, token, ttl)
+
+    # Hand out a copy dated now: tokens derive new claims (e.g. the exp of
+    # an access token built from a refresh token) from their current_time.
+    token = copy.copy(token)
+    token.payload = dict(token.payload)
+    token.current_time = aware_utcnow()
+    return token
+
+
+def token_cache_stats():
+    return verified_token_cache.stats()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips signature verification for tokens it has
+    already verified, and resolves the token's user through the user cache
+    instead of loading the row on every request.
+    """
+
+    def get_validated_token(self, raw_token):
+        messages = []
+        for AuthToken in api_settings.AUTH_TOKEN_CLASSES:
+            try:
+                return get_verified_token(AuthToken, raw_token)
+            except TokenError as e:
+                messages.append(
+                    {
+                        "token_class": AuthToken.__name__,
+                        "token_type": AuthToken.token_type,
+                        "message": e.args[0],
+                    }
+                )
+
+        raise InvalidToken(
+            {
+                "detail": _("Given token not valid for any token type"),
+                "messages": messages,
+            }
+        )
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            user = get_cached_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return self.check_user(user)
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views. Tokens are verified in memory, so the
+        only I/O is the user lookup, which goes through the async cache/ORM.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        try:
+            user = await aget_cached_user(user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        return self.check_user(user)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_user(self, user):
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+
+from . import hashing
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that verifies passwords on the bounded hashing pool.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user.
+            hashing.make_password(password)
+        else:
+            if hashing.check_password(password, user.password) and self.user_can_authenticate(user):
+                self.upgrade_password(user, password)
+                return user
+
+    def upgrade_password(self, user, password):
+        # Rehash with the preferred hasher/iterations like User.check_password does
+        preferred = get_hasher("default")
+        hasher = identify_hasher(user.password)
+        if hasher.algorithm != preferred.algorithm or preferred.must_update(user.password):
+            user.password = hashing.make_password(password)
+            user.save(update_fields=["password"])
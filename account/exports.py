@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+
+from common.export import Export
+
+User = get_user_model()
+
+
+class UserExport(Export):
+    name = "users"
+    columns = {
+        "id": "id",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "is_active": "is_active",
+        "is_verified": "is_verified",
+        "is_staff": "is_staff",
+        "created_at": "created_at",
+        "last_login": "last_login",
+    }
+    ordering = ("created_at", "id")
+
+    def get_queryset(self, user=None):
+        # Only staff can reach the users export
+        return User.objects.all()
@@ -0,0 +1,115 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+OPTIONS = {
+    "MODE": "thread",
+    "WORKERS": os.cpu_count() or 1,
+    "MAX_QUEUE": 16,
+    **getattr(settings, "PASSWORD_HASHING", {}),
+}
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_detail = "Too many authentication requests, please retry shortly."
+    default_code = "hashing_busy"
+
+
+class PasswordHashingPool:
+    """
+    Runs password hashing on a bounded thread or process pool.
+
+    At most `workers` hashes run at once and `max_queue` more may wait;
+    beyond that requests are rejected immediately with HashingBusy (429)
+    instead of queueing behind a burst of logins and starving every other
+    request on the worker. hashlib releases the GIL while running PBKDF2,
+    so the thread pool hashes in parallel; the process pool also isolates
+    other hashers (e.g. pure Python ones) from the request threads.
+    """
+
+    def __init__(self, mode="thread", workers=1, max_queue=0):
+        self.mode = mode
+        self.workers = workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.count = 0
+        self.rejected = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def _get_executor(self):
+        # Created on first use so process pools are forked inside the worker
+        with self._executor_lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context("fork")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="hashing")
+            return self._executor
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            raise HashingBusy()
+
+        try:
+            start = time.perf_counter()
+            result = self._get_executor().submit(fn, *args).result()
+            self._record(time.perf_counter() - start)
+            return result
+        finally:
+            self._slots.release()
+
+    def _record(self, duration):
+        with self._stats_lock:
+            self.count += 1
+            self.total_time += duration
+            self.max_time = max(self.max_time, duration)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    self.buckets[i] += 1
+                    break
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "count": self.count,
+                "rejected": self.rejected,
+                "mean_ms": self.total_time / self.count * 1000 if self.count else 0.0,
+                "max_ms": self.max_time * 1000,
+                "total_seconds": self.total_time,
+                "buckets": dict(zip(LATENCY_BUCKETS, self.buckets)),
+            }
+
+
+hashing_pool = PasswordHashingPool(
+    mode=OPTIONS["MODE"],
+    workers=OPTIONS["WORKERS"],
+    max_queue=OPTIONS["MAX_QUEUE"],
+)
+
+
+def make_password(password):
+    return hashing_pool.run(hashers.make_password, password)
+
+
+def check_password(password, encoded):
+    return hashing_pool.run(hashers.check_password, password, encoded)
@@ -0,0 +1,96 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+OPTIONS = {
+    "WRITE_BEHIND": True,
+    "FLUSH_INTERVAL": 30,
+    "MIN_INTERVAL": 300,
+    "MAX_PENDING": 1000,
+    **getattr(settings, "LAST_LOGIN", {}),
+}
+
+
+class LastLoginRecorder:
+    """
+    Records login timestamps without an UPDATE per login.
+
+    Logins within `min_interval` seconds of the stored last_login are
+    skipped. In write-behind mode the remaining timestamps are coalesced per
+    user in memory and written with one bulk UPDATE by the first login
+    arriving `flush_interval` seconds after the previous flush, as soon as
+    `max_pending` users are waiting, and on worker shutdown.
+    """
+
+    def __init__(self, write_behind=True, flush_interval=30, min_interval=300, max_pending=1000):
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, user, when=None):
+        when = when or timezone.now()
+        if user.last_login and (when - user.last_login).total_seconds() < self.min_interval:
+            return
+        user.last_login = when
+
+        if not self.write_behind:
+            User.objects.filter(pk=user.pk).update(last_login=when)
+            return
+
+        with self._lock:
+            self.pending[user.pk] = when
+            due = (
+                len(self.pending) >= self.max_pending
+                or time.monotonic() - self.last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Write all pending timestamps, returns the number of users updated.
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        try:
+            User.objects.bulk_update(
+                [User(pk=pk, last_login=when) for pk, when in pending.items()],
+                ["last_login"],
+                batch_size=500,
+            )
+        except Exception:
+            logger.exception("Failed to write %d last_login timestamps", len(pending))
+            with self._lock:
+                # Keep newer timestamps recorded while this flush was running
+                self.pending = {**pending, **self.pending}
+            return 0
+        return len(pending)
+
+
+last_login_recorder = LastLoginRecorder(
+    write_behind=OPTIONS["WRITE_BEHIND"],
+    flush_interval=OPTIONS["FLUSH_INTERVAL"],
+    min_interval=OPTIONS["MIN_INTERVAL"],
+    max_pending=OPTIONS["MAX_PENDING"],
+)
+
+# Gunicorn also flushes from its worker_exit hook (see gunicorn.conf.py),
+# this covers other servers and management commands.
+atexit.register(last_login_recorder.flush)
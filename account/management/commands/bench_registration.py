@@ -0,0 +1,93 @@
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework import serializers
+
+from account.models import OutboxEmail
+from account.serializers import RegistrationSerializer
+from common.querycount import QueryRecorder
+
+User = get_user_model()
+
+BENCH_DOMAIN = "bench.invalid"
+
+
+class LegacyRegistrationSerializer(RegistrationSerializer):
+    """
+    The registration path before it was made atomic: DRF's UniqueValidator
+    and validate_email both check for the email before a non-atomic insert.
+    """
+
+    class Meta(RegistrationSerializer.Meta):
+        extra_kwargs = {}
+
+    def validate_email(self, value):
+        if User.objects.filter(email=value).exists():
+            raise serializers.ValidationError("User with email already exists")
+        return value
+
+    def create(self, validated_data):
+        return User.objects.create_user(
+            email=validated_data["email"],
+            first_name=validated_data["first_name"],
+            last_name=validated_data["last_name"],
+            password=validated_data["password"],
+            is_active=True,
+            is_staff=False,
+            is_verified=True,
+        )
+
+
+MODES = {
+    "legacy": LegacyRegistrationSerializer,
+    "atomic": RegistrationSerializer,
+}
+
+
+class Command(BaseCommand):
+    help = "Measure registrations per second on one worker for the legacy and atomic registration paths."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200, help="Registrations per mode.")
+        parser.add_argument("--mode", choices=[*MODES, "both"], default="both")
+        parser.add_argument(
+            "--fast-hasher",
+            action="store_true",
+            help="Hash with MD5 so the database round trips dominate instead of PBKDF2.",
+        )
+
+    def handle(self, *args, **options):
+        modes = list(MODES) if options["mode"] == "both" else [options["mode"]]
+        hashers = ["django.contrib.auth.hashers.MD5PasswordHasher"] if options["fast_hasher"] else None
+
+        try:
+            with override_settings(**({"PASSWORD_HASHERS": hashers} if hashers else {})):
+                for mode in modes:
+                    self.run_mode(mode, options["count"])
+        finally:
+            OutboxEmail.objects.filter(to__0__endswith=f"@{BENCH_DOMAIN}").delete()
+            User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+
+    def run_mode(self, mode, count):
+        serializer_class = MODES[mode]
+        with QueryRecorder() as recorder:
+            start = time.perf_counter()
+            for _ in range(count):
+                serializer = serializer_class(data={
+                    "email": f"{uuid.uuid4().hex}@{BENCH_DOMAIN}",
+                    "password": "bench-Passw0rd!",
+                    "first_name": "Bench",
+                    "last_name": "User",
+                })
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+            elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{mode:>7}: {count / elapsed:8.1f} registrations/s, "
+            f"{elapsed / count * 1000:7.2f} ms each, "
+            f"{recorder.count / count:.1f} statements each"
+        )
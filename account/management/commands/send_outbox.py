@@ -0,0 +1,48 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from account.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver pending outbox emails in batches over one reused email connection."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--max-attempts", type=int, default=5)
+        parser.add_argument("--backoff", type=int, default=60, help="Base retry delay in seconds.")
+        parser.add_argument("--claim-timeout", type=int, default=300,
+                            help="Seconds before emails claimed by a worker that died are sent by another.")
+        parser.add_argument("--loop", action="store_true", help="Keep polling instead of exiting once the outbox is drained.")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to sleep when the outbox is empty (with --loop).")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_pending(
+                    connection,
+                    batch_size=options["batch_size"],
+                    max_attempts=options["max_attempts"],
+                    backoff=options["backoff"],
+                    claim_timeout=options["claim_timeout"],
+                )
+                total_sent += sent
+                total_failed += failed
+
+                if sent or failed:
+                    continue
+                if not options["loop"]:
+                    break
+                # Don't hold an idle SMTP session open between polls
+                connection.close()
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
+
+        self.stdout.write(f"Sent {total_sent} emails, {total_failed} failed permanently.")
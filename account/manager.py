@@ -1,7 +1,23 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import models, transaction
 
 
-class UserManager(BaseUserManager):
+class UserQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # No post_save is sent for update() (nor bulk_update(), which calls
+        # it), so cached users are invalidated here.
+        from .authentication import CACHED_USER_FIELDS, invalidate_cached_users
+
+        if CACHED_USER_FIELDS.isdisjoint(kwargs):
+            return super().update(**kwargs)
+        user_ids = list(self.values_list("pk", flat=True))
+        rows = super().update(**kwargs)
+        invalidate_cached_users(user_ids)
+        transaction.on_commit(lambda: invalidate_cached_users(user_ids), using=self.db)
+        return rows
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError("Users must have an email address")
@@ -0,0 +1,38 @@
+from .authentication import local_user_cache, token_cache_stats
+from .hashing import hashing_pool
+from .last_login import last_login_recorder
+
+
+def collect():
+    """
+    Process-level auth metrics for common.telemetry (TELEMETRY["COLLECTORS"]).
+    """
+    tokens = token_cache_stats()
+    users = local_user_cache.stats()
+    hashing = hashing_pool.stats()
+    return [
+        ("liberty_auth_token_cache_hits_total", "counter", "Verified JWT cache hits.", tokens["hits"]),
+        ("liberty_auth_token_cache_misses_total", "counter", "Verified JWT cache misses.", tokens["misses"]),
+        ("liberty_auth_token_cache_entries", "gauge", "Verified JWTs cached.", tokens["size"]),
+        ("liberty_auth_user_cache_hits_total", "counter", "Local user cache hits.", users["hits"]),
+        ("liberty_auth_user_cache_misses_total", "counter", "Local user cache misses.", users["misses"]),
+        ("liberty_auth_user_cache_entries", "gauge", "Users cached locally.", users["size"]),
+        (
+            "liberty_password_hashing_rejected_total",
+            "counter",
+            "Hashing requests rejected with 429 because the pool was full.",
+            hashing["rejected"],
+        ),
+        (
+            "liberty_password_hashing_duration_seconds",
+            "histogram",
+            "Time to hash a password, waiting for a pool worker included.",
+            {
+                "bounds": list(hashing["buckets"]),
+                # The pool's buckets leave out hashes slower than the last bound
+                "counts": [*hashing["buckets"].values(), hashing["count"] - sum(hashing["buckets"].values())],
+                "sum": hashing["total_seconds"],
+            },
+        ),
+        ("liberty_last_login_pending", "gauge", "Login timestamps waiting to be written.", len(last_login_recorder.pending)),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.3 on 2026-10-18 13:23
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.functions.text
+
+
+def check_case_duplicates(apps, schema_editor):
+    # Accounts whose emails differ only in case must be merged or renamed by
+    # hand first: which one to keep is not ours to decide.
+    User = apps.get_model('account', 'User')
+    users = User.objects.using(schema_editor.connection.alias).annotate(
+        email_lower=django.db.models.functions.text.Lower('email')
+    )
+    duplicates = users.values('email_lower').annotate(count=Count('id')).filter(count__gt=1).values('email_lower')
+    conflicts = {}
+    for user in users.filter(email_lower__in=duplicates).order_by('email_lower', 'created_at'):
+        conflicts.setdefault(user.email_lower, []).append(f'{user.email} (id {user.id})')
+    if conflicts:
+        lines = [f'  {", ".join(accounts)}' for accounts in conflicts.values()]
+        raise RuntimeError(
+            'Cannot make emails unique regardless of case, these accounts share an email:\n'
+            + '\n'.join(lines)
+            + '\nMerge them or change their emails, then migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0004_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='account_user_email_ci_unique'),
+        ),
+    ]
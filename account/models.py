@@ -1,8 +1,13 @@
 import uuid
 from django.contrib.auth.models import AbstractUser, PermissionsMixin
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
 from .manager import UserManager
 
+EMAIL_CI_UNIQUE = "account_user_email_ci_unique"
+
 
 class User(AbstractUser, PermissionsMixin):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -20,6 +25,24 @@ class User(AbstractUser, PermissionsMixin):
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name"]
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Registration relies on this index instead of checking for an
+            # existing email first, so addresses differing only in case clash.
+            models.UniqueConstraint(Lower("email"), name=EMAIL_CI_UNIQUE),
+        ]
+
+    @classmethod
+    def is_duplicate_email(cls, error):
+        """
+        Whether the IntegrityError `error` was raised by a unique index on the
+        email: EMAIL_CI_UNIQUE, or the column's own for an exact duplicate.
+        """
+        message = str(error)
+        table = cls._meta.db_table
+        # The column's index as named by PostgreSQL and reported by SQLite
+        return any(name in message for name in (EMAIL_CI_UNIQUE, f"{table}_email_key", f"{table}.email"))
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.is_verified = True
@@ -40,3 +63,46 @@ class UserProfile(models.Model):
     bio = models.TextField(max_length=500, blank=True)
     gender = models.CharField(max_length=15, choices=GENDER)
     published_posts = models.IntegerField(default=0)
+
+
+class OutboxEmail(models.Model):
+    """
+    Transactional email waiting to be delivered by the send_outbox worker.
+    Rows are written in the same transaction as the change that triggers
+    them, so the request path never talks to the SMTP server.
+    """
+
+    PENDING = "pending"
+    # Claimed by a worker until next_attempt_at, then pending again
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS = (
+        (PENDING, "Pending"),
+        (SENDING, "Sending"),
+        (SENT, "Sent"),
+        (FAILED, "Failed"),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at"],
+                condition=Q(status__in=["pending", "sending"]),
+                name="account_outbox_due_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
@@ -0,0 +1,91 @@
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def enqueue_email(subject, body, to, from_email=None):
+    """
+    Store an email in the outbox. Call it inside the transaction that makes
+    the email necessary so both are committed (or rolled back) together.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def claim_batch(batch_size=100, claim_timeout=300):
+    """
+    Claim up to batch_size due emails for claim_timeout seconds and commit,
+    so no lock is held while they are sent. Rows are locked with SKIP LOCKED
+    so several workers can drain the outbox concurrently; the claims of a
+    worker that died are taken over once they expire.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING], next_attempt_at__lte=now)
+            .order_by("next_attempt_at")[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+            status=OutboxEmail.SENDING, next_attempt_at=now + timedelta(seconds=claim_timeout)
+        )
+    return batch
+
+
+def send_pending(connection=None, batch_size=100, max_attempts=5, backoff=60, claim_timeout=300):
+    """
+    Deliver one batch of due emails over a single email backend connection.
+    Each result is saved as soon as the email is sent or fails. An email
+    that cannot be built or delivered, whatever the error, is retried with
+    exponential backoff (backoff * 2^n seconds) and marked failed after
+    max_attempts, so it does not hold up the rest of the outbox; emails left
+    unsent when the batch itself is interrupted are released for the next
+    batch.
+    Returns the number of emails sent and failed in this batch.
+    """
+    connection = connection or get_connection()
+    sent = failed = 0
+    batch = claim_batch(batch_size, claim_timeout)
+    done = set()
+
+    try:
+        for email in batch:
+            now = timezone.now()
+            try:
+                EmailMessage(
+                    email.subject, email.body, email.from_email, email.to, connection=connection
+                ).send()
+            except Exception as e:
+                if isinstance(e, (smtplib.SMTPException, OSError)):
+                    # Drop a possibly broken connection, the next send reopens it
+                    connection.close()
+                email.attempts += 1
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.status = OutboxEmail.FAILED
+                    failed += 1
+                else:
+                    email.status = OutboxEmail.PENDING
+                    email.next_attempt_at = now + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+            else:
+                email.status = OutboxEmail.SENT
+                email.sent_at = now
+                sent += 1
+            email.save(update_fields=["status", "attempts", "next_attempt_at", "last_error", "sent_at"])
+            done.add(email.pk)
+    finally:
+        OutboxEmail.objects.filter(
+            pk__in=[email.pk for email in batch if email.pk not in done], status=OutboxEmail.SENDING
+        ).update(status=OutboxEmail.PENDING, next_attempt_at=timezone.now())
+
+    return sent, failed
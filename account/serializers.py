@@ -1,10 +1,14 @@
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
 from rest_framework.exceptions import ValidationError
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import serializers
-from django.contrib.auth.hashers import check_password
+from django.db import IntegrityError, transaction
+from . import hashing
+from .authentication import get_verified_token
+from .last_login import last_login_recorder
 from .models import UserProfile
 
 User = get_user_model()
@@ -27,7 +31,7 @@ class ChangePasswordSerializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid context. User object not found.")
 
         # check if old password matches current password
-        if not check_password(value, user.password):
+        if not hashing.check_password(value, user.password):
             raise serializers.ValidationError("Old password does not match.")
         return value
 
@@ -50,6 +54,9 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if user.is_verified == False:
             raise serializers.ValidationError({"error": "Email is not verified."})
 
+        # Throttled, batched replacement for SIMPLE_JWT's UPDATE_LAST_LOGIN
+        last_login_recorder.record(user)
+
         user_data = {
             "id": user.id,
             "email": user.email,
@@ -72,6 +79,30 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        # Polling clients present the same refresh token over and over, only
+        # verify its signature the first time.
+        refresh = get_verified_token(self.token_class, attrs["refresh"])
+
+        data = {"access": str(refresh.access_token)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    pass
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
+
+
 class ConfirmEmailSerializer(serializers.ModelSerializer):
     token = serializers.CharField(min_length=1, write_only=True)
     uidb64 = serializers.CharField(min_length=1, write_only=True)
@@ -87,11 +118,9 @@ class RegistrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "email", "password", "first_name", "last_name"]
-
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("User with email already exists")
-        return value
+        # Duplicate emails are caught by the case-insensitive unique index on
+        # insert rather than by a racy SELECT beforehand.
+        extra_kwargs = {"email": {"validators": []}}
 
     def validate_password(self, value):
         try:
@@ -101,18 +130,27 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
+        # Hash before opening the transaction so it isn't held open meanwhile
+        password = hashing.make_password(validated_data["password"])
+
+        # The user, its profile and the queued confirmation email are written
+        # in one transaction (the last two by the post_save receivers).
         try:
-            user = User.objects.create_user(
-                email=validated_data["email"],
-                first_name=validated_data["first_name"],
-                last_name=validated_data["last_name"],
-                password=validated_data["password"],
-                is_active=True,
-                is_staff=False,
-                is_verified=True,
-            )
-        except Exception as e:
-            raise serializers.ValidationError(str(e))
+            with transaction.atomic():
+                user = User(
+                    email=User.objects.normalize_email(validated_data["email"]),
+                    first_name=validated_data["first_name"],
+                    last_name=validated_data["last_name"],
+                    password=password,
+                    is_active=True,
+                    is_staff=False,
+                    is_verified=True,
+                )
+                user.save()
+        except IntegrityError as e:
+            if not User.is_duplicate_email(e):
+                raise
+            raise serializers.ValidationError({"email": ["User with email already exists"]})
         return user
 
 
@@ -138,7 +176,9 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
 
 class RetrieveUserSerializer(serializers.ModelSerializer):
-    user_profile = serializers.SerializerMethodField()
+    # Reads the profile loaded by select_related("userprofile"); users without
+    # a profile are rendered as null.
+    user_profile = UserProfileSerializer(source="userprofile", read_only=True)
 
     class Meta:
         model = User
@@ -153,10 +193,3 @@ class RetrieveUserSerializer(serializers.ModelSerializer):
             "created_at",
             "user_profile",
         ]
-
-    def get_user_profile(self, obj):
-        try:
-            profile = obj.userprofile
-            return UserProfileSerializer(profile).data
-        except UserProfile.DoesNotExist:
-            return None
@@ -1,19 +1,18 @@
-from config.settings import DEFAULT_FROM_EMAIL
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
 from django_rest_passwordreset.signals import reset_password_token_created
-from django.core.mail import EmailMultiAlternatives
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.conf import settings
 from django.utils.encoding import smart_bytes
 from django.utils.http import urlsafe_base64_encode
-import smtplib
 
+from .authentication import invalidate_cached_user
 from .models import UserProfile
+from .outbox import enqueue_email
 
 User = get_user_model()
 
@@ -23,7 +22,7 @@ def password_reset_token_created(
     sender, instance, reset_password_token, *args, **kwargs
 ):
     """
-    Handles password reset tokens. Sends an email to the user when a token is created.
+    Handles password reset tokens. Queues an email to the user when a token is created.
     """
     context = {
         "current_user": reset_password_token.user,
@@ -35,41 +34,39 @@ def password_reset_token_created(
     email_html_message = render_to_string("account/reset_password.html", context)
 
     subject = "Password Reset for Liberty Blog"
-    from_email = DEFAULT_FROM_EMAIL
-    to_email = reset_password_token.user.email
-
-    msg = EmailMultiAlternatives(subject, email_html_message, from_email, [to_email])
-    msg.send()
+    enqueue_email(subject, email_html_message, [reset_password_token.user.email])
 
 
 @receiver(post_save, sender=User, dispatch_uid="unique_identifier")
 def send_confirmation_email(sender, instance, created, **kwargs):
     if created:
-        print("Created")
-        try:
-            subject = "Confirm Your Email Address"
-            verification_url = reverse(
-                "confirm-email",
-                kwargs={
-                    "uidb64": urlsafe_base64_encode(smart_bytes(instance.pk)),
-                    "token": default_token_generator.make_token(instance),
-                },
-            )
-            confirmation_link = f"{settings.SITE_DOMAIN}{verification_url}"
-            message = render_to_string(
-                "account/email_confirmation.html",
-                {"user": instance, "confirmation_link": confirmation_link},
-            )
-            from_email = DEFAULT_FROM_EMAIL
-            to_email = instance.email
-            send_mail(subject, message, from_email, [to_email], fail_silently=False)
-
-        except smtplib.SMTPException as e:
-            return f"Error sending confirmation email: {e}"
+        subject = "Confirm Your Email Address"
+        verification_url = reverse(
+            "confirm-email",
+            kwargs={
+                "uidb64": urlsafe_base64_encode(smart_bytes(instance.pk)),
+                "token": default_token_generator.make_token(instance),
+            },
+        )
+        confirmation_link = f"{settings.SITE_DOMAIN}{verification_url}"
+        message = render_to_string(
+            "account/email_confirmation.html",
+            {"user": instance, "confirmation_link": confirmation_link},
+        )
+        # Delivered by the send_outbox worker, not on the request path
+        enqueue_email(subject, message, [instance.email])
 
 
-# TODO: Make registration atomic.
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    # Invalidate again on commit so a request that cached the old row while
+    # the transaction was open doesn't keep serving it.
+    invalidate_cached_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_cached_user(instance.pk))
@@ -1,15 +1,33 @@
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
+import smtplib
+from io import StringIO
+from unittest import mock
 from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError
+from django.test import override_settings
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
+from django.utils import timezone
+from common.testing import QueryBudgetMixin
+from .authentication import CACHED_USER_FIELDS, get_cached_user, local_user_cache, token_cache_stats
+from .hashing import HashingBusy, PasswordHashingPool, hashing_pool
+from .last_login import LastLoginRecorder, last_login_recorder
+from .models import OutboxEmail, UserProfile
+from .outbox import claim_batch, enqueue_email, send_pending
+from . import urls
 
 User = get_user_model()
 
 class ChangePasswordViewTestCase(APITestCase):
     def setUp(self):
+        # Logins buffer last_login, write it before the test transaction ends
+        self.addCleanup(last_login_recorder.flush)
         self.user = User.objects.create_user(
             email='testuser@example.com',
             password='testpassword',
@@ -32,9 +50,13 @@ class ChangePasswordViewTestCase(APITestCase):
             'new_password': 'newtestpassword'
         }
         headers = {'Authorization': f'Bearer {access_token}'}
+        last_login_recorder.flush()
         response = self.client.put(url, new_password_data, format='json', headers=headers)
         print('response------', response)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        # Only the password is written from the cached user
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
 
         # Verify the new password works
         response = self.client.post(self.login_url, {'email': 'testuser@example.com', 'password': 'newtestpassword'})
@@ -59,6 +81,433 @@ class ConfirmEmailViewTestCase(APITestCase):
         self.assertEqual(response.data['message'], 'Email confirmation successful')
 
 
+class CachedJWTAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        self.addCleanup(last_login_recorder.flush)
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'email': 'testuser@example.com',
+            'password': 'testpassword',
+        })
+        self.tokens = response.data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.url = reverse('user-profile', args=[self.user.id])
+
+    def test_user_is_loaded_once(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_is_shared_between_processes(self):
+        self.client.get(self.url)
+        # A worker that hasn't seen the user yet reads it from the shared cache
+        local_user_cache.clear()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_verified_tokens_are_cached(self):
+        self.client.get(self.url)
+        hits = token_cache_stats()['hits']
+        self.client.get(self.url)
+        self.assertEqual(token_cache_stats()['hits'], hits + 1)
+
+        # A token with a different signature is still verified and rejected
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access'][:-2]}xx")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_with_cached_token(self):
+        url = reverse('token_refresh')
+        for _ in range(2):
+            response = self.client.post(url, {'refresh': self.tokens['refresh']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+        response = self.client.post(url, {'refresh': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_bulk_updates_invalidate_the_cache(self):
+        self.client.get(self.url)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.user.is_active = True
+        User.objects.bulk_update([self.user], ['is_active'])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get(self.url)
+        deferred = get_cached_user(self.user.pk).get_deferred_fields()
+        self.assertIn('password', deferred)
+        self.assertTrue(CACHED_USER_FIELDS.isdisjoint(deferred))
+
+
+class LastLoginTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        last_login_recorder.flush()
+        self.addCleanup(last_login_recorder.flush)
+
+    def test_login_buffers_last_login(self):
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'email': 'testuser@example.com',
+            'password': 'testpassword',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertIsNone(self.user.last_login)
+
+        self.assertEqual(last_login_recorder.flush(), 1)
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_logins_are_coalesced_and_throttled(self):
+        recorder = LastLoginRecorder(min_interval=300, flush_interval=3600)
+        other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Doe',
+        )
+        recorder.record(self.user)
+        recorder.record(self.user)
+        recorder.record(other)
+        with self.assertNumQueries(1):
+            self.assertEqual(recorder.flush(), 2)
+
+        # Logged in again within MIN_INTERVAL of the stored timestamp
+        self.user.refresh_from_db()
+        recorder.record(self.user)
+        self.assertEqual(recorder.flush(), 0)
+
+
+class PasswordHashingPoolTestCase(APITestCase):
+    def test_pool_rejects_when_saturated(self):
+        pool = PasswordHashingPool(workers=1, max_queue=0)
+        self.assertEqual(pool.run(len, 'abc'), 3)
+        pool._slots.acquire()
+        with self.assertRaises(HashingBusy):
+            pool.run(len, 'abc')
+        self.assertEqual(pool.stats()['rejected'], 1)
+        self.assertEqual(pool.stats()['count'], 1)
+
+    def test_login_returns_429_when_saturated(self):
+        self.addCleanup(last_login_recorder.flush)
+        User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        url = reverse('token_obtain_pair')
+        data = {'email': 'testuser@example.com', 'password': 'testpassword'}
+        count = hashing_pool.stats()['count']
+        self.assertEqual(self.client.post(url, data).status_code, status.HTTP_200_OK)
+        self.assertEqual(hashing_pool.stats()['count'], count + 1)
+
+        held = 0
+        while hashing_pool._slots.acquire(blocking=False):
+            held += 1
+        try:
+            response = self.client.post(url, data)
+        finally:
+            for _ in range(held):
+                hashing_pool._slots.release()
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+
+
+class PoisonMessageBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        if any(message.subject == 'Subject 1' for message in email_messages):
+            raise ValueError("Template error")
+        mail.outbox.extend(email_messages)
+        return len(email_messages)
+
+
+class EmailOutboxTestCase(APITestCase):
+    def register(self):
+        return self.client.post(reverse('register'), {
+            'email': 'newuser@example.com',
+            'password': '2000money',
+            'first_name': 'John',
+            'last_name': 'Doe',
+        }, format='json')
+
+    def test_registration_queues_confirmation_email(self):
+        response = self.register()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, ['newuser@example.com'])
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Confirm Your Email Address')
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.SENT)
+
+    def test_duplicate_email_is_rejected_by_the_unique_index(self):
+        self.register()
+        response = self.client.post(reverse('register'), {
+            'email': 'NewUser@example.com',
+            'password': '2000money',
+            'first_name': 'Jane',
+            'last_name': 'Doe',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['email'], ['User with email already exists'])
+        self.assertEqual(self.register().data['email'], ['User with email already exists'])
+        self.assertEqual(User.objects.count(), 1)
+        self.assertEqual(OutboxEmail.objects.count(), 1)
+
+        # Other integrity errors are not reported as a taken email
+        self.assertFalse(User.is_duplicate_email(IntegrityError('NOT NULL constraint failed: account_user.first_name')))
+
+    @override_settings(EMAIL_BACKEND='account.tests.FailingEmailBackend')
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.register()
+        email = OutboxEmail.objects.get()
+
+        self.assertEqual(send_pending(max_attempts=2, backoff=60), (0, 0))
+        email.refresh_from_db()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertGreater(email.next_attempt_at, email.created_at)
+        self.assertIn('unexpectedly closed', email.last_error)
+
+        # Not due yet
+        self.assertEqual(send_pending(max_attempts=2, backoff=60), (0, 0))
+        OutboxEmail.objects.update(next_attempt_at=email.created_at)
+        self.assertEqual(send_pending(max_attempts=2, backoff=60), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.FAILED)
+
+    @override_settings(EMAIL_BACKEND='account.tests.PoisonMessageBackend')
+    def test_unexpected_error_fails_only_that_email(self):
+        for i in range(3):
+            enqueue_email(f'Subject {i}', 'Body', ['user@example.com'])
+
+        self.assertEqual(send_pending(max_attempts=2, backoff=60), (2, 0))
+        self.assertEqual([message.subject for message in mail.outbox], ['Subject 0', 'Subject 2'])
+        poison = OutboxEmail.objects.get(subject='Subject 1')
+        self.assertEqual(poison.status, OutboxEmail.PENDING)
+        self.assertEqual(poison.attempts, 1)
+        self.assertEqual(poison.last_error, 'Template error')
+        self.assertGreater(poison.next_attempt_at, timezone.now())
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(max_attempts=2, backoff=60), (0, 1))
+        self.assertEqual(OutboxEmail.objects.get(subject='Subject 1').status, OutboxEmail.FAILED)
+
+    def test_interrupted_batch_releases_unsent_emails(self):
+        for i in range(3):
+            enqueue_email(f'Subject {i}', 'Body', ['user@example.com'])
+
+        save = OutboxEmail.save
+
+        def save_once(email, *args, **kwargs):
+            if email.subject != 'Subject 0':
+                raise DatabaseError('Connection lost')
+            return save(email, *args, **kwargs)
+
+        with mock.patch.object(OutboxEmail, 'save', save_once), self.assertRaises(DatabaseError):
+            send_pending()
+        # Recorded as sent, not sent again; the others are due again
+        statuses = dict(OutboxEmail.objects.values_list('subject', 'status'))
+        self.assertEqual(statuses, {
+            'Subject 0': OutboxEmail.SENT,
+            'Subject 1': OutboxEmail.PENDING,
+            'Subject 2': OutboxEmail.PENDING,
+        })
+
+    def test_expired_claims_are_taken_over(self):
+        enqueue_email('Subject', 'Body', ['user@example.com'])
+        self.assertEqual(len(claim_batch(claim_timeout=300)), 1)
+        self.assertEqual(OutboxEmail.objects.get().status, OutboxEmail.SENDING)
+        self.assertEqual(send_pending(), (0, 0))
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(), (1, 0))
+
+
+class UserListQueryCountTestCase(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='testpassword',
+            first_name='Staff',
+            last_name='User',
+            is_staff=True,
+        )
+        for i in range(5):
+            User.objects.create_user(
+                email=f'user{i}@example.com',
+                password='testpassword',
+                first_name='John',
+                last_name='Doe',
+            )
+        self.client.force_authenticate(user=self.staff)
+
+    def test_user_list_loads_profiles_with_users(self):
+        # One COUNT for the page-number mode, one SELECT joining the profiles
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['user_profile']['published_posts'], 0)
+
+    def test_fast_path_matches_serializer(self):
+        UserProfile.objects.filter(user__email='user0@example.com').delete()
+        UserProfile.objects.filter(user__email='user1@example.com').update(bio='Writes', gender='female')
+        for params in ({}, {'cursor': ''}, {'record': 1, 'records per page': 2}):
+            with override_settings(FAST_READ_PATH=False):
+                expected = self.client.get(reverse('user-list'), params)
+            response = self.client.get(reverse('user-list'), params)
+            self.assertEqual(response.content, expected.content)
+        profiles = [user['user_profile'] for user in self.client.get(reverse('user-list')).json()['results']]
+        self.assertIn(None, profiles)
+        self.assertIn({'bio': 'Writes', 'gender': 'female', 'published_posts': 0}, profiles)
+
+
+class AccountQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    query_budgets = {
+        'register': 5,
+        'token_obtain_pair': 1,
+        'token_refresh': 0,
+        'confirm-email': 6,
+        'change_password': 3,
+        'user-list': 2,
+        'user-export': 1,
+        'user-detail': 1,
+        'user-profile': 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='testpassword',
+            first_name='Staff',
+            last_name='User',
+            is_staff=True,
+        )
+        for i in range(20):
+            User.objects.create_user(
+                email=f'user{i}@example.com',
+                password='testpassword',
+                first_name='John',
+                last_name='Doe',
+            )
+        # Start with an empty last_login buffer so login doesn't flush it
+        last_login_recorder.flush()
+        self.addCleanup(last_login_recorder.flush)
+
+    def test_every_url_has_a_budget(self):
+        self.assertQueryBudgetsCover(urls.urlpatterns)
+
+    def test_anonymous_urls_within_budget(self):
+        self.assertQueryBudget('register', method='post', data={
+            'email': 'newuser@example.com',
+            'password': '2000money',
+            'first_name': 'John',
+            'last_name': 'Doe',
+        })
+        response = self.assertQueryBudget('confirm-email', method='post', args=[
+            urlsafe_base64_encode(force_bytes(self.user.pk)),
+            default_token_generator.make_token(self.user),
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.assertQueryBudget('token_obtain_pair', method='post', data={
+            'email': 'testuser@example.com',
+            'password': 'testpassword',
+        })
+        self.assertQueryBudget('token_refresh', method='post', data={'refresh': response.data['refresh']})
+
+    def test_authenticated_urls_within_budget(self):
+        self.client.force_authenticate(user=self.user)
+        self.assertQueryBudget('user-detail', args=[self.user.id])
+        self.assertQueryBudget('user-profile', args=[self.user.id])
+        self.assertQueryBudget('change_password', method='put', data={
+            'old_password': 'testpassword',
+            'new_password': 'newtestpassword',
+        })
+
+        self.client.force_authenticate(user=self.staff)
+        self.assertQueryBudget('user-list')
+        self.assertQueryCountIndependentOfPageSize('user-list')
+        self.assertQueryCountIndependentOfPageSize('user-list', data={'cursor': ''})
+        self.assertQueryBudget('user-export')
+
+
+class UserExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.staff = User.objects.create_user(
+            email='staff@example.com',
+            password='testpassword',
+            first_name='Staff',
+            last_name='User',
+            is_staff=True,
+        )
+        self.url = reverse('user-export')
+
+    def test_export_is_staff_only(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_csv(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,email,first_name,last_name,is_active,is_verified,is_staff,created_at,last_login')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['testuser@example.com', 'staff@example.com'])
+
+    def test_export_has_no_updated_since(self):
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(self.url, {'updated_since': '2023-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 # class RegistrationViewTestCase(APITestCase):
 #     def test_registration(self):
 #         url = reverse("register")
@@ -1,16 +1,12 @@
 from django.urls import path, include
 from .views import *
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
 
 
 
 urlpatterns = [
     path("register/", RegistrationView.as_view(), name="register"),
     path("login/", CustomTokenObtainPairViewSet.as_view(), name="token_obtain_pair"),
-    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/refresh/", CachedTokenRefreshView.as_view(), name="token_refresh"),
     path(
         "confirm_email/<str:uidb64>/<str:token>/",
         ConfirmEmailView.as_view(),
@@ -23,6 +19,7 @@ urlpatterns = [
     ),
 
     path('users/', UserListView.as_view(), name='user-list'),
+    path('users/export/', UserExportView.as_view(), name='user-export'),
     path('users/<str:pk>/', UserDetailView.as_view(), name='user-detail'),
     path('user-profile/<str:pk>/', UserProfileRetrieveUpdateView.as_view(), name='user-profile'),
 ]
@@ -9,10 +9,16 @@ from django.db import transaction
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from . import hashing
 from .models import UserProfile
-from common.pagination import CustomPagination
-from rest_framework_simplejwt.views import TokenObtainPairView
+from common.export import ExportView
+from common.fastpath import FastReadMixin, RowMapper
+from common.pagination import CursorOrRecordPagination
+from common.replicas import ReplicaReadMixin
+from .exports import UserExport
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from .serializers import (
+    CachedTokenRefreshSerializer,
     ChangePasswordSerializer,
     CustomTokenObtainPairSerializer,
     UserProfileSerializer,
@@ -27,18 +33,12 @@ class ChangePasswordView(generics.UpdateAPIView):
     permission_classes = [IsAuthenticated]
 
     def update(self, request, *args, **kwargs):
+        # The serializer verifies the old password
         serializer = self.get_serializer(data=request.data, context={'user': request.user})
         serializer.is_valid(raise_exception=True)
 
-        old_password = request.data.get("old_password")
-        if not request.user.check_password(old_password):
-            return Response(
-                {"error": "Password change failed"}, status=status.HTTP_400_BAD_REQUEST
-            )
-
-        new_password = request.data.get("new_password")
-        request.user.set_password(new_password)
-        request.user.save()
+        request.user.password = hashing.make_password(serializer.validated_data["new_password"])
+        request.user.save(update_fields=["password"])
 
         return Response({"message": "Password changed successfully"},status=status.HTTP_204_NO_CONTENT)
 
@@ -52,6 +52,15 @@ class CustomTokenObtainPairViewSet(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+class CachedTokenRefreshView(TokenRefreshView):
+
+    """
+    Token refresh that verifies each refresh token's signature only once.
+    """
+
+    serializer_class = CachedTokenRefreshSerializer
+
+
 class ConfirmEmailView(APIView):
 
     """
@@ -95,15 +104,27 @@ class RegistrationView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
 
 
-class UserListView(generics.ListAPIView):
+class UserListView(ReplicaReadMixin, FastReadMixin, generics.ListAPIView):
     serializer_class = RetrieveUserSerializer
+    row_mapper = RowMapper(RetrieveUserSerializer)
     queryset = get_user_model().objects.all()
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
-    pagination_class = CustomPagination
+    pagination_class = CursorOrRecordPagination
+    keyset_ordering = ("-created_at",)
     search_fields = ["first_name", "last_name", "email"]
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_staff=False, is_superuser=False)
+        return (
+            super()
+            .get_queryset()
+            .filter(is_staff=False, is_superuser=False)
+            .select_related("userprofile")
+        )
+
+
+class UserExportView(ExportView):
+    export_class = UserExport
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
 
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -112,7 +133,12 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, IsOwnerOrReadOnly]
 
     def get_queryset(self):
-        return super().get_queryset().filter(is_staff=False, is_superuser=False)
+        return (
+            super()
+            .get_queryset()
+            .filter(is_staff=False, is_superuser=False)
+            .select_related("userprofile")
+        )
 
 
 class UserProfileRetrieveUpdateView(generics.RetrieveUpdateAPIView):
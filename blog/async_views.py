@@ -0,0 +1,191 @@
+"""
+Async versions of the blog read endpoints, served without a thread per
+request under ASGI.
+
+They reuse the queryset, filters, pagination, permissions and serializer of
+the DRF view they stand in for, and only replace the parts that do I/O:
+authentication and evaluating the queryset. Other methods are passed on to
+the sync view.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404, HttpResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from account.authentication import CachedJWTAuthentication
+from common.conditional import CONDITIONAL_READ_HEADERS, ConditionalMixin
+from common.renderers import FastJSONRenderer
+from common.replicas import ReplicaReadMixin, achoose_read_database, reading_from, replica_set
+from common.telemetry import serializing
+
+
+class AsyncAPIView(View):
+    sync_view = None  # DRF view function (from as_view()) this view stands in for
+    action = None
+    authentication_class = CachedJWTAuthentication
+    renderer_class = FastJSONRenderer
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        sync_view = initkwargs.get("sync_view", cls.sync_view)
+        if sync_view is None:
+            raise TypeError(f"{cls.__name__}.as_view() requires a sync_view")
+
+        view = super().as_view(**initkwargs)
+        # Let schema generators describe the endpoint from the DRF view
+        view.cls = sync_view.cls
+        view.initkwargs = sync_view.initkwargs
+        if hasattr(sync_view, "actions"):
+            view.actions = sync_view.actions
+        # Token authentication only, like the DRF views
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+        self.view = self.get_view(request, args, kwargs)
+        try:
+            await self.perform_authentication(self.view.request)
+            self.view.check_permissions(self.view.request)
+            alias = None
+            if isinstance(self.view, ReplicaReadMixin) and replica_set.aliases:
+                alias = await achoose_read_database(self.view.request)
+            with reading_from(alias):
+                return await super().dispatch(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    def get_view(self, request, args, kwargs):
+        """
+        Instance of the DRF view set up for this request, as its own
+        dispatch() would, except that the user is not authenticated yet.
+        """
+        view = self.sync_view.cls(**self.sync_view.initkwargs)
+        view.action = self.action
+        view.args = args
+        view.kwargs = kwargs
+        view.format_kwarg = None
+        view.headers = {}
+        view.request = Request(request, authenticators=[self.authentication_class()])
+        # What content negotiation would pick; ETags include its format
+        view.request.accepted_renderer = self.renderer_class()
+        view.request.accepted_media_type = view.request.accepted_renderer.media_type
+        return view
+
+    async def perform_authentication(self, request):
+        # Fill in what Request._authenticate() would, so DRF never falls
+        # back to the sync authenticators.
+        authenticator = request.authenticators[0]
+        try:
+            result = await authenticator.aauthenticate(request._request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+
+        if result is None:
+            request._not_authenticated()
+        else:
+            request._authenticator = authenticator
+            request.user, request.auth = result
+
+    def handle_exception(self, exc):
+        request = self.view.request
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            auth_header = self.view.get_authenticate_header(request)
+            if auth_header:
+                exc.auth_header = auth_header
+            else:
+                exc.status_code = 403
+
+        context = {"view": self.view, "args": self.view.args, "kwargs": self.view.kwargs, "request": request}
+        response = exception_handler(exc, context)
+        if response is None:
+            raise exc
+
+        rendered = self.render(response.data, status=response.status_code)
+        for header, value in response.items():
+            if header != "Content-Type":
+                rendered[header] = value
+        return rendered
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        raise exceptions.MethodNotAllowed(request.method)
+
+    def render(self, data, status=200):
+        renderer = self.renderer_class()
+        return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+class AsyncListView(AsyncAPIView):
+    action = "list"
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view
+        queryset = view.filter_queryset(view.get_queryset())
+        fast = getattr(view, "use_row_mapper", lambda: False)()
+        if fast:
+            queryset = view.get_row_queryset(queryset)
+
+        page = None
+        if view.paginator is not None:
+            page = await view.paginator.apaginate_queryset(queryset, view.request, view=view)
+        if page is not None:
+            # Validated before serializing, as ConditionalMixin does
+            etag = None
+            if isinstance(view, ConditionalMixin):
+                etag = view.get_page_etag(page, queryset.model._meta.pk.name)
+                not_modified = view.get_conditional_response(view.request, etag, None)
+                if not_modified is not None:
+                    return not_modified
+            with serializing():
+                data = view.get_row_mapper().map_rows(page) if fast else view.get_serializer(page, many=True).data
+            response = self.render(view.get_paginated_response(data).data)
+            return response if etag is None else view.set_validators(response, etag, None)
+
+        rows = [obj async for obj in queryset]
+        with serializing():
+            data = view.get_row_mapper().map_rows(rows) if fast else view.get_serializer(rows, many=True).data
+        return self.render(data)
+
+
+class AsyncRetrieveView(AsyncAPIView):
+    action = "retrieve"
+
+    async def get(self, request, *args, **kwargs):
+        view = self.view
+        queryset = view.filter_queryset(view.get_queryset())
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        lookup = {view.lookup_field: kwargs[lookup_url_kwarg]}
+        conditional = isinstance(view, ConditionalMixin)
+
+        if conditional and view.has_conditional_headers(request, CONDITIONAL_READ_HEADERS):
+            # Only the timestamp is read, as ConditionalMixin.retrieve() does
+            try:
+                row = await queryset.filter(**lookup).values_list("pk", view.modified_field).afirst()
+            except (TypeError, ValueError, ValidationError):
+                row = None
+            if row is not None:
+                pk, modified = row
+                response = view.get_conditional_response(view.request, view.get_object_etag(pk, modified), modified)
+                if response is not None:
+                    return response
+
+        try:
+            obj = await queryset.aget(**lookup)
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+
+        view.check_object_permissions(view.request, obj)
+        with serializing():
+            data = view.get_serializer(obj).data
+        response = self.render(data)
+        if conditional:
+            modified = getattr(obj, view.modified_field)
+            view.set_validators(response, view.get_object_etag(obj.pk, modified), modified)
+        return response
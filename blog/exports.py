@@ -0,0 +1,41 @@
+from django.db.models import Q
+
+from common.export import Export
+from .models import Blog, BlogSharing
+
+
+class BlogExport(Export):
+    name = "blogs"
+    columns = {
+        "id": "id",
+        "title": "title",
+        "content": "content",
+        "author": "author__email",
+        "created_at": "created_at",
+        "updated_at": "updated_at",
+    }
+    ordering = ("updated_at", "id")
+    updated_field = "updated_at"
+
+    def get_queryset(self, user=None):
+        # Same visibility as the blog list
+        queryset = Blog.objects.all()
+        if user is None or user.is_staff or user.is_superuser:
+            return queryset
+        return queryset.filter(author__is_active=True)
+
+
+class BlogSharingExport(Export):
+    name = "shares"
+    columns = {
+        "id": "id",
+        "blog": "blog_id",
+        "owner": "owner__email",
+        "shared_with": "shared_with__email",
+    }
+
+    def get_queryset(self, user=None):
+        queryset = BlogSharing.objects.all()
+        if user is None or user.is_staff or user.is_superuser:
+            return queryset
+        return queryset.filter(Q(owner=user) | Q(shared_with=user))
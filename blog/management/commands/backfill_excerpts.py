@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Blog
+
+SUMMARY_FIELDS = ["excerpt", "word_count", "reading_time"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill in the excerpt, word count and reading time of blogs saved before they existed, "
+        "in chunks walked by primary key. Safe to interrupt and run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Blogs read and updated per transaction.")
+        parser.add_argument("--all", action="store_true", help="Recompute every blog, not only the missing ones.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        queryset = Blog.objects.using(options["database"]).only("id", "content").order_by("pk")
+        if not options["all"]:
+            queryset = queryset.filter(word_count__isnull=True)
+
+        updated, last_pk = 0, None
+        while True:
+            chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            blogs = list(chunk[:options["batch_size"]])
+            if not blogs:
+                break
+            for blog in blogs:
+                blog.update_summary()
+            # bulk_update() leaves updated_at alone, so ETags do not change
+            with transaction.atomic(using=options["database"]):
+                Blog.objects.using(options["database"]).bulk_update(blogs, SUMMARY_FIELDS)
+            updated += len(blogs)
+            last_pk = blogs[-1].pk
+            if options["verbosity"] > 1:
+                self.stdout.write(f"  {updated} blogs")
+
+        self.stdout.write(f"Updated {updated} blogs")
@@ -0,0 +1,191 @@
+import asyncio
+import io
+import statistics
+import sys
+import threading
+import time
+from types import ModuleType
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import include, path, resolve, reverse
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.tokens import AccessToken
+
+from blog import urls
+from blog.async_views import AsyncListView, AsyncRetrieveView
+from blog.models import Blog
+
+User = get_user_model()
+
+ROUTES = {
+    "blog-list": (urls.blog_list, AsyncListView),
+    "blog-detail": (urls.blog_detail, AsyncRetrieveView),
+    "blog-feed": (urls.feed, AsyncListView),
+    "shared-blogs": (urls.shared_blogs, AsyncListView),
+    "authors-with-access": (urls.authors_with_access, AsyncListView),
+}
+
+
+def route_urlconf(name, view):
+    """
+    The project's URLconf with route `name` served by `view`, whatever
+    ASYNC_VIEWS says.
+    """
+    route = resolve(reverse(name, kwargs={"pk": "x"} if name == "blog-detail" else None)).route
+    urlconf = ModuleType(f"{__name__}.urls")
+    urlconf.urlpatterns = [path(route, view, name=name), path("", include(settings.ROOT_URLCONF))]
+    return urlconf
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a blog read route served by its sync view through WSGIHandler on a thread pool "
+        "(as under gunicorn's sync workers) with its async view through ASGIHandler on one event "
+        "loop (as under uvicorn). Both go through the whole MIDDLEWARE stack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User to send the requests as.")
+        parser.add_argument("--route", choices=ROUTES, default="blog-list")
+        parser.add_argument("--query", default="", help="Query string, e.g. 'cursor=&search=django'.")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=100)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        kwargs = {}
+        if options["route"] == "blog-detail":
+            kwargs["pk"] = Blog.objects.filter(author=user).values_list("pk", flat=True).first()
+            if kwargs["pk"] is None:
+                raise CommandError("blog-detail needs a user with at least one blog")
+
+        name = options["route"]
+        request_path = reverse(name, kwargs=kwargs)
+        authorization = f"Bearer {AccessToken.for_user(user)}"
+        sync_view, async_view_class = ROUTES[name]
+        count, concurrency = options["requests"], options["concurrency"]
+
+        query = f"?{options['query']}" if options["query"] else ""
+        self.stdout.write(f"GET {request_path}{query}, {count} requests, concurrency {concurrency}")
+        sync_only = [
+            middleware for middleware in settings.MIDDLEWARE
+            if not getattr(import_string(middleware), "async_capable", False)
+        ]
+        if sync_only:
+            self.stdout.write(f"Sync-only middleware, the async view runs on a thread: {', '.join(sync_only)}")
+
+        with override_settings(ALLOWED_HOSTS=["*"], ROOT_URLCONF=route_urlconf(name, sync_view)):
+            self.report("sync", *self.run_sync(request_path, options["query"], authorization, count, concurrency))
+        async_view = async_view_class.as_view(sync_view=sync_view)
+        with override_settings(ALLOWED_HOSTS=["*"], ROOT_URLCONF=route_urlconf(name, async_view)):
+            result = asyncio.run(self.run_async(request_path, options["query"], authorization, count, concurrency))
+            self.report("async", *result)
+
+    def run_sync(self, request_path, query, authorization, count, concurrency):
+        handler = WSGIHandler()
+        remaining = iter(range(count))
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    environ = {
+                        "REQUEST_METHOD": "GET",
+                        "SCRIPT_NAME": "",
+                        "PATH_INFO": request_path,
+                        "QUERY_STRING": query,
+                        "SERVER_NAME": "localhost",
+                        "SERVER_PORT": "80",
+                        "SERVER_PROTOCOL": "HTTP/1.1",
+                        "HTTP_HOST": "localhost",
+                        "HTTP_AUTHORIZATION": authorization,
+                        "wsgi.input": io.BytesIO(),
+                        "wsgi.errors": sys.stderr,
+                        "wsgi.url_scheme": "http",
+                    }
+                    statuses = []
+                    start = time.perf_counter()
+                    response = handler(environ, lambda status, headers: statuses.append(status))
+                    b"".join(response)
+                    # Sends request_finished, as the WSGI server would
+                    response.close()
+                    latencies.append(time.perf_counter() - start)
+                    if not statuses[0].startswith("200"):
+                        errors.append(statuses[0])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start, latencies, errors
+
+    async def run_async(self, request_path, query, authorization, count, concurrency):
+        handler = ASGIHandler()
+        remaining = iter(range(count))
+        latencies, errors = [], []
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": request_path,
+            "raw_path": request_path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"localhost"), (b"authorization", authorization.encode())],
+            "client": ("127.0.0.1", 0),
+            "server": ("localhost", 80),
+        }
+
+        async def worker():
+            # The event loop is single threaded, so no lock is needed
+            while next(remaining, None) is not None:
+                messages = [{"type": "http.request", "body": b"", "more_body": False}]
+                statuses = []
+
+                async def receive():
+                    if messages:
+                        return messages.pop()
+                    # The client never disconnects
+                    await asyncio.Event().wait()
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        statuses.append(message["status"])
+
+                start = time.perf_counter()
+                await handler(dict(scope), receive, send)
+                latencies.append(time.perf_counter() - start)
+                if statuses[0] != 200:
+                    errors.append(statuses[0])
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, latencies, errors
+
+    def report(self, label, elapsed, latencies, errors):
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        self.stdout.write(
+            f"{label:>5}: {len(latencies) / elapsed:8.1f} req/s, "
+            f"p50 {quantiles[49] * 1000:7.2f} ms, p95 {quantiles[94] * 1000:7.2f} ms, "
+            f"p99 {quantiles[98] * 1000:7.2f} ms, {len(errors)} errors"
+        )
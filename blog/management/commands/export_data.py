@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework import serializers
+
+from account.exports import UserExport
+from blog.exports import BlogExport, BlogSharingExport
+from common.export import EXPORT_RENDERERS
+
+EXPORTS = {export.name: export for export in (BlogExport, BlogSharingExport, UserExport)}
+
+
+class Command(BaseCommand):
+    help = "Stream every blog, share or user to a file (or stdout) as NDJSON or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("export", choices=EXPORTS)
+        parser.add_argument("--format", choices=EXPORT_RENDERERS, default="ndjson")
+        parser.add_argument("--updated-since", help="Only rows updated at or after this ISO 8601 datetime.")
+        parser.add_argument("--output", help="File to write to, stdout by default.")
+        parser.add_argument("--chunk-size", type=int, help="Rows fetched from the database at a time.")
+
+    def handle(self, *args, **options):
+        export = EXPORTS[options["export"]]()
+        if options["chunk_size"]:
+            export.chunk_size = options["chunk_size"]
+
+        try:
+            updated_since = export.parse_updated_since(options["updated_since"])
+            rows = export.rows(updated_since=updated_since)
+        except serializers.ValidationError as exc:
+            raise CommandError(exc.detail["updated_since"][0])
+
+        renderer = EXPORT_RENDERERS[options["format"]]()
+        chunks = renderer.stream(list(export.columns), rows)
+        if options["output"]:
+            # newline="" so the csv module's line endings are kept as they are
+            with open(options["output"], "w", encoding=renderer.charset, newline="") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
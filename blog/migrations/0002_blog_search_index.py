@@ -0,0 +1,56 @@
+from django.db import migrations
+
+
+POSTGRES_FORWARDS = [
+    "ALTER TABLE blog_blog ADD COLUMN search_vector tsvector",
+    "CREATE INDEX blog_blog_search_vector_gin ON blog_blog USING gin (search_vector)",
+    """
+    UPDATE blog_blog AS b SET search_vector =
+        setweight(to_tsvector('english', coalesce(b.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(b.content, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')), 'C')
+    FROM account_user AS u
+    WHERE u.id = b.author_id
+    """,
+]
+
+POSTGRES_BACKWARDS = [
+    "DROP INDEX IF EXISTS blog_blog_search_vector_gin",
+    "ALTER TABLE blog_blog DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARDS = [
+    "CREATE VIRTUAL TABLE blog_blog_fts USING fts5(blog_id UNINDEXED, title, content, author)",
+    """
+    INSERT INTO blog_blog_fts (blog_id, title, content, author)
+    SELECT b.id, b.title, b.content, u.first_name || ' ' || u.last_name
+    FROM blog_blog AS b
+    INNER JOIN account_user AS u ON u.id = b.author_id
+    """,
+]
+
+SQLITE_BACKWARDS = [
+    "DROP TABLE IF EXISTS blog_blog_fts",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0001_initial'),
+        ('account', '0003_alter_user_is_verified'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({"postgresql": POSTGRES_FORWARDS, "sqlite": SQLITE_FORWARDS}),
+            run_statements({"postgresql": POSTGRES_BACKWARDS, "sqlite": SQLITE_BACKWARDS}),
+        ),
+    ]
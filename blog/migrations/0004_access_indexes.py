@@ -0,0 +1,64 @@
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from common.db.operations import AddIndexOnline, AddUniqueConstraintOnline
+
+
+def remove_duplicate_shares(apps, schema_editor):
+    # Keep the first share of a blog with a user
+    BlogSharing = apps.get_model('blog', 'BlogSharing')
+    shares = BlogSharing.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        shares.values('blog', 'shared_with')
+        .annotate(first=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        shares.filter(blog=duplicate['blog'], shared_with=duplicate['shared_with']).exclude(
+            id=duplicate['first']
+        ).delete()
+
+
+class Migration(migrations.Migration):
+    # Indexes are built concurrently on PostgreSQL (see common.db.operations)
+    atomic = False
+
+    dependencies = [
+        ('blog', '0003_blog_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_shares, migrations.RunPython.noop, atomic=True),
+        AddUniqueConstraintOnline(
+            model_name='blogsharing',
+            constraint=models.UniqueConstraint(fields=('blog', 'shared_with'), name='blog_sharing_unique_share'),
+        ),
+        AddIndexOnline(
+            model_name='blogsharing',
+            index=models.Index(fields=['shared_with', 'id'], name='blog_sharing_shared_with_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blogsharing',
+            index=models.Index(fields=['owner', 'id'], name='blog_sharing_owner_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blog',
+            index=models.Index(fields=['created_at', 'id'], name='blog_created_at_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blog',
+            index=models.Index(fields=['updated_at', 'id'], name='blog_updated_at_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blog',
+            index=models.Index(fields=['title', 'id'], name='blog_title_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blog',
+            index=models.Index(fields=['author', 'created_at'], name='blog_author_created_at_idx'),
+        ),
+        AddIndexOnline(
+            model_name='blog',
+            index=models.Index(fields=['author', 'updated_at'], name='blog_author_updated_at_idx'),
+        ),
+    ]
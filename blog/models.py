@@ -2,6 +2,23 @@ import uuid
 from django.db import models
 from django.conf import settings
 
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 200
+
+
+def summarize(content):
+    """
+    Return the (excerpt, word count, reading time in minutes) of `content`.
+    The excerpt is the start of the text with whitespace collapsed, cut at a
+    word boundary to at most EXCERPT_LENGTH characters.
+    """
+    words = content.split()
+    excerpt = " ".join(words)
+    if len(excerpt) > EXCERPT_LENGTH:
+        excerpt = excerpt[:EXCERPT_LENGTH - 1].rsplit(" ", 1)[0] + "\u2026"
+    reading_time = -(-len(words) // WORDS_PER_MINUTE)
+    return excerpt, len(words), reading_time
+
 
 # Blog model
 class Blog(models.Model):
@@ -13,10 +30,40 @@ class Blog(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Derived from content on save, so lists can leave content out. NULL
+    # until filled in by the backfill_excerpts command for older rows.
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH, blank=True, default="", editable=False)
+    word_count = models.PositiveIntegerField(null=True, editable=False)
+    reading_time = models.PositiveIntegerField(null=True, editable=False, help_text="Minutes")
+
+    class Meta:
+        indexes = [
+            # Keyset pages of the blog list: created_at, the default, and
+            # ?ordering=updated_at or ?ordering=title
+            models.Index(fields=["created_at", "id"], name="blog_created_at_idx"),
+            models.Index(fields=["updated_at", "id"], name="blog_updated_at_idx"),
+            models.Index(fields=["title", "id"], name="blog_title_idx"),
+            # An author's blogs by date, e.g. the author half of the feed
+            models.Index(fields=["author", "created_at"], name="blog_author_created_at_idx"),
+            models.Index(fields=["author", "updated_at"], name="blog_author_updated_at_idx"),
+        ]
 
     def __str__(self):
         return self.title
 
+    def update_summary(self):
+        self.excerpt, self.word_count, self.reading_time = summarize(self.content)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            if "content" not in self.get_deferred_fields():
+                self.update_summary()
+        elif "content" in update_fields:
+            self.update_summary()
+            kwargs["update_fields"] = {*update_fields, "excerpt", "word_count", "reading_time"}
+        super().save(*args, **kwargs)
+
 
 class BlogSharing(models.Model):
     owner = models.ForeignKey(
@@ -29,5 +76,15 @@ class BlogSharing(models.Model):
     )
     blog = models.ForeignKey(Blog, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["blog", "shared_with"], name="blog_sharing_unique_share"),
+        ]
+        indexes = [
+            # Shared blogs and authors-with-access lists, in -id keyset pages
+            models.Index(fields=["shared_with", "id"], name="blog_sharing_shared_with_idx"),
+            models.Index(fields=["owner", "id"], name="blog_sharing_owner_idx"),
+        ]
+
     def __str__(self):
         return f"{self.owner} shared with {self.shared_with}"
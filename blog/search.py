@@ -0,0 +1,190 @@
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+from .models import Blog
+
+# Text search configuration used to build the PostgreSQL search vector.
+SEARCH_CONFIG = "english"
+
+# Relative weights of the indexed columns (title, content, author name).
+SQLITE_WEIGHTS = (10.0, 4.0, 2.0)
+
+
+class BaseSearchBackend:
+    """
+    Keeps the blog search index in sync and runs ranked searches against it.
+    The index lives outside the Django model state, so every statement here
+    is written against the database tables directly.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        quote = connection.ops.quote_name
+        self.blog_table = quote(Blog._meta.db_table)
+        self.user_table = quote(Blog._meta.get_field("author").related_model._meta.db_table)
+
+    def _pk(self, value):
+        return Blog._meta.pk.get_db_prep_value(value, self.connection)
+
+    def update_blogs(self, blog_ids):
+        blog_ids = [self._pk(pk) for pk in blog_ids]
+        if blog_ids:
+            placeholders = ", ".join(["%s"] * len(blog_ids))
+            self.reindex(f"b.id IN ({placeholders})", blog_ids)
+
+    def add_blogs(self, blog_ids):
+        """
+        Index blogs that are not in the index yet, e.g. right after a bulk
+        insert, which sends no post_save signals.
+        """
+        self.update_blogs(blog_ids)
+
+    def update_author(self, author_id):
+        self.reindex("b.author_id = %s", [self._pk(author_id)])
+
+    def rebuild(self):
+        self.reindex("1 = 1", [])
+
+    def remove_blogs(self, blog_ids):
+        pass
+
+    def reindex(self, where, params):
+        raise NotImplementedError
+
+    def search(self, queryset, terms):
+        raise NotImplementedError
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Weighted tsvector stored in blog_blog.search_vector and backed by a GIN index.
+    """
+
+    def reindex(self, where, params):
+        sql = f"""
+            UPDATE {self.blog_table} AS b SET search_vector =
+                setweight(to_tsvector(%s, coalesce(b.title, '')), 'A') ||
+                setweight(to_tsvector(%s, coalesce(b.content, '')), 'B') ||
+                setweight(to_tsvector(%s, coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')), 'C')
+            FROM {self.user_table} AS u
+            WHERE u.id = b.author_id AND {where}
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, [SEARCH_CONFIG] * 3 + list(params))
+
+    def search(self, queryset, terms):
+        query = " ".join(terms)
+        tsquery = "websearch_to_tsquery(%s, %s)"
+        return queryset.filter(
+            RawSQL(
+                f"{self.blog_table}.search_vector @@ {tsquery}",
+                [SEARCH_CONFIG, query],
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                f"ts_rank_cd({self.blog_table}.search_vector, {tsquery})",
+                [SEARCH_CONFIG, query],
+                output_field=FloatField(),
+            )
+        ).order_by("-search_rank", "-id")
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    FTS5 virtual table (blog_blog_fts) used when running against SQLite.
+    """
+
+    fts_table = "blog_blog_fts"
+
+    def add_blogs(self, blog_ids):
+        # blog_id is not indexed in the FTS table, skip the DELETE scanning it
+        blog_ids = [self._pk(pk) for pk in blog_ids]
+        if blog_ids:
+            placeholders = ", ".join(["%s"] * len(blog_ids))
+            self.reindex(f"b.id IN ({placeholders})", blog_ids, replace=False)
+
+    def reindex(self, where, params, replace=True):
+        with self.connection.cursor() as cursor:
+            if replace:
+                cursor.execute(
+                    f"DELETE FROM {self.fts_table} WHERE blog_id IN "
+                    f"(SELECT b.id FROM {self.blog_table} AS b WHERE {where})",
+                    params,
+                )
+            cursor.execute(
+                f"""
+                INSERT INTO {self.fts_table} (blog_id, title, content, author)
+                SELECT b.id, b.title, b.content, u.first_name || ' ' || u.last_name
+                FROM {self.blog_table} AS b
+                INNER JOIN {self.user_table} AS u ON u.id = b.author_id
+                WHERE {where}
+                """,
+                params,
+            )
+
+    def remove_blogs(self, blog_ids):
+        blog_ids = [self._pk(pk) for pk in blog_ids]
+        if blog_ids:
+            placeholders = ", ".join(["%s"] * len(blog_ids))
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {self.fts_table} WHERE blog_id IN ({placeholders})",
+                    blog_ids,
+                )
+
+    def search(self, queryset, terms):
+        # Quote every term so user input is never parsed as FTS5 query syntax
+        query = " ".join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        weights = ", ".join(str(weight) for weight in SQLITE_WEIGHTS)
+        return queryset.filter(
+            RawSQL(
+                f"{self.blog_table}.id IN (SELECT blog_id FROM {self.fts_table} "
+                f"WHERE {self.fts_table} MATCH %s)",
+                [query],
+                output_field=BooleanField(),
+            )
+        ).annotate(
+            # bm25() is lower for better matches, negate it so higher ranks first
+            search_rank=RawSQL(
+                f"SELECT -bm25({self.fts_table}, 0.0, {weights}) FROM {self.fts_table} "
+                f"WHERE {self.fts_table} MATCH %s AND {self.fts_table}.blog_id = {self.blog_table}.id",
+                [query],
+                output_field=FloatField(),
+            )
+        ).order_by("-search_rank", "-id")
+
+
+SEARCH_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using=None):
+    """
+    Return the search backend for the given database alias, or None when the
+    database has no full-text index (searches then fall back to icontains).
+    """
+    connection = connections[using or router.db_for_write(Blog)]
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+
+class BlogSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over blog title, content and author name.
+    Results are ordered by relevance unless an explicit ?ordering= is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        backend = get_search_backend(queryset.db)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+        return backend.search(queryset, terms)
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from .models import Blog, BlogSharing
 from account.serializers import UserSerializer
 
@@ -8,6 +9,27 @@ class BlogSerializer(serializers.ModelSerializer):
     class Meta:
         model = Blog
         fields = ["id", "title", "content", "author"]
+        # str(author) is the author's email, for common.fastpath
+        row_sources = {"author": "author__email"}
+
+
+class BlogSummarySerializer(serializers.ModelSerializer):
+    author = serializers.CharField(read_only=True)
+    class Meta:
+        model = Blog
+        fields = ["id", "title", "excerpt", "word_count", "reading_time", "author"]
+        row_sources = {"author": "author__email"}
+
+
+class FeedSerializer(serializers.ModelSerializer):
+    author = serializers.CharField(read_only=True)
+    # Annotated by FeedView: False for the user's own blogs
+    shared = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Blog
+        fields = ["id", "title", "content", "author", "created_at", "updated_at", "shared"]
+        row_sources = {"author": "author__email", "shared": "shared"}
 
 
 class BlogEditSerializer(serializers.ModelSerializer):
@@ -16,11 +38,23 @@ class BlogEditSerializer(serializers.ModelSerializer):
         fields = ["id", "title", "content"]
 
 
+ALREADY_SHARED_MESSAGE = "This blog is already shared with this user."
+
+
 class BlogSharingSerializer(serializers.ModelSerializer):
     owner = serializers.CharField(read_only=True)
     class Meta:
         model = BlogSharing
         fields = ["owner", "shared_with", "blog"]
+        row_sources = {"owner": "owner__email"}
+        # DRF only derives these from unique_together, not UniqueConstraint
+        validators = [
+            UniqueTogetherValidator(
+                queryset=BlogSharing.objects.all(),
+                fields=["blog", "shared_with"],
+                message=ALREADY_SHARED_MESSAGE,
+            ),
+        ]
 
 
 class AuthorsWithAccessSerializer(serializers.ModelSerializer):
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Blog
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Blog)
+def update_blog_search_index(sender, instance, **kwargs):
+    backend = get_search_backend(kwargs.get("using"))
+    if backend is not None:
+        backend.update_blogs([instance.pk])
+
+
+@receiver(post_delete, sender=Blog)
+def remove_blog_from_search_index(sender, instance, **kwargs):
+    backend = get_search_backend(kwargs.get("using"))
+    if backend is not None:
+        backend.remove_blogs([instance.pk])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_author_search_index(sender, instance, created, update_fields, **kwargs):
+    # New users have no blogs yet, and saves that don't touch the name
+    # (e.g. the last_login update on every login) leave the index untouched.
+    if created:
+        return
+    if update_fields is not None and not {"first_name", "last_name"} & set(update_fields):
+        return
+
+    backend = get_search_backend(kwargs.get("using"))
+    if backend is not None:
+        backend.update_author(instance.pk)
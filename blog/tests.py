@@ -1,10 +1,22 @@
-from django.test import TestCase
+import csv
+import json
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 from django.contrib.auth import get_user_model
-from .models import Blog, BlogSharing
-from .serializers import BlogSerializer, BlogSharingSerializer
+from common.testing import QueryBudgetMixin
+from .async_views import AsyncListView, AsyncRetrieveView
+from .models import EXCERPT_LENGTH, Blog, BlogSharing
+from .serializers import ALREADY_SHARED_MESSAGE, BlogSerializer, BlogSharingSerializer
+from . import urls
 
 User = get_user_model()
 
@@ -72,6 +84,11 @@ class BlogSharingViewTestCase(TestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(BlogSharing.objects.count(), 1)
+
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], [ALREADY_SHARED_MESSAGE])
+        self.assertEqual(BlogSharing.objects.count(), 1)
     
 
 class AuthorsWithAccessViewTestCase(TestCase):
@@ -100,3 +117,638 @@ class AuthorsWithAccessViewTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
+
+    def test_authors_with_access_query_count_is_fixed(self):
+        for i in range(5):
+            other = User.objects.create_user(
+                email=f'other{i}@example.com',
+                password='testpassword',
+                first_name='Jane',
+                last_name='Roe',
+            )
+            blog = Blog.objects.create(title=f'Blog {i}', content='Content', author=self.user)
+            BlogSharing.objects.create(owner=self.user, shared_with=other, blog=blog)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('authors-with-access'))
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(response.data[0]['blog']['author'], 'testuser@example.com')
+
+
+class BlogSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('blog-list')
+
+    def search(self, term):
+        response = self.client.get(self.url, {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [blog['title'] for blog in response.data['results']]
+
+    def test_search_ranks_title_matches_first(self):
+        Blog.objects.create(title='Gardening notes', content='Tomatoes need sun.', author=self.user)
+        Blog.objects.create(title='Tomatoes', content='A short post.', author=self.user)
+        Blog.objects.create(title='Unrelated', content='Nothing here.', author=self.user)
+        self.assertEqual(self.search('tomatoes'), ['Tomatoes', 'Gardening notes'])
+
+    def test_search_by_author_name(self):
+        Blog.objects.create(title='First', content='Content', author=self.user)
+        self.assertEqual(self.search('doe'), ['First'])
+
+    def test_index_follows_blog_and_author_changes(self):
+        blog = Blog.objects.create(title='Draft', content='Content', author=self.user)
+        blog.title = 'Published'
+        blog.save()
+        self.assertEqual(self.search('draft'), [])
+        self.assertEqual(self.search('published'), ['Published'])
+
+        self.user.last_name = 'Smith'
+        self.user.save()
+        self.assertEqual(self.search('smith'), ['Published'])
+
+        blog.delete()
+        self.assertEqual(self.search('published'), [])
+
+    def test_search_input_is_not_parsed_as_query_syntax(self):
+        Blog.objects.create(title='Quotes', content='Content', author=self.user)
+        self.assertEqual(self.search('"quotes OR ('), [])
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('blog-list')
+        for i in range(20):
+            Blog.objects.create(title=f'Blog {i % 7}', content='Content', author=self.user)
+
+    def walk(self, url, params=None, link='next'):
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            pages.append([blog['id'] for blog in response.data['results']])
+            if not response.data[link]:
+                if link == 'previous':
+                    pages.reverse()
+                return sum(pages, []), response
+            response = self.client.get(response.data[link])
+
+    def test_pages_follow_created_at_then_id(self):
+        ids, last_page = self.walk(self.url, {'cursor': ''})
+        expected = [str(pk) for pk in Blog.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        self.assertEqual(ids, expected)
+
+        # Walking back from the last page returns the earlier pages in order
+        previous_ids, _ = self.walk(last_page.data['previous'], link='previous')
+        self.assertEqual(previous_ids, expected[:len(previous_ids)])
+
+    def test_pages_honour_ordering_param(self):
+        ids, _ = self.walk(self.url, {'cursor': '', 'ordering': 'title', 'records per page': 3})
+        expected = [str(pk) for pk in Blog.objects.order_by('title', 'id').values_list('id', flat=True)]
+        self.assertEqual(ids, expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_record_mode_is_default(self):
+        response = self.client.get(self.url, {'record': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual(len(response.data['results']), 8)
+
+
+class BlogQueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    query_budgets = {
+        # The list GET's ETag comes from the page, no aggregate is added
+        'blog-list': {'get': 2, 'post': 3},
+        'blog-detail': {'get': 1, 'patch': 4},
+        'blog-export': 1,
+        # Includes the (blog, shared_with) uniqueness check
+        'share-blog': 4,
+        'share-export': 1,
+        'shared-blogs': 1,
+        'authors-with-access': 1,
+        'blog-feed': 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Roe',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for i in range(20):
+            blog = Blog.objects.create(title=f'Blog {i}', content='Content', author=self.other)
+            BlogSharing.objects.create(owner=self.other, shared_with=self.user, blog=blog)
+            BlogSharing.objects.create(owner=self.user, shared_with=self.other, blog=blog)
+        self.blog = Blog.objects.create(title='Mine', content='Content', author=self.user)
+
+    def test_every_url_has_a_budget(self):
+        self.assertQueryBudgetsCover(urls.urlpatterns)
+
+    def test_blog_urls_within_budget(self):
+        self.assertQueryBudget('blog-list')
+        self.assertQueryBudget('blog-list', data={'search': 'blog'})
+        self.assertQueryBudget('blog-list', method='post', data={'title': 'New', 'content': 'Content'})
+        self.assertQueryBudget('blog-detail', args=[self.blog.id])
+        self.assertQueryBudget('blog-detail', method='patch', args=[self.blog.id], data={'title': 'Renamed'})
+        self.assertQueryBudget('share-blog', method='post', data={'shared_with': self.other.id, 'blog': self.blog.id})
+        self.assertQueryBudget('shared-blogs')
+        self.assertQueryBudget('authors-with-access')
+        self.assertQueryBudget('blog-feed')
+        self.assertQueryBudget('blog-export')
+        self.assertQueryBudget('share-export', data={'format': 'csv'})
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.assertQueryCountIndependentOfPageSize('blog-list')
+        self.assertQueryCountIndependentOfPageSize('blog-list', data={'cursor': ''})
+        self.assertQueryCountIndependentOfPageSize('shared-blogs', data={'cursor': ''})
+        self.assertQueryCountIndependentOfPageSize('authors-with-access', data={'cursor': ''})
+        self.assertQueryCountIndependentOfPageSize('blog-feed')
+
+
+class AsyncBlogViewsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Roe',
+        )
+        for i in range(10):
+            blog = Blog.objects.create(title=f'Blog {i}', content='Content', author=self.other)
+            BlogSharing.objects.create(owner=self.other, shared_with=self.user, blog=blog)
+            BlogSharing.objects.create(owner=self.user, shared_with=self.other, blog=blog)
+        self.blog = Blog.objects.create(title='Mine', content='Content', author=self.user)
+
+        self.auth = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth['Authorization'])
+        self.factory = AsyncRequestFactory()
+
+    def async_get(self, view_class, sync_view, path, data=None, headers=None, **kwargs):
+        view = view_class.as_view(sync_view=sync_view)
+        request = self.factory.get(path, data, headers=self.auth if headers is None else headers)
+        return async_to_sync(view)(request, **kwargs)
+
+    def assertSameAsSync(self, view_class, sync_view, name, data=None, **kwargs):
+        path = reverse(name, kwargs=kwargs)
+        expected = self.client.get(path, data)
+        response = self.async_get(view_class, sync_view, path, data, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_list_views_match_sync_views(self):
+        self.assertSameAsSync(AsyncListView, urls.blog_list, 'blog-list')
+        self.assertSameAsSync(AsyncListView, urls.blog_list, 'blog-list', {'record': 2})
+        self.assertSameAsSync(AsyncListView, urls.blog_list, 'blog-list', {'record': 9})
+        self.assertSameAsSync(AsyncListView, urls.blog_list, 'blog-list', {'cursor': '', 'ordering': 'title'})
+        self.assertSameAsSync(AsyncListView, urls.blog_list, 'blog-list', {'search': 'mine'})
+        self.assertSameAsSync(AsyncListView, urls.shared_blogs, 'shared-blogs')
+        self.assertSameAsSync(AsyncListView, urls.feed, 'blog-feed', {'records per page': 4})
+        self.assertSameAsSync(AsyncListView, urls.authors_with_access, 'authors-with-access', {'cursor': ''})
+
+    def test_cursor_links_can_be_followed(self):
+        path = reverse('blog-list')
+        response = self.async_get(AsyncListView, urls.blog_list, path, {'cursor': '', 'records per page': 4})
+        next_link = json.loads(response.content)['next']
+        expected = self.client.get(next_link)
+        response = self.async_get(AsyncListView, urls.blog_list, next_link)
+        self.assertEqual(json.loads(response.content), json.loads(expected.content))
+
+    def test_retrieve_matches_sync_view(self):
+        self.assertSameAsSync(AsyncRetrieveView, urls.blog_detail, 'blog-detail', pk=self.blog.id)
+        self.assertSameAsSync(AsyncRetrieveView, urls.blog_detail, 'blog-detail', pk='not-a-uuid')
+
+    def test_conditional_get(self):
+        # Like the sync views: the list's count and page, the object's timestamp
+        for view_class, sync_view, path, queries in (
+            (AsyncListView, urls.blog_list, reverse('blog-list'), 2),
+            (AsyncRetrieveView, urls.blog_detail, reverse('blog-detail', kwargs={'pk': self.blog.id}), 1),
+        ):
+            kwargs = {'pk': self.blog.id} if view_class is AsyncRetrieveView else {}
+            expected = self.client.get(path)
+            response = self.async_get(view_class, sync_view, path, **kwargs)
+            self.assertEqual(response['ETag'], expected['ETag'])
+            self.assertEqual(response.get('Last-Modified'), expected.get('Last-Modified'))
+
+            headers = {**self.auth, 'If-None-Match': response['ETag']}
+            with self.assertNumQueries(queries):
+                not_modified = self.async_get(view_class, sync_view, path, headers=headers, **kwargs)
+            self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(not_modified['ETag'], response['ETag'])
+            self.assertEqual(not_modified.content, b'')
+
+        path = reverse('blog-detail', kwargs={'pk': self.blog.id})
+        headers = {**self.auth, 'If-Modified-Since': expected['Last-Modified']}
+        response = self.async_get(AsyncRetrieveView, urls.blog_detail, path, headers=headers, pk=self.blog.id)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Blog.objects.filter(pk=self.blog.pk).update(updated_at=timezone.now() + timedelta(seconds=1))
+        headers = {**self.auth, 'If-None-Match': expected['ETag']}
+        response = self.async_get(AsyncRetrieveView, urls.blog_detail, path, headers=headers, pk=self.blog.id)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], expected['ETag'])
+
+    def test_requires_authentication(self):
+        path = reverse('blog-list')
+        response = self.async_get(AsyncListView, urls.blog_list, path, headers={})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+        response = self.async_get(AsyncListView, urls.blog_list, path, headers={'Authorization': 'Bearer invalid'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_writes_are_handled_by_sync_view(self):
+        view = AsyncListView.as_view(sync_view=urls.blog_list)
+        request = self.factory.post(
+            reverse('blog-list'),
+            {'title': 'Async', 'content': 'Content'},
+            content_type='application/json',
+            headers=self.auth,
+        )
+        response = async_to_sync(view)(request)
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Blog.objects.filter(title='Async', author=self.user).exists())
+
+
+
+class FastReadPathTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Roe',
+        )
+        for i in range(12):
+            blog = Blog.objects.create(title=f'Blog {i} \u2028 é', content=f'Content {i}', author=self.other)
+            BlogSharing.objects.create(owner=self.other, shared_with=self.user, blog=blog)
+            BlogSharing.objects.create(owner=self.user, shared_with=self.other, blog=blog)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def assertSamePayload(self, name, data=None):
+        path = reverse(name)
+        with override_settings(FAST_READ_PATH=False):
+            expected = self.client.get(path, data)
+        response = self.client.get(path, data)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_list_payloads_match_serializers(self):
+        self.assertSamePayload('blog-list')
+        self.assertSamePayload('blog-list', {'record': 2})
+        self.assertSamePayload('blog-list', {'ordering': '-title'})
+        self.assertSamePayload('blog-list', {'search': 'content'})
+        self.assertSamePayload('shared-blogs')
+        self.assertSamePayload('authors-with-access')
+
+        response = self.assertSamePayload('blog-list', {'cursor': '', 'ordering': 'updated_at'})
+        next_link = json.loads(response.content)['next']
+        with override_settings(FAST_READ_PATH=False):
+            expected = self.client.get(next_link)
+        self.assertEqual(self.client.get(next_link).content, expected.content)
+
+        response = self.assertSamePayload('authors-with-access', {'cursor': '', 'records per page': 5})
+        self.assertIsNotNone(json.loads(response.content)['next'])
+
+    def test_async_list_uses_row_mapper(self):
+        view = AsyncListView.as_view(sync_view=urls.authors_with_access)
+        request = AsyncRequestFactory().get(
+            reverse('authors-with-access'),
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        response = async_to_sync(view)(request)
+        with override_settings(FAST_READ_PATH=False):
+            expected = self.client.get(reverse('authors-with-access'))
+        self.assertEqual(response.content, expected.content)
+
+
+class ConditionalRequestTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.blog = Blog.objects.create(title='Blog', content='Content', author=self.user)
+        Blog.objects.create(title='Other', content='Other content', author=self.user)
+        self.detail_url = reverse('blog-detail', kwargs={'pk': self.blog.id})
+        self.list_url = reverse('blog-list')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_detail_not_modified(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(self.detail_url, {'title': 'Changed'}, format='json')
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['title'], 'Changed')
+
+    def test_detail_unknown_object(self):
+        url = reverse('blog-detail', kwargs={'pk': 'not-a-uuid'})
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_not_modified(self):
+        # The page's COUNT and SELECT, no aggregate for the ETag
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        cursor_etag = self.client.get(self.list_url, {'cursor': ''})['ETag']
+        response = self.client.get(self.list_url, {'cursor': ''}, HTTP_IF_NONE_MATCH=cursor_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        with override_settings(FAST_READ_PATH=False):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.list_url, {'search': 'other'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        self.client.patch(self.detail_url, {'title': 'Changed'}, format='json')
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        Blog.objects.filter(pk=self.blog.pk).delete()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_update_precondition(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'title': 'First'}, format='json')
+
+        response = self.client.patch(self.detail_url, {'title': 'Second'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.title, 'First')
+
+        etag = self.client.get(self.detail_url)['ETag']
+        response = self.client.patch(self.detail_url, {'title': 'Second'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.detail_url)['ETag'], response['ETag'])
+        self.blog.refresh_from_db()
+        self.assertEqual(self.blog.title, 'Second')
+
+
+class BlogSummaryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.blog = Blog.objects.create(title='Long', content='word  \n' * 450, author=self.user)
+        Blog.objects.create(title='Short', content='Just a few words.', author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_summary_computed_on_save(self):
+        self.assertEqual(self.blog.word_count, 450)
+        self.assertEqual(self.blog.reading_time, 3)
+        self.assertLessEqual(len(self.blog.excerpt), EXCERPT_LENGTH)
+        self.assertTrue(self.blog.excerpt.startswith('word word'))
+        self.assertTrue(self.blog.excerpt.endswith('word\u2026'))
+
+        self.blog.content = 'Two words'
+        self.blog.save(update_fields=['content'])
+        self.blog.refresh_from_db()
+        self.assertEqual((self.blog.excerpt, self.blog.word_count, self.blog.reading_time), ('Two words', 2, 1))
+
+    def test_summary_list(self):
+        url = reverse('blog-list')
+        response = self.client.get(url, {'summary': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        blogs = {blog['title']: blog for blog in response.data['results']}
+        self.assertNotIn('content', blogs['Long'])
+        self.assertEqual(blogs['Short']['excerpt'], 'Just a few words.')
+        self.assertEqual(blogs['Short']['word_count'], 4)
+        self.assertEqual(blogs['Long']['author'], self.user.email)
+
+        with override_settings(FAST_READ_PATH=False):
+            expected = self.client.get(url, {'summary': 'true'})
+        self.assertEqual(response.content, expected.content)
+
+        self.assertIn('content', self.client.get(url).data['results'][0])
+        detail = self.client.get(reverse('blog-detail', kwargs={'pk': self.blog.id}), {'summary': 'true'})
+        self.assertEqual(detail.data['content'], self.blog.content)
+
+    def test_backfill_excerpts(self):
+        Blog.objects.update(excerpt='', word_count=None, reading_time=None)
+        updated_at = Blog.objects.get(pk=self.blog.pk).updated_at
+        output = StringIO()
+        call_command('backfill_excerpts', '--batch-size', '1', stdout=output)
+        self.assertIn('Updated 2 blogs', output.getvalue())
+
+        blog = Blog.objects.get(pk=self.blog.pk)
+        self.assertEqual((blog.word_count, blog.reading_time), (450, 3))
+        self.assertEqual(blog.updated_at, updated_at)
+
+        call_command('backfill_excerpts', stdout=output)
+        self.assertIn('Updated 0 blogs', output.getvalue())
+
+
+class FeedTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Roe',
+        )
+        now = timezone.now()
+        for i in range(6):
+            author = self.user if i % 2 else self.other
+            blog = Blog.objects.create(title=f'Blog {i}', content='Content', author=author)
+            if author == self.other and i < 4:
+                BlogSharing.objects.create(owner=self.other, shared_with=self.user, blog=blog)
+            Blog.objects.filter(pk=blog.pk).update(updated_at=now - timedelta(minutes=i))
+        self.url = reverse('blog-feed')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_own_and_shared_blogs_by_update(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        # Blog 4 is the other author's and not shared
+        self.assertEqual([blog['title'] for blog in results], ['Blog 0', 'Blog 1', 'Blog 2', 'Blog 3', 'Blog 5'])
+        self.assertEqual([blog['shared'] for blog in results], [True, False, True, False, False])
+        self.assertEqual(results[0]['author'], self.other.email)
+        self.assertEqual(results[0]['content'], 'Content')
+
+        with override_settings(FAST_READ_PATH=False):
+            expected = self.client.get(self.url)
+        self.assertEqual(response.content, expected.content)
+
+    def test_keyset_pages(self):
+        titles = []
+        response = self.client.get(self.url, {'records per page': 2})
+        while True:
+            titles += [blog['title'] for blog in response.data['results']]
+            if response.data['next'] is None:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(titles, ['Blog 0', 'Blog 1', 'Blog 2', 'Blog 3', 'Blog 5'])
+
+        self.other.is_active = False
+        self.other.save()
+        response = self.client.get(self.url)
+        self.assertEqual([blog['title'] for blog in response.data['results']], ['Blog 1', 'Blog 3', 'Blog 5'])
+
+    def test_union_of_own_and_shared_blogs(self):
+        own = Blog.objects.filter(author=self.user).first()
+        # Shared with its own author, still listed once
+        BlogSharing.objects.create(owner=self.user, shared_with=self.user, blog=own)
+        with self.assertNumQueries(1) as queries:
+            response = self.client.get(self.url)
+        self.assertIn('UNION ALL', queries.captured_queries[0]['sql'])
+        titles = [blog['title'] for blog in response.data['results']]
+        self.assertEqual(titles, ['Blog 0', 'Blog 1', 'Blog 2', 'Blog 3', 'Blog 5'])
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='testuser@example.com',
+            password='testpassword',
+            first_name='John',
+            last_name='Doe',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com',
+            password='testpassword',
+            first_name='Jane',
+            last_name='Roe',
+        )
+        self.third = User.objects.create_user(
+            email='third@example.com',
+            password='testpassword',
+            first_name='Jim',
+            last_name='Poe',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.blogs = [
+            Blog.objects.create(title=f'Blog {i}', content=f'Content "{i}",\nmore', author=self.user)
+            for i in range(5)
+        ]
+        BlogSharing.objects.create(owner=self.user, shared_with=self.other, blog=self.blogs[0])
+        BlogSharing.objects.create(owner=self.other, shared_with=self.third, blog=self.blogs[1])
+
+    def read_ndjson(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_blog_export_ndjson(self):
+        response = self.client.get(reverse('blog-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertIn('blogs.ndjson', response['Content-Disposition'])
+        rows = self.read_ndjson(response)
+        self.assertEqual([row['id'] for row in rows], [str(blog.id) for blog in self.blogs])
+        self.assertEqual(rows[0]['author'], 'testuser@example.com')
+        self.assertEqual(rows[0]['content'], 'Content "0",\nmore')
+
+    def test_blog_export_csv(self):
+        response = self.client.get(reverse('blog-export'), HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'title', 'content', 'author', 'created_at', 'updated_at'])
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][2], 'Content "0",\nmore')
+
+    def test_blog_export_updated_since(self):
+        Blog.objects.filter(pk__in=[blog.pk for blog in self.blogs[:3]]).update(
+            updated_at=timezone.now() - timedelta(days=2)
+        )
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = self.read_ndjson(self.client.get(reverse('blog-export'), {'updated_since': since}))
+        self.assertEqual([row['id'] for row in rows], [str(blog.id) for blog in self.blogs[3:]])
+
+        response = self.client.get(reverse('blog-export'), {'updated_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('updated_since', json.loads(response.content))
+
+    def test_share_export_only_includes_own_shares(self):
+        rows = self.read_ndjson(self.client.get(reverse('share-export')))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['shared_with'], 'other@example.com')
+
+    def test_export_data_command(self):
+        out = StringIO()
+        call_command('export_data', 'shares', '--format', 'csv', stdout=out)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['id', 'blog', 'owner', 'shared_with'])
+        self.assertEqual(len(rows), 3)
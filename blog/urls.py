@@ -1,16 +1,37 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncListView, AsyncRetrieveView
 from .views import (
     BlogViewset,
+    BlogExportView,
     BlogSharingView,
+    BlogSharingExportView,
     SharedBlogsListView,
     AuthorsWithAccessView,
+    FeedView,
 )
 
+
+def select_view(name, sync_view, async_view_class):
+    # Routes named in settings.ASYNC_VIEWS are served by their async variant
+    if name in getattr(settings, "ASYNC_VIEWS", []):
+        return async_view_class.as_view(sync_view=sync_view)
+    return sync_view
+
+
+blog_list = BlogViewset.as_view({"get": "list", "post": "create"})
+blog_detail = BlogViewset.as_view({"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"})
+shared_blogs = SharedBlogsListView.as_view()
+authors_with_access = AuthorsWithAccessView.as_view()
+feed = FeedView.as_view()
+
 urlpatterns = [
-    path("", BlogViewset.as_view({"get": "list", "post": "create"}), name="blog-list"),
-    path("blogs/<str:pk>/", BlogViewset.as_view({"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}), name="blog-detail"),
+    path("", select_view("blog-list", blog_list, AsyncListView), name="blog-list"),
+    path("feed/", select_view("blog-feed", feed, AsyncListView), name="blog-feed"),
+    path("export/", BlogExportView.as_view(), name="blog-export"),
+    path("blogs/<str:pk>/", select_view("blog-detail", blog_detail, AsyncRetrieveView), name="blog-detail"),
     path("share/", BlogSharingView.as_view(), name="share-blog"),
-    path("shared-blogs/", SharedBlogsListView.as_view(), name="shared-blogs"),
-    path("authors-with-access/", AuthorsWithAccessView.as_view(), name="authors-with-access"),
+    path("share/export/", BlogSharingExportView.as_view(), name="share-export"),
+    path("shared-blogs/", select_view("shared-blogs", shared_blogs, AsyncListView), name="shared-blogs"),
+    path("authors-with-access/", select_view("authors-with-access", authors_with_access, AsyncListView), name="authors-with-access"),
 ]
-
@@ -1,39 +1,78 @@
-from rest_framework import viewsets, generics, permissions, filters, status
+from django.db import IntegrityError
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from django.utils.decorators import method_decorator
+from rest_framework import viewsets, generics, permissions, filters, serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 from .models import Blog, BlogSharing
 from .serializers import (
+    ALREADY_SHARED_MESSAGE,
     BlogEditSerializer,
     BlogSerializer,
     BlogSharingSerializer,
+    BlogSummarySerializer,
     AuthorsWithAccessSerializer,
+    FeedSerializer,
 )
+from common.conditional import ConditionalMixin
+from common.export import ExportView
+from common.fastpath import FastReadMixin, RowMapper
 from common.permissions import IsBlogOwnerOrReadOnly, IsBlogOwnerOrSharedWith
-from common.pagination import CustomPagination
-from drf_yasg.utils import swagger_auto_schema
+from common.pagination import CursorOrRecordPagination, OptionalCursorPagination, UnionKeysetPagination
+from common.replicas import ReplicaReadMixin
+from common.swagger import swagger_auto_schema
+from .exports import BlogExport, BlogSharingExport
+from .search import BlogSearchFilter
 
-class BlogViewset(viewsets.ModelViewSet):
+@method_decorator(name="list", decorator=swagger_auto_schema(lambda openapi: {"manual_parameters": [
+    openapi.Parameter(
+        "summary",
+        openapi.IN_QUERY,
+        description="Return excerpt, word_count and reading_time instead of the full content.",
+        type=openapi.TYPE_BOOLEAN,
+    ),
+]}))
+class BlogViewset(ReplicaReadMixin, ConditionalMixin, FastReadMixin, viewsets.ModelViewSet):
     queryset = Blog.objects.all()
     serializer_class = BlogSerializer
+    row_mapper = RowMapper(BlogSerializer)
+    summary_row_mapper = RowMapper(BlogSummarySerializer)
+    summary_query_param = "summary"
     permission_classes = [permissions.IsAuthenticated]
-    pagination_class = CustomPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CursorOrRecordPagination
+    keyset_ordering = ("-created_at",)
+    filter_backends = [BlogSearchFilter, filters.OrderingFilter]
     search_fields = [
         "title",
         "content",
-        "blog_author.fullname",
         "author__first_name",
         "author__last_name",
-    ]  # Fields to search
+    ]  # Fields to search when the database has no full-text index
     ordering_fields = ["title", "created_at", "updated_at"]  # Fields to order by
 
     def get_queryset(self):
+        # The serializer renders the author, so load it in the same query
+        queryset = super().get_queryset().select_related("author")
+        if self.is_summary():
+            queryset = queryset.defer("content")
         if self.request.user.is_staff or self.request.user.is_superuser:
-            return super().get_queryset()
-        
+            return queryset
+
         # Filter based on the author's (user's) is_active field
-        return super().get_queryset().filter(author__is_active=True)
+        return queryset.filter(author__is_active=True)
     
+    # Lists with ?summary=true leave out the content for its stored excerpt
+    def is_summary(self):
+        # No request when the schema is generated ahead of time
+        if self.action != "list" or self.request is None:
+            return False
+        value = self.request.query_params.get(self.summary_query_param, "")
+        return value.lower() in serializers.BooleanField.TRUE_VALUES
+
+    def get_row_mapper(self):
+        return self.summary_row_mapper if self.is_summary() else self.row_mapper
+
     # Override the perform_create method to set the author field
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
@@ -42,6 +81,8 @@ class BlogViewset(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action in ["update", "partial_update"]:
             return BlogEditSerializer
+        if self.is_summary():
+            return BlogSummarySerializer
         return super().get_serializer_class()
 
     # Define a get_permissions method that sets custom permissions based on the action
@@ -59,26 +100,85 @@ class BlogSharingView(APIView):
         serializer = BlogSharingSerializer(data=request.data)
         if serializer.is_valid():
             # Set the owner of the shared blog post to the currently authenticated user
-            serializer.save(owner=request.user)
+            try:
+                serializer.save(owner=request.user)
+            except IntegrityError:
+                # Shared by a concurrent request since the validation. Not in
+                # a transaction, so the failed insert leaves nothing to undo.
+                errors = {api_settings.NON_FIELD_ERRORS_KEY: [ALREADY_SHARED_MESSAGE]}
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SharedBlogsListView(generics.ListAPIView):
+class SharedBlogsListView(ReplicaReadMixin, FastReadMixin, generics.ListAPIView):
     queryset = BlogSharing.objects.all()
     serializer_class = BlogSharingSerializer
+    row_mapper = RowMapper(BlogSharingSerializer)
     permission_classes = [permissions.IsAuthenticated, IsBlogOwnerOrSharedWith]
+    pagination_class = OptionalCursorPagination
+    keyset_ordering = ("-id",)
 
     def get_queryset(self):
         # Filter blogs shared with the currently authenticated author
-        return BlogSharing.objects.filter(shared_with=self.request.user)
+        return BlogSharing.objects.filter(shared_with=self.request.user).select_related("owner")
 
 
-class AuthorsWithAccessView(generics.ListAPIView):
+class AuthorsWithAccessView(ReplicaReadMixin, FastReadMixin, generics.ListAPIView):
     queryset = BlogSharing.objects.all()
     serializer_class = AuthorsWithAccessSerializer
+    row_mapper = RowMapper(AuthorsWithAccessSerializer)
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalCursorPagination
+    keyset_ordering = ("-id",)
 
     def get_queryset(self):
         # Filter the BlogSharing objects to get authors with access to each blog
-        return BlogSharing.objects.filter(owner=self.request.user)
+        return BlogSharing.objects.filter(owner=self.request.user).select_related(
+            "owner", "shared_with", "blog__author"
+        )
+
+
+class FeedView(ReplicaReadMixin, FastReadMixin, generics.ListAPIView):
+    """
+    The user's own blogs and the blogs shared with them in one list, most
+    recently updated first, with full payloads and keyset pages.
+    """
+
+    queryset = Blog.objects.all()
+    serializer_class = FeedSerializer
+    row_mapper = RowMapper(FeedSerializer)
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = UnionKeysetPagination
+    keyset_ordering = ("-updated_at",)
+
+    def get_queryset(self):
+        # Narrowed to the user's blogs by get_keyset_branches()
+        user = self.request.user
+        return (
+            Blog.objects.filter(author__is_active=True)
+            .annotate(shared=ExpressionWrapper(~Q(author=user), output_field=BooleanField()))
+            .select_related("author")
+        )
+
+    def get_keyset_branches(self, queryset):
+        """
+        Own blogs, read from the (author, updated_at) index, and blogs shared
+        with the user, found through the (shared_with, id) index. A blog is
+        shared with a user once, so the join adds no duplicates.
+        """
+        user = self.request.user
+        return [
+            queryset.filter(author=user),
+            queryset.filter(blogsharing__shared_with=user).exclude(author=user),
+        ]
+
+
+class BlogExportView(ExportView):
+    export_class = BlogExport
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class BlogSharingExportView(ExportView):
+    export_class = BlogSharingExport
+    permission_classes = [permissions.IsAuthenticated]
@@ -6,6 +6,7 @@ pip install -r requirements.txt
 
 # python manage.py collectstatic --no-input
 python manage.py migrate
+python manage.py generate_schema
 
 if [[ $CREATE_SUPERUSER ]]; then
   export DJANGO_SUPERUSER_EMAIL=admin@gmail.com
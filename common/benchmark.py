@@ -0,0 +1,380 @@
+"""
+Load and latency benchmark for the API routes, used by the bench_api command.
+
+A dataset is seeded under BENCH_DOMAIN, then each scenario is replayed with
+a fixed number of requests and workers, either in-process through Django's
+test client or over HTTP against a running server.
+"""
+import json
+import os
+import re
+import resource
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from account.models import OutboxEmail, UserProfile
+from blog.models import Blog, BlogSharing
+
+from .datagen import WORDS, DataGenerator
+from .querycount import QueryRecorder
+
+User = get_user_model()
+
+BENCH_DOMAIN = "bench.invalid"
+BENCH_PASSWORD = "bench-Passw0rd!"
+
+
+@dataclass
+class Dataset:
+    users: list
+    staff: object
+    blogs: dict  # user pk -> blog pks
+    tokens: dict = field(default_factory=dict)  # user pk -> (access, refresh)
+
+    def user(self, i):
+        return self.users[i % len(self.users)]
+
+    def access(self, user):
+        return self.tokens[user.pk][0]
+
+    def refresh(self, user):
+        return self.tokens[user.pk][1]
+
+
+def seed_dataset(users=50, blogs_per_user=20, shares_per_user=5, seed=0):
+    """
+    Create `users` users (plus one staff user) under BENCH_DOMAIN, each with
+    `blogs_per_user` blogs shared with the next `shares_per_user` users.
+    Shares are laid out deterministically so the share-blog scenario can
+    pick pairs that don't exist yet.
+    """
+    generator = DataGenerator(
+        users,
+        posts_per_author=f"fixed:{blogs_per_user}",
+        shares_per_blog="fixed:0",
+        content_words="uniform:50:300",
+        domain=BENCH_DOMAIN,
+        password=BENCH_PASSWORD,
+        inactive_ratio=0,
+        seed=seed,
+    )
+    generator.run()
+
+    people = list(User.objects.filter(email__startswith=f"{generator.prefix}-").order_by("email"))
+    staff = User.objects.bulk_create([User(
+        email=f"{generator.prefix}-staff@{BENCH_DOMAIN}",
+        first_name="Bench",
+        last_name="Staff",
+        password=people[0].password if people else make_password(BENCH_PASSWORD),
+        is_staff=True,
+    )])[0]
+    UserProfile.objects.bulk_create([UserProfile(user=staff)])
+
+    by_author = {}
+    blogs = Blog.objects.filter(author__in=people).order_by("created_at", "id").values_list("author_id", "id")
+    for author_id, blog_id in blogs:
+        by_author.setdefault(author_id, []).append(blog_id)
+
+    BlogSharing.objects.bulk_create([
+        BlogSharing(owner=owner, shared_with=people[(i + offset) % users], blog_id=by_author[owner.pk][offset - 1])
+        for i, owner in enumerate(people)
+        for offset in range(1, min(shares_per_user, users - 1, blogs_per_user) + 1)
+    ])
+
+    dataset = Dataset(users=people, staff=staff, blogs=by_author)
+    for user in [*people, staff]:
+        refresh = RefreshToken.for_user(user)
+        dataset.tokens[user.pk] = (str(refresh.access_token), str(refresh))
+    return dataset
+
+
+def remove_dataset():
+    # Blogs, shares and profiles go with their users
+    User.objects.filter(email__endswith=f"@{BENCH_DOMAIN}").delete()
+    OutboxEmail.objects.filter(to__0__endswith=f"@{BENCH_DOMAIN}").delete()
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    data: dict = None
+    token: str = None
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: object  # (dataset, i) -> Request
+
+
+def _blog(dataset, i):
+    user = dataset.user(i)
+    blogs = dataset.blogs[user.pk]
+    return user, blogs[(i // len(dataset.users)) % len(blogs)]
+
+
+def _share(dataset, i):
+    # Each request adds a new share (duplicates are rejected): the blog
+    # changes fastest, then the recipient, starting half way round from the
+    # seeded shares
+    user, blog = _blog(dataset, i)
+    n = len(dataset.users)
+    rounds = i // n // len(dataset.blogs[user.pk])
+    recipient = dataset.users[(dataset.users.index(user) + n // 2 + rounds) % n]
+    return Request("post", reverse("share-blog"), {"shared_with": str(recipient.pk), "blog": str(blog)}, dataset.access(user))
+
+
+SCENARIOS = [
+    Scenario("login", lambda d, i: Request(
+        "post", reverse("token_obtain_pair"), {"email": d.user(i).email, "password": BENCH_PASSWORD})),
+    Scenario("register", lambda d, i: Request("post", reverse("register"), {
+        "email": f"{uuid.uuid4().hex}@{BENCH_DOMAIN}", "password": BENCH_PASSWORD,
+        "first_name": "Bench", "last_name": "User",
+    })),
+    Scenario("token-refresh", lambda d, i: Request(
+        "post", reverse("token_refresh"), {"refresh": d.refresh(d.user(i))})),
+    Scenario("blog-list", lambda d, i: Request("get", reverse("blog-list"), None, d.access(d.user(i)))),
+    Scenario("blog-list-cursor", lambda d, i: Request(
+        "get", reverse("blog-list"), {"cursor": ""}, d.access(d.user(i)))),
+    Scenario("blog-list-search", lambda d, i: Request(
+        "get", reverse("blog-list"), {"search": WORDS[i % len(WORDS)]}, d.access(d.user(i)))),
+    Scenario("blog-list-ordering", lambda d, i: Request(
+        "get", reverse("blog-list"), {"ordering": "-title"}, d.access(d.user(i)))),
+    Scenario("blog-list-summary", lambda d, i: Request(
+        "get", reverse("blog-list"), {"summary": "true"}, d.access(d.user(i)))),
+    Scenario("blog-feed", lambda d, i: Request("get", reverse("blog-feed"), None, d.access(d.user(i)))),
+    Scenario("blog-create", lambda d, i: Request(
+        "post", reverse("blog-list"), {"title": f"Bench {i}", "content": " ".join(WORDS)}, d.access(d.user(i)))),
+    Scenario("blog-detail", lambda d, i: Request(
+        "get", reverse("blog-detail", args=[_blog(d, i)[1]]), None, d.access(_blog(d, i)[0]))),
+    Scenario("blog-update", lambda d, i: Request(
+        "patch", reverse("blog-detail", args=[_blog(d, i)[1]]), {"title": f"Edited {i}"}, d.access(_blog(d, i)[0]))),
+    Scenario("share-blog", _share),
+    Scenario("shared-blogs", lambda d, i: Request("get", reverse("shared-blogs"), None, d.access(d.user(i)))),
+    Scenario("authors-with-access", lambda d, i: Request(
+        "get", reverse("authors-with-access"), None, d.access(d.user(i)))),
+    Scenario("blog-export", lambda d, i: Request("get", reverse("blog-export"), None, d.access(d.user(i)))),
+    Scenario("blog-export-csv", lambda d, i: Request(
+        "get", reverse("blog-export"), {"format": "csv"}, d.access(d.user(i)))),
+    Scenario("share-export", lambda d, i: Request("get", reverse("share-export"), None, d.access(d.user(i)))),
+    Scenario("user-list", lambda d, i: Request("get", reverse("user-list"), None, d.access(d.staff))),
+    Scenario("user-export", lambda d, i: Request("get", reverse("user-export"), None, d.access(d.staff))),
+    Scenario("user-detail", lambda d, i: Request(
+        "get", reverse("user-detail", args=[d.user(i).pk]), None, d.access(d.user(i)))),
+    Scenario("user-profile", lambda d, i: Request(
+        "get", reverse("user-profile", args=[d.user(i).pk]), None, d.access(d.user(i)))),
+]
+
+# Routes not replayed, with the reason
+SKIPPED_ROUTES = {
+    "confirm-email": "needs a token from the confirmation email",
+    "password_reset": "needs a token from the reset email",
+    "change_password": "would lock the dataset's users out",
+    "healthz": "liveness probe, not part of the API",
+    "metrics": "scraped by Prometheus, not part of the API",
+    "openapi-schema": "static file generated at build time",
+    "schema-swagger-ui": "static file generated at build time",
+    "profile-list": "staff debugging tool",
+    "profile-detail": "staff debugging tool",
+    "profile-download": "staff debugging tool",
+}
+
+
+class InProcessDriver:
+    """
+    Sends requests through the full middleware stack with Django's test
+    client and counts the queries each one runs.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def send(self, request):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = Client()
+
+        extra = {"HTTP_AUTHORIZATION": f"Bearer {request.token}"} if request.token else {}
+        with QueryRecorder() as recorder:
+            if request.method == "get":
+                response = client.get(request.path, request.data, **extra)
+            else:
+                response = getattr(client, request.method)(
+                    request.path, json.dumps(request.data), content_type="application/json", **extra
+                )
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response.status_code, recorder.count
+
+    def close(self):
+        connections.close_all()
+
+
+# Written by common.telemetry.TelemetryMiddleware
+SERVER_TIMING_QUERIES = re.compile(r'\bdb;[^,]*desc="(\d+) queries"')
+
+
+class HTTPDriver:
+    """
+    Sends requests to a running server, e.g. gunicorn started from the same
+    settings so it sees the seeded dataset. Query counts are read from the
+    Server-Timing header when the server sends one.
+    """
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def send(self, request):
+        url = self.base_url + request.path
+        body = None
+        headers = {"Accept": "application/json"}
+        if request.token:
+            headers["Authorization"] = f"Bearer {request.token}"
+        if request.method == "get":
+            if request.data:
+                url = f"{url}?{urlencode(request.data)}"
+        else:
+            body = json.dumps(request.data).encode()
+            headers["Content-Type"] = "application/json"
+
+        http_request = urllib.request.Request(url, data=body, headers=headers, method=request.method.upper())
+        try:
+            with urllib.request.urlopen(http_request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, self.queries(response.headers)
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            return exc.code, self.queries(exc.headers)
+
+    @staticmethod
+    def queries(headers):
+        match = SERVER_TIMING_QUERIES.search(headers.get("Server-Timing", ""))
+        return int(match.group(1)) if match else None
+
+    def close(self):
+        pass
+
+
+def run_scenario(driver, scenario, dataset, requests=100, concurrency=1, warmup=5, server_pid=None):
+    for i in range(warmup):
+        driver.send(scenario.build(dataset, i))
+
+    # Build every request up front so URL reversing isn't timed
+    pending = iter([scenario.build(dataset, warmup + i) for i in range(requests)])
+    lock = threading.Lock()
+    latencies, queries, errors = [], [], []
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    return
+                start = time.perf_counter()
+                status, count = driver.send(request)
+                latencies.append(time.perf_counter() - start)
+                if count is not None:
+                    queries.append(count)
+                if status >= 400:
+                    errors.append(status)
+        finally:
+            driver.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if len(latencies) > 1 else latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(quantiles[49] * 1000, 3),
+        "p95_ms": round(quantiles[94] * 1000, 3),
+        "p99_ms": round(quantiles[98] * 1000, 3),
+        "queries": round(statistics.mean(queries), 2) if queries else None,
+        "peak_rss_kb": server_peak_rss(server_pid) if server_pid else own_peak_rss(),
+    }
+
+
+def own_peak_rss():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def server_peak_rss(pid):
+    """
+    Highest peak RSS (VmHWM) among a server process and its descendants,
+    i.e. the gunicorn master and its workers. Linux only.
+    """
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The process name is in parentheses and may contain spaces
+                parents[int(entry)] = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+
+    family = {pid}
+    while True:
+        children = {child for child, parent in parents.items() if parent in family} - family
+        if not children:
+            break
+        family |= children
+
+    peak = 0
+    for process in family:
+        try:
+            with open(f"/proc/{process}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        peak = max(peak, int(line.split()[1]))
+        except OSError:
+            continue
+    return peak or None
+
+
+def compare(baseline, results, threshold=0.1):
+    """
+    Yield (route, metric, before, after, regressed) for every metric of the
+    routes present in both runs. Throughput may not drop, latency and peak
+    RSS may not grow, by more than `threshold`; the query count may not grow.
+    """
+    for route, after in results.items():
+        before = baseline.get(route)
+        if before is None:
+            continue
+        for metric in ("throughput", "p50_ms", "p95_ms", "p99_ms", "queries", "peak_rss_kb"):
+            old, new = before.get(metric), after.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "throughput":
+                regressed = new < old * (1 - threshold)
+            elif metric == "queries":
+                regressed = new > old
+            else:
+                regressed = new > old * (1 + threshold)
+            yield route, metric, old, new, regressed
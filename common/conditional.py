@@ -0,0 +1,168 @@
+"""
+Conditional requests (ETag / Last-Modified) for model viewsets whose model
+has a modification timestamp such as `updated_at`.
+
+Validators cover the rows' own timestamps: a change to a related object
+alone (e.g. the author's email) does not change them.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .telemetry import serializing
+
+CONDITIONAL_READ_HEADERS = ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE")
+CONDITIONAL_WRITE_HEADERS = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()[:32]
+
+
+class ConditionalMixin:
+    """
+    Adds validators to retrieve, list and update responses of a ModelViewSet:
+
+    - retrieve: ETag from the primary key and `modified_field`, and
+      Last-Modified. If-None-Match / If-Modified-Since are answered with a
+      304 after fetching only the timestamp.
+    - list: ETag from the URL, the page's links and count, and the primary
+      key and timestamp of every row on the page, so no query is added. On
+      If-None-Match the page is fetched and answered with a 304 before it is
+      serialized. Unpaginated lists get no ETag. No Last-Modified: the
+      latest timestamp does not move when a row is deleted.
+    - update: If-Match / If-Unmodified-Since are checked against the row
+      locked with SELECT ... FOR UPDATE, the same read the update does
+      anyway, and answered with a 412 when the row changed.
+    """
+
+    modified_field = "updated_at"
+
+    def get_object_etag(self, pk, modified):
+        return make_etag(pk, modified.isoformat(), self.request.accepted_renderer.format)
+
+    def set_validators(self, response, etag, modified):
+        response["ETag"] = etag
+        if modified is not None:
+            response["Last-Modified"] = http_date(modified.timestamp())
+        return response
+
+    def get_conditional_response(self, request, etag, modified):
+        """
+        The 304 or 412 response the request's preconditions call for, None
+        when the request should proceed.
+        """
+        # The 304 carries the validators too
+        headers = self.set_validators(HttpResponse(), etag, modified)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(modified.timestamp()) if modified is not None else None,
+            response=headers,
+        )
+        return None if response is headers else response
+
+    def has_conditional_headers(self, request, headers):
+        return any(header in request.META for header in headers)
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.has_conditional_headers(request, CONDITIONAL_READ_HEADERS):
+            # Read permissions do not depend on the object for these views,
+            # an unknown or hidden object falls through to the 404 below.
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = self.filter_queryset(self.get_queryset())
+            try:
+                row = (
+                    queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                    .values_list("pk", self.modified_field)
+                    .first()
+                )
+            except (TypeError, ValueError, ValidationError):
+                row = None
+            if row is not None:
+                pk, modified = row
+                response = self.get_conditional_response(request, self.get_object_etag(pk, modified), modified)
+                if response is not None:
+                    return response
+
+        instance = self.get_object()
+        with serializing():
+            data = self.get_serializer(instance).data
+        modified = getattr(instance, self.modified_field)
+        return self.set_validators(Response(data), self.get_object_etag(instance.pk, modified), modified)
+
+    def list(self, request, *args, **kwargs):
+        self.list_etag = self.not_modified = None
+        response = super().list(request, *args, **kwargs)
+        if self.not_modified is not None:
+            return self.not_modified
+        if self.list_etag is not None:
+            self.set_validators(response, self.list_etag, None)
+        return response
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is None:
+            return None
+        self.list_etag = self.get_page_etag(page, queryset.model._meta.pk.name)
+        self.not_modified = self.get_conditional_response(self.request, self.list_etag, None)
+        # list() answers with the 304, leave nothing to serialize
+        return [] if self.not_modified is not None else page
+
+    def get_page_etag(self, page, pk_name):
+        envelope = self.paginator.get_paginated_response([]).data
+        rows = (
+            (row[pk_name], row[self.modified_field]) if isinstance(row, dict)
+            else (getattr(row, pk_name), getattr(row, self.modified_field))
+            for row in page
+        )
+        return make_etag(
+            self.request.get_full_path(),
+            self.request.accepted_renderer.format,
+            *(f"{key}={value}" for key, value in envelope.items() if key != "results"),
+            *(f"{pk}@{modified.isoformat()}" for pk, modified in rows),
+        )
+
+    def get_row_queryset(self, queryset):
+        rows = super().get_row_queryset(queryset)
+        # Page ETags read each row's timestamp
+        if self.modified_field not in rows.query.values_select:
+            rows = rows.values(*rows.query.values_select, *rows.query.annotation_select, self.modified_field)
+        return rows
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "lock_object", False):
+            queryset = queryset.select_for_update(of=("self",))
+        return queryset
+
+    def update(self, request, *args, **kwargs):
+        if not self.has_conditional_headers(request, CONDITIONAL_WRITE_HEADERS):
+            response = super().update(request, *args, **kwargs)
+            return self.set_validators(response, *self.updated_validators())
+
+        with transaction.atomic():
+            self.lock_object = True
+            instance = self.get_object()
+            modified = getattr(instance, self.modified_field)
+            response = self.get_conditional_response(request, self.get_object_etag(instance.pk, modified), modified)
+            if response is not None:
+                return response
+
+            serializer = self.get_serializer(instance, data=request.data, partial=kwargs.pop("partial", False))
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+        return self.set_validators(Response(serializer.data), *self.updated_validators())
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        self.updated_instance = serializer.instance
+
+    def updated_validators(self):
+        modified = getattr(self.updated_instance, self.modified_field)
+        return self.get_object_etag(self.updated_instance.pk, modified), modified
@@ -0,0 +1,326 @@
+"""
+Synthetic users, profiles, blogs and shares for benchmarks and for
+reproducing slowdowns on realistic table sizes.
+
+Rows are built in memory and written in batches with multi-row INSERTs, or
+with COPY on PostgreSQL, so no model signals run: profiles are generated here,
+the search index is updated once per batch of blogs and no confirmation
+emails are queued. Every user gets the same precomputed password hash.
+Both writers skip Field.pre_save(), so the generated created_at/updated_at
+values are written as they are despite auto_now/auto_now_add.
+"""
+import csv
+import io
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from account.models import UserProfile
+from blog.models import Blog, BlogSharing
+from blog.search import get_search_backend
+
+User = get_user_model()
+
+WORDS = (
+    "the of and to in is it you that he was for on are with as his they be at one have this from or had by "
+    "word but what some we can out other were all there when up use your how said an each she which do their "
+    "time if will way about many then them write would like so these her long make thing see him two has look "
+    "more day could go come did number sound no most people my over know water than call first who may down "
+    "side been now find any new work part take get place made live where after back little only round man year "
+    "came show every good me give our under name very through just form sentence great think say help low line "
+    "differ turn cause much mean before move right boy old too same tell does set three want air well also play "
+    "small end put home read hand port large spell add even land here must big high such follow act why ask men "
+    "change went light kind off need house picture try us again animal point mother world near build self earth "
+    "father head stand own page should country found answer school grow study still learn plant cover food sun "
+    "four between state keep eye never last let thought city tree cross farm hard start might story saw far sea "
+    "draw left late run while press close night real life few north open seem together next white children begin"
+).split()
+
+FIRST_NAMES = (
+    "James Mary John Patricia Robert Jennifer Michael Linda David Elizabeth William Barbara Richard Susan Joseph "
+    "Jessica Thomas Sarah Chinedu Ngozi Emeka Amaka Tunde Funmi Ibrahim Aisha Kwame Ama Wei Mei Hiroshi Yuki "
+    "Carlos Lucia Mateo Sofia Lukas Emma Noah Olivia Arjun Priya Omar Layla"
+).split()
+
+LAST_NAMES = (
+    "Smith Johnson Williams Brown Jones Garcia Miller Davis Rodriguez Martinez Okafor Ibejih Adeyemi Mensah Chen "
+    "Wang Tanaka Sato Silva Santos Muller Schmidt Kumar Sharma Haddad Khan Novak Kowalski Rossi Dubois"
+).split()
+
+
+class Distribution:
+    """
+    Non-negative integer distribution parsed from a "kind:arg:arg" spec:
+
+        fixed:N          always N
+        uniform:A:B      any integer from A to B
+        normal:MEAN:SD   rounded, negative draws become 0
+        exponential:MEAN mostly small values, a few large ones
+        zipf:ALPHA:MAX   power law capped at MAX, most values are 0 or 1
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "exponential": 1, "zipf": 2}
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, *args = spec.split(":")
+        if kind not in self.KINDS or len(args) != self.KINDS[kind]:
+            raise ValueError(f"Invalid distribution {spec!r}, see Distribution for the supported forms")
+        try:
+            self.args = [float(arg) for arg in args]
+        except ValueError:
+            raise ValueError(f"Invalid distribution {spec!r}, arguments must be numbers")
+        self.kind = kind
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return int(self.args[0])
+        if self.kind == "uniform":
+            return rng.randint(int(self.args[0]), int(self.args[1]))
+        if self.kind == "normal":
+            return max(0, round(rng.gauss(*self.args)))
+        if self.kind == "exponential":
+            return int(rng.expovariate(1 / self.args[0])) if self.args[0] > 0 else 0
+        alpha, cap = self.args
+        return min(int(cap), int(rng.paretovariate(alpha)) - 1)
+
+    def __str__(self):
+        return self.spec
+
+
+def prepared_rows(model, objs, connection):
+    """
+    The concrete fields of `model` other than its AutoField, and the values
+    of `objs` for them as the database expects them.
+    """
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, models.AutoField)]
+    rows = [[field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields] for obj in objs]
+    return fields, rows
+
+
+class BulkWriter:
+    """
+    Multi-row INSERTs written by hand, as bulk_create() would replace the
+    generated timestamps with the current time.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.connection = connections[using]
+
+    def write(self, model, objs):
+        fields, rows = prepared_rows(model, objs, self.connection)
+        quote = self.connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in fields)
+        row_placeholders = f"({', '.join(['%s'] * len(fields))})"
+        # Stays under the backend's limit on query parameters
+        batch_size = self.connection.ops.bulk_batch_size(fields, objs)
+        with self.connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {quote(model._meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join([row_placeholders] * len(batch))}",
+                    [value for row in batch for value in row],
+                )
+
+
+class CopyWriter:
+    """
+    Streams rows into PostgreSQL with COPY ... FROM STDIN, several times
+    faster than multi-row INSERTs for large batches.
+    """
+
+    NULL = r"\N"
+
+    def __init__(self, using):
+        self.using = using
+        self.connection = connections[using]
+
+    def write(self, model, objs):
+        fields, rows = prepared_rows(model, objs, self.connection)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([self.NULL if value is None else value for value in row])
+        buffer.seek(0)
+
+        quote = self.connection.ops.quote_name
+        columns = ", ".join(quote(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{self.NULL}')",
+                buffer,
+            )
+
+
+class DataGenerator:
+    """
+    Generates `users` users with a profile each, a number of blogs per
+    author drawn from `posts_per_author`, and shares per blog drawn from
+    `shares_per_blog`, spread over the last `days` days. Emails are
+    "<prefix>-<n>@<domain>" so a run can be found (and removed) afterwards.
+    """
+
+    def __init__(
+        self,
+        users,
+        posts_per_author="exponential:5",
+        shares_per_blog="zipf:2:20",
+        content_words="normal:400:150",
+        domain="generated.invalid",
+        password="generated-Passw0rd!",
+        days=365,
+        inactive_ratio=0.02,
+        batch_size=5000,
+        seed=None,
+        using="default",
+        method="auto",
+        progress=None,
+    ):
+        self.users = users
+        self.posts_per_author = Distribution(posts_per_author)
+        self.shares_per_blog = Distribution(shares_per_blog)
+        self.content_words = Distribution(content_words)
+        self.domain = domain
+        self.password = password
+        self.days = days
+        self.inactive_ratio = inactive_ratio
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.prefix = f"{self.rng.getrandbits(32):08x}"
+        self.using = using
+        self.progress = progress or (lambda counts: None)
+
+        vendor = connections[using].vendor
+        if method == "auto":
+            method = "copy" if vendor == "postgresql" else "bulk"
+        if method == "copy" and vendor != "postgresql":
+            raise ValueError("COPY is only available on PostgreSQL")
+        self.writer = CopyWriter(using) if method == "copy" else BulkWriter(using)
+        self.method = method
+        self.counts = {"users": 0, "profiles": 0, "blogs": 0, "shares": 0}
+
+    def run(self):
+        start = time.perf_counter()
+        self.now = timezone.now()
+        users = self.generate_users()
+        self.generate_blogs(users)
+        self.counts["seconds"] = round(time.perf_counter() - start, 2)
+        return self.counts
+
+    def uuid(self):
+        # Drawn from the seeded generator so a seed reproduces the same rows
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def moment(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        return start + (self.now - start) * self.rng.random()
+
+    def sentence(self, words):
+        text = " ".join(self.rng.choices(WORDS, k=words))
+        return text[:1].upper() + text[1:]
+
+    def content(self):
+        # Drawing every word is the slowest part of a run, so content is
+        # assembled from a pool of ready-made sentences of 6-20 words.
+        if not hasattr(self, "sentences"):
+            self.sentences = [self.sentence(self.rng.randint(6, 20)) + "." for _ in range(5000)]
+        words = self.content_words.sample(self.rng)
+        return " ".join(self.rng.choices(self.sentences, k=round(words / 13)))
+
+    def generate_users(self):
+        """
+        Write the users and their profiles. Returns (id, created_at, number
+        of blogs) per user; blog counts are drawn up front so profiles can
+        carry them.
+        """
+        password = make_password(self.password)
+        users = []
+        for start in range(0, self.users, self.batch_size):
+            batch, profiles = [], []
+            for n in range(start, min(start + self.batch_size, self.users)):
+                created_at = self.moment()
+                posts = self.posts_per_author.sample(self.rng)
+                user = User(
+                    id=self.uuid(),
+                    email=f"{self.prefix}-{n}@{self.domain}",
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    password=password,
+                    is_active=self.rng.random() >= self.inactive_ratio,
+                    is_verified=True,
+                    created_at=created_at,
+                    last_login=self.moment(after=created_at) if self.rng.random() < 0.8 else None,
+                    date_joined=created_at,
+                )
+                batch.append(user)
+                profiles.append(UserProfile(
+                    user=user,
+                    bio=self.sentence(self.rng.randint(0, 30)) if self.rng.random() < 0.5 else "",
+                    gender=self.rng.choice(UserProfile.GENDER)[0],
+                    published_posts=posts,
+                ))
+                users.append((user.id, created_at, posts))
+
+            with transaction.atomic(using=self.using):
+                self.writer.write(User, batch)
+                self.writer.write(UserProfile, profiles)
+            self.counts["users"] += len(batch)
+            self.counts["profiles"] += len(profiles)
+            self.progress(self.counts)
+        return users
+
+    def generate_blogs(self, users):
+        user_ids = [user_id for user_id, _, _ in users]
+        blogs, shares = [], []
+        for author_id, joined, posts in users:
+            for _ in range(posts):
+                created_at = self.moment(after=joined)
+                edited = self.rng.random() < 0.3
+                blog = Blog(
+                    id=self.uuid(),
+                    title=self.sentence(self.rng.randint(3, 10)),
+                    content=self.content(),
+                    author_id=author_id,
+                    created_at=created_at,
+                    updated_at=self.moment(after=created_at) if edited else created_at,
+                )
+                # Blog.save() is bypassed, so derive the excerpt here
+                blog.update_summary()
+                blogs.append(blog)
+
+                fan_out = min(self.shares_per_blog.sample(self.rng), len(user_ids) - 1)
+                recipients = set()
+                while len(recipients) < fan_out:
+                    recipient = self.rng.choice(user_ids)
+                    if recipient != author_id:
+                        recipients.add(recipient)
+                shares += [
+                    BlogSharing(owner_id=author_id, shared_with_id=recipient, blog_id=blog.id)
+                    for recipient in recipients
+                ]
+
+                if len(blogs) >= self.batch_size:
+                    self.write_blogs(blogs, shares)
+                    blogs, shares = [], []
+        if blogs:
+            self.write_blogs(blogs, shares)
+
+    def write_blogs(self, blogs, shares):
+        with transaction.atomic(using=self.using):
+            self.writer.write(Blog, blogs)
+            for start in range(0, len(shares), self.batch_size):
+                self.writer.write(BlogSharing, shares[start:start + self.batch_size])
+            backend = get_search_backend(self.using)
+            if backend is not None:
+                backend.add_blogs([blog.id for blog in blogs])
+        self.counts["blogs"] += len(blogs)
+        self.counts["shares"] += len(shares)
+        self.progress(self.counts)
@@ -0,0 +1,99 @@
+"""
+PostgreSQL backend whose connections come from a per-process pool
+(common.db.pool): closing a connection, as Django does at the end of every
+request with CONN_MAX_AGE = 0, returns it to the pool.
+
+Options go in DATABASES[alias]["POOL"]:
+
+- MAX_SIZE: connections per process (shared by its threads).
+- TIMEOUT: seconds to wait for a free connection before failing.
+- MAX_LIFETIME: seconds after which a connection is closed instead of
+  reused, so server-side memory is released and DNS changes are seen.
+- HEALTH_CHECKS: run "SELECT 1" on an idle connection before handing it
+  out; broken connections are always replaced.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel, is_psycopg3
+
+from common.db.pool import get_pool
+
+if is_psycopg3:
+    from psycopg.pq import TransactionStatus
+
+    TRANSACTION_IDLE = TransactionStatus.IDLE
+else:
+    from psycopg2.extensions import TRANSACTION_STATUS_IDLE as TRANSACTION_IDLE
+
+DEFAULT_POOL_OPTIONS = {
+    "MAX_SIZE": 10,
+    "TIMEOUT": 5.0,
+    "MAX_LIFETIME": 1800.0,
+    "HEALTH_CHECKS": True,
+}
+
+
+def _is_open(connection):
+    return not connection.closed
+
+
+def _is_usable(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        # Without autocommit the check opened a transaction
+        connection.rollback()
+    except base.Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def check_settings(self):
+        super().check_settings()
+        if self.settings_dict["CONN_MAX_AGE"] != 0:
+            raise ImproperlyConfigured(
+                "The pooled PostgreSQL backend needs CONN_MAX_AGE = 0: connections go back to the pool "
+                "when Django closes them."
+            )
+
+    @property
+    def pool(self):
+        options = {**DEFAULT_POOL_OPTIONS, **self.settings_dict.get("POOL", {})}
+        return get_pool(self.alias, {
+            "max_size": options["MAX_SIZE"],
+            "timeout": options["TIMEOUT"],
+            "max_lifetime": options["MAX_LIFETIME"],
+            "check": _is_usable if options["HEALTH_CHECKS"] else _is_open,
+        })
+
+    def get_new_connection(self, conn_params):
+        connection = self.pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        # Set by the parent's get_new_connection() for new connections only
+        self.isolation_level = IsolationLevel(
+            self.settings_dict["OPTIONS"].get("isolation_level", IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # A connection with errors is only closed by Django when unusable
+        discard = self.errors_occurred or connection.closed
+        if not discard and connection.info.transaction_status != TRANSACTION_IDLE:
+            # Closed inside a transaction: do not hand it over half done
+            try:
+                connection.rollback()
+            except base.Database.Error:
+                discard = True
+        if not discard and not connection.autocommit:
+            # Closed inside atomic(): the next user expects autocommit, and
+            # the health check expects no transaction to be opened
+            try:
+                connection.autocommit = True
+            except base.Database.Error:
+                discard = True
+        self.pool.release(connection, discard=discard)
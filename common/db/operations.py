@@ -0,0 +1,57 @@
+"""
+Migration operations that build indexes without blocking writes on
+PostgreSQL, so they can be applied while the app is serving traffic. They
+cannot run in a transaction there: migrations using them set
+`atomic = False`. Other databases run the plain operation.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import NotSupportedError, migrations
+
+
+def _is_postgresql(schema_editor):
+    return schema_editor.connection.vendor == "postgresql"
+
+
+class AddIndexOnline(AddIndexConcurrently):
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddUniqueConstraintOnline(migrations.AddConstraint):
+    """
+    AddConstraint for a UniqueConstraint on plain fields. On PostgreSQL the
+    unique index is built concurrently and then attached as the constraint.
+    A build that fails on duplicates inserted meanwhile leaves an invalid
+    index, which is dropped when the migration is run again.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not _is_postgresql(schema_editor) or not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        if schema_editor.connection.in_atomic_block:
+            raise NotSupportedError(
+                f"{self.__class__.__name__} cannot run inside a transaction, set atomic = False on the migration"
+            )
+        if self.constraint.condition or self.constraint.expressions or self.constraint.include:
+            raise NotSupportedError(f"{self.__class__.__name__} only supports constraints on plain fields")
+
+        quote = schema_editor.quote_name
+        name = quote(self.constraint.name)
+        table = quote(model._meta.db_table)
+        columns = ", ".join(quote(model._meta.get_field(field).column) for field in self.constraint.fields)
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        schema_editor.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {name} ON {table} ({columns})")
+        schema_editor.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}")
+
+    def describe(self):
+        return f"Concurrently create constraint {self.constraint.name} on model {self.model_name}"
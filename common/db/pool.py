@@ -0,0 +1,225 @@
+"""
+Per-process pool of database connections for the pooled PostgreSQL backend
+(common.db.backends.pooled_postgresql).
+
+Connections are checked out when Django connects and returned when it
+closes them at the end of a request, so a request pays for a checkout
+instead of a TCP handshake and authentication. Pools are keyed by database
+alias and shared by the threads of a process; a forked process starts with
+empty pools.
+"""
+import atexit
+import os
+import threading
+import time
+
+from django.db import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+class ConnectionPool:
+    """
+    Up to `max_size` connections, reused most recently returned first so
+    idle ones beyond the load can age out. `acquire()` waits up to `timeout`
+    seconds for a free connection, then raises PoolTimeout. Connections
+    older than `max_lifetime` seconds are closed instead of reused, and
+    idle ones failing `check(connection)` on checkout are replaced.
+    """
+
+    def __init__(self, max_size=10, timeout=5.0, max_lifetime=1800.0, check=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check = check
+        self.pid = os.getpid()
+        self.size = 0  # Open connections, including checked out and opening ones
+        self.stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "health_check_failures": 0,
+            "closed": 0,
+        }
+        self._idle = []  # (connection, created_at), most recently returned last
+        self._checked_out = {}  # id(connection) -> created_at
+        self._condition = threading.Condition()
+
+    def expired(self, created_at):
+        return self.max_lifetime is not None and time.monotonic() - created_at >= self.max_lifetime
+
+    def acquire(self, connect):
+        """
+        A connection from the pool, or a new one from `connect()` when none
+        is idle and the pool is not full.
+        """
+        start = time.monotonic()
+        while True:
+            connection, created_at = self._take(start)
+            if connection is None:
+                try:
+                    connection = connect()
+                except BaseException:
+                    self._forget()
+                    raise
+                created_at = time.monotonic()
+                with self._condition:
+                    self.stats["connects"] += 1
+            elif self.check is not None and not self.check(connection):
+                with self._condition:
+                    self.stats["health_check_failures"] += 1
+                self._discard(connection)
+                continue
+
+            with self._condition:
+                self._checked_out[id(connection)] = created_at
+                self.stats["checkouts"] += 1
+            return connection
+
+    def _take(self, start):
+        """
+        An idle connection and its creation time, or (None, None) after
+        reserving a slot for a new one.
+        """
+        waited = False
+        with self._condition:
+            try:
+                while True:
+                    while self._idle:
+                        connection, created_at = self._idle.pop()
+                        if not self.expired(created_at):
+                            return connection, created_at
+                        self._close(connection)
+                    if self.size < self.max_size:
+                        self.size += 1
+                        return None, None
+
+                    remaining = self.timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection free after {self.timeout}s ({self.max_size} in use)"
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+            finally:
+                if waited:
+                    self.stats["waits"] += 1
+                    self.stats["wait_time"] += time.monotonic() - start
+
+    def release(self, connection, discard=False):
+        """
+        Return `connection` to the pool, or close it when `discard` is set,
+        it outlived `max_lifetime` or it does not belong to this pool.
+        """
+        with self._condition:
+            created_at = self._checked_out.pop(id(connection), None)
+            if created_at is None:
+                _close_quietly(connection)
+                return
+            if discard or self.expired(created_at) or os.getpid() != self.pid:
+                self._close(connection)
+                return
+            self._idle.append((connection, created_at))
+            self._condition.notify()
+
+    def close_idle(self):
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.pop()[0])
+
+    def snapshot(self):
+        with self._condition:
+            return {
+                **self.stats,
+                "size": self.size,
+                "idle": len(self._idle),
+                "in_use": self.size - len(self._idle),
+                "max_size": self.max_size,
+            }
+
+    def _close(self, connection):
+        # Called with the condition held
+        _close_quietly(connection)
+        self.size -= 1
+        self.stats["closed"] += 1
+        self._condition.notify()
+
+    def _discard(self, connection):
+        with self._condition:
+            self._close(connection)
+
+    def _forget(self):
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Pools inherited through fork() are kept referenced rather than closed or
+# garbage collected: their sockets are still the parent's.
+_inherited = []
+
+
+def get_pool(alias, options):
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            if pool is not None:
+                _inherited.append(pool)
+            pool = _pools[alias] = ConnectionPool(**options)
+        return pool
+
+
+def close_pools():
+    for pool in list(_pools.values()):
+        if pool.pid == os.getpid():
+            pool.close_idle()
+
+
+atexit.register(close_pools)
+
+
+def collect():
+    """
+    Pool metrics of all aliases for common.telemetry (TELEMETRY["COLLECTORS"]).
+    """
+    totals = {}
+    for pool in list(_pools.values()):
+        if pool.pid != os.getpid():
+            continue
+        for key, value in pool.snapshot().items():
+            totals[key] = totals.get(key, 0) + value
+    if not totals:
+        return []
+    return [
+        ("liberty_db_pool_connections", "gauge", "Open pooled database connections.", totals["size"]),
+        ("liberty_db_pool_connections_in_use", "gauge", "Pooled connections checked out.", totals["in_use"]),
+        ("liberty_db_pool_max_connections", "gauge", "Pool size limit.", totals["max_size"]),
+        ("liberty_db_pool_checkouts_total", "counter", "Connections checked out.", totals["checkouts"]),
+        ("liberty_db_pool_waits_total", "counter", "Checkouts that waited for a free connection.", totals["waits"]),
+        ("liberty_db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection.", totals["wait_time"]),
+        ("liberty_db_pool_timeouts_total", "counter", "Checkouts that gave up waiting.", totals["timeouts"]),
+        ("liberty_db_pool_connects_total", "counter", "Database connections opened.", totals["connects"]),
+        (
+            "liberty_db_pool_health_check_failures_total",
+            "counter",
+            "Idle connections found broken on checkout.",
+            totals["health_check_failures"],
+        ),
+    ]
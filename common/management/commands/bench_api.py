@@ -0,0 +1,163 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from common.benchmark import (
+    SCENARIOS,
+    SKIPPED_ROUTES,
+    HTTPDriver,
+    InProcessDriver,
+    compare,
+    remove_dataset,
+    run_scenario,
+    seed_dataset,
+)
+
+SCENARIO_NAMES = [scenario.name for scenario in SCENARIOS]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a benchmark dataset and replay every API route in-process or against a running "
+        "server (--base-url), reporting throughput, p50/p95/p99 latency, queries per request "
+        "and peak RSS. Results can be saved as a baseline and compared with a later run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", help="Server to benchmark, e.g. http://127.0.0.1:8000. In-process otherwise.")
+        parser.add_argument("--server-pid", type=int, help="PID of the server (gunicorn master) to read peak RSS from.")
+        parser.add_argument("--routes", nargs="+", choices=SCENARIO_NAMES, help="Only run these scenarios.")
+        parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario.")
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            help="Unmeasured requests per scenario, one per seeded user by default so caches are warm.",
+        )
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--blogs-per-user", type=int, default=20)
+        parser.add_argument("--shares-per-user", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the dataset contents.")
+        parser.add_argument("--keep", action="store_true", help="Keep the seeded dataset afterwards.")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", help="Baseline JSON file to compare the results with.")
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.1,
+            help="Relative change counted as a regression when comparing (default 0.1).",
+        )
+        parser.add_argument("--fail-on-regression", action="store_true")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+
+        if options["base_url"]:
+            driver = HTTPDriver(options["base_url"])
+        else:
+            driver = InProcessDriver()
+        scenarios = [s for s in SCENARIOS if not options["routes"] or s.name in options["routes"]]
+
+        self.stdout.write(
+            f"Seeding {options['users']} users, {options['blogs_per_user']} blogs and "
+            f"{options['shares_per_user']} shares per user"
+        )
+        dataset = seed_dataset(
+            users=options["users"],
+            blogs_per_user=options["blogs_per_user"],
+            shares_per_user=options["shares_per_user"],
+            seed=options["seed"],
+        )
+
+        results = {}
+        try:
+            # The test client sends Host: testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+                for scenario in scenarios:
+                    results[scenario.name] = result = run_scenario(
+                        driver,
+                        scenario,
+                        dataset,
+                        requests=options["requests"],
+                        concurrency=options["concurrency"],
+                        warmup=len(dataset.users) if options["warmup"] is None else options["warmup"],
+                        server_pid=options["server_pid"],
+                    )
+                    self.write_result(scenario.name, result)
+        finally:
+            if not options["keep"]:
+                remove_dataset()
+
+        self.stdout.write("Not benchmarked:")
+        for name, reason in SKIPPED_ROUTES.items():
+            self.stdout.write(f"  {name}: {reason}")
+        report = {"meta": self.get_meta(options), "results": results}
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = self.write_comparison(baseline, results, options["threshold"])
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{regressions} regressions against {options['compare']}")
+
+    def write_result(self, name, result):
+        queries = "-" if result["queries"] is None else f"{result['queries']:.1f}"
+        rss = "-" if result["peak_rss_kb"] is None else f"{result['peak_rss_kb'] / 1024:.0f}"
+        self.stdout.write(
+            f"{name:>20}: {result['throughput']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms  "
+            f"{queries:>5} queries  peak RSS {rss:>4} MB  {result['errors']} errors"
+        )
+
+    def write_comparison(self, baseline, results, threshold):
+        self.stdout.write(f"Compared with baseline {baseline['meta'].get('commit') or ''}:")
+        regressions = 0
+        for route, metric, old, new, regressed in compare(baseline["results"], results, threshold):
+            change = (new - old) / old * 100 if old else 0.0
+            line = f"{route:>20} {metric:>12}: {old:10.2f} -> {new:10.2f} ({change:+6.1f}%)"
+            if regressed:
+                regressions += 1
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSION"))
+            else:
+                self.stdout.write(line)
+        return regressions
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        return {
+            "commit": commit,
+            "date": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": connection.vendor,
+            "target": options["base_url"] or "in-process",
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "dataset": {
+                "users": options["users"],
+                "blogs_per_user": options["blogs_per_user"],
+                "shares_per_user": options["shares_per_user"],
+                "seed": options["seed"],
+            },
+        }
@@ -0,0 +1,92 @@
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import DatabaseError, load_backend
+
+from common.db.pool import close_pools
+
+MODES = {
+    # Django's default: connect and authenticate on every request
+    "fresh": {"ENGINE": "django.db.backends.postgresql", "CONN_MAX_AGE": 0},
+    # One connection per thread kept across requests, checked after errors
+    "persistent": {"ENGINE": "django.db.backends.postgresql", "CONN_MAX_AGE": None, "CONN_HEALTH_CHECKS": True},
+    # common.db.backends.pooled_postgresql
+    "pooled": {"ENGINE": "common.db.backends.pooled_postgresql", "CONN_MAX_AGE": 0},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per-request database latency with a new connection per request, persistent "
+        "connections and the connection pool. Each request runs --queries trivial statements "
+        "between Django's request start and end connection handling. PostgreSQL only."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500, help="Requests per thread and mode.")
+        parser.add_argument("--threads", type=int, default=1)
+        parser.add_argument("--queries", type=int, default=1, help="Statements per request.")
+        parser.add_argument("--pool-size", type=int, default=4)
+        parser.add_argument("--no-health-checks", action="store_true", help="Skip SELECT 1 on pool checkout.")
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options["database"]].settings_dict
+        if connections[options["database"]].vendor != "postgresql":
+            raise CommandError("Connection pooling is only implemented for PostgreSQL")
+
+        for mode in options["modes"]:
+            mode_settings = {
+                **settings_dict,
+                **MODES[mode],
+                "POOL": {
+                    "MAX_SIZE": options["pool_size"],
+                    "HEALTH_CHECKS": not options["no_health_checks"],
+                },
+            }
+            latencies = self.run_mode(f"bench-{mode}", mode_settings, options)
+            quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+            self.stdout.write(
+                f"{mode:>10}: p50 {quantiles[49] * 1000:7.3f} ms  p95 {quantiles[94] * 1000:7.3f} ms  "
+                f"p99 {quantiles[98] * 1000:7.3f} ms  mean {statistics.mean(latencies) * 1000:7.3f} ms "
+                f"({len(latencies)} requests)"
+            )
+
+    def run_mode(self, alias, mode_settings, options):
+        backend = load_backend(mode_settings["ENGINE"])
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            connection = backend.DatabaseWrapper(mode_settings, alias)
+            timings = []
+            try:
+                for _ in range(options["requests"]):
+                    start = time.perf_counter()
+                    # What the request_started / request_finished handlers do
+                    connection.close_if_unusable_or_obsolete()
+                    for _ in range(options["queries"]):
+                        with connection.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                    connection.close_if_unusable_or_obsolete()
+                    timings.append(time.perf_counter() - start)
+            except DatabaseError as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(options["threads"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        close_pools()
+        if errors:
+            raise CommandError(f"{alias}: {errors[0]}")
+        return latencies
@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from account.serializers import RetrieveUserSerializer, UserSerializer
+from blog.models import Blog, BlogSharing
+from blog.serializers import AuthorsWithAccessSerializer, BlogSerializer, BlogSummarySerializer
+from common.datagen import DataGenerator
+from common.fastpath import RowMapper
+from common.renderers import FastJSONRenderer
+
+User = get_user_model()
+
+CASES = {
+    "blog": (BlogSerializer, lambda: Blog.objects.select_related("author")),
+    "blog-summary": (BlogSummarySerializer, lambda: Blog.objects.select_related("author").defer("content")),
+    "user": (UserSerializer, lambda: User.objects.all()),
+    "user-with-profile": (RetrieveUserSerializer, lambda: User.objects.select_related("userprofile")),
+    "authors-with-access": (
+        AuthorsWithAccessSerializer,
+        lambda: BlogSharing.objects.select_related("owner", "shared_with", "blog__author"),
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the serialization cost per row of the list serializers against their "
+        "row mappers (common.fastpath), and of JSONRenderer against FastJSONRenderer. "
+        "Runs on generated rows that are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Rows serialized per case.")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the fastest is reported.")
+        parser.add_argument("--cases", nargs="+", choices=CASES, help="Only run these cases.")
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        with transaction.atomic():
+            # Enough blogs and shares for `rows` of each
+            DataGenerator(
+                max(rows // 5, 2),
+                posts_per_author="fixed:5",
+                shares_per_blog="fixed:1",
+                content_words="normal:400:150",
+                seed=0,
+            ).run()
+
+            for name in options["cases"] or CASES:
+                serializer_class, get_queryset = CASES[name]
+                self.run_case(name, serializer_class, get_queryset().order_by("pk")[:rows], options["repeat"])
+            transaction.set_rollback(True)
+
+    def run_case(self, name, serializer_class, queryset, repeat):
+        mapper = RowMapper(serializer_class)
+        instances = list(queryset)
+        values = list(mapper.values(queryset))
+        count = len(instances)
+
+        serialized = serializer_class(instances, many=True).data
+        mapped = mapper.map_rows(values)
+        if JSONRenderer().render(serialized) != JSONRenderer().render(mapped):
+            self.stderr.write(self.style.WARNING(f"{name}: row mapper output differs from {serializer_class.__name__}"))
+
+        timings = {
+            "serializer": self.best(lambda: serializer_class(instances, many=True).data, repeat),
+            "mapper": self.best(lambda: mapper.map_rows(values), repeat),
+            "json": self.best(lambda: JSONRenderer().render(mapped), repeat),
+            "orjson": self.best(lambda: FastJSONRenderer().render(mapped), repeat),
+        }
+        per_row = {key: value / count * 1e6 for key, value in timings.items()}
+        self.stdout.write(
+            f"{name:>20} ({count} rows): serializer {per_row['serializer']:7.2f} us/row  "
+            f"row mapper {per_row['mapper']:6.2f} us/row ({per_row['serializer'] / per_row['mapper']:4.1f}x)  "
+            f"render {per_row['json']:6.2f} -> {per_row['orjson']:5.2f} us/row"
+        )
+
+    @staticmethod
+    def best(function, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-generate users, profiles, blogs and shares with bulk inserts (COPY on PostgreSQL), "
+        "bypassing signals and password hashing. Distributions are given as specs like "
+        "'fixed:5', 'uniform:0:20', 'normal:400:150', 'exponential:5' or 'zipf:2:20'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts-per-author", default="exponential:5", help="Blogs per user.")
+        parser.add_argument("--shares-per-blog", default="zipf:2:20", help="Users each blog is shared with.")
+        parser.add_argument("--content-words", default="normal:400:150", help="Words per blog.")
+        parser.add_argument("--days", type=int, default=365, help="Spread creation dates over this many days.")
+        parser.add_argument("--inactive-ratio", type=float, default=0.02)
+        parser.add_argument("--domain", default="generated.invalid", help="Email domain of the generated users.")
+        parser.add_argument("--password", default="generated-Passw0rd!", help="Password of every generated user.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--method", choices=["auto", "bulk", "copy"], default="auto")
+        parser.add_argument("--seed", type=int, help="Random seed, to generate the same rows again.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        try:
+            generator = DataGenerator(
+                users=options["users"],
+                posts_per_author=options["posts_per_author"],
+                shares_per_blog=options["shares_per_blog"],
+                content_words=options["content_words"],
+                domain=options["domain"],
+                password=options["password"],
+                days=options["days"],
+                inactive_ratio=options["inactive_ratio"],
+                batch_size=options["batch_size"],
+                seed=options["seed"],
+                using=options["database"],
+                method=options["method"],
+                progress=self.write_progress if options["verbosity"] > 1 else None,
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(f"Generating with {generator.method}, emails {generator.prefix}-<n>@{generator.domain}")
+        counts = generator.run()
+
+        rows = counts["users"] + counts["profiles"] + counts["blogs"] + counts["shares"]
+        rate = rows / counts["seconds"] * 60 if counts["seconds"] else rows
+        self.stdout.write(
+            f"{counts['users']} users, {counts['profiles']} profiles, {counts['blogs']} blogs and "
+            f"{counts['shares']} shares in {counts['seconds']}s ({rate:,.0f} rows/min)"
+        )
+
+    def write_progress(self, counts):
+        self.stdout.write(
+            f"  {counts['users']} users, {counts['blogs']} blogs, {counts['shares']} shares"
+        )
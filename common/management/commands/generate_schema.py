@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.schema import OPTIONS, generate, read_fingerprint, source_fingerprint, write_artifacts
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the OpenAPI schema and the Swagger UI page served at / to OPENAPI_SCHEMA['DIR'], "
+        "unless they were already generated from the same code."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate even if the code did not change.")
+        parser.add_argument("--check", action="store_true", help="Only fail if the artifacts are missing or stale.")
+        parser.add_argument("--dir", default=OPTIONS["DIR"], help="Directory to write to.")
+
+    def handle(self, *args, **options):
+        fingerprint = source_fingerprint()
+        if not options["force"] and read_fingerprint(options["dir"]) == fingerprint:
+            self.stdout.write(f"OpenAPI schema in {options['dir']} is up to date")
+            return
+        if options["check"]:
+            raise CommandError(f"OpenAPI schema in {options['dir']} is missing or stale, run generate_schema")
+
+        schema, page = generate()
+        write_artifacts(options["dir"], schema, page, fingerprint)
+        self.stdout.write(f"Wrote the OpenAPI schema ({len(schema)} bytes) to {options['dir']}")
@@ -0,0 +1,115 @@
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter under -X importtime; prints the duration of
+# each start-up phase in seconds as JSON
+PROBE = """
+import json, sys, time
+
+phases = {}
+start = time.perf_counter()
+import django
+django.setup()
+phases["setup"] = time.perf_counter() - start
+
+start = time.perf_counter()
+from django.core.handlers.wsgi import WSGIHandler
+WSGIHandler()
+phases["middleware"] = time.perf_counter() - start
+
+start = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+phases["urls"] = time.perf_counter() - start
+
+if sys.argv[1] == "1":
+    start = time.perf_counter()
+    from config.warmup import warm_up
+    warm_up()
+    phases["warm_up"] = time.perf_counter() - start
+
+print(json.dumps(phases))
+"""
+
+
+def parse_importtime(output):
+    """
+    [(module, self seconds, cumulative seconds, depth)] from the stderr of
+    `python -X importtime`.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the app in a fresh interpreter and report the time spent in each start-up phase "
+        "and in imports, to track cold start time between commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3, help="Runs to make; the fastest is reported.")
+        parser.add_argument("--limit", type=int, default=15, help="Imports and packages to list.")
+        parser.add_argument("--no-warm-up", action="store_true", help="Leave out config.warmup.")
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        runs = [self.run_probe(not options["no_warm_up"]) for _ in range(max(options["repeat"], 1))]
+        phases, imports = min(runs, key=lambda run: sum(run[0].values()))
+
+        packages = defaultdict(float)
+        for name, self_time, _, _ in imports:
+            packages[name.split(".")[0]] += self_time
+        report = {
+            "total_ms": round(sum(phases.values()) * 1000, 1),
+            "phases_ms": {name: round(duration * 1000, 1) for name, duration in phases.items()},
+            "import_ms": round(sum(cumulative for _, _, cumulative, depth in imports if depth == 0) * 1000, 1),
+            "modules": len(imports),
+            # Imports made by the start-up code itself, with what they imported
+            "slowest_imports_ms": {
+                name: round(cumulative * 1000, 1)
+                for name, _, cumulative, depth in sorted(imports, key=lambda item: -item[2])
+                if depth == 0
+            },
+            "packages_ms": {
+                name: round(duration * 1000, 1)
+                for name, duration in sorted(packages.items(), key=lambda item: -item[1])
+            },
+        }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"Start-up: {report['total_ms']:.1f} ms, of which imports {report['import_ms']:.1f} ms "
+                          f"({report['modules']} modules)")
+        for name, duration in report["phases_ms"].items():
+            self.stdout.write(f"  {name:<12}{duration:>9.1f} ms")
+        self.stdout.write("Slowest imports (with what they import):")
+        for name, duration in list(report["slowest_imports_ms"].items())[:options["limit"]]:
+            self.stdout.write(f"  {duration:>9.1f} ms  {name}")
+        self.stdout.write("Packages (own import time):")
+        for name, duration in list(report["packages_ms"].items())[:options["limit"]]:
+            self.stdout.write(f"  {duration:>9.1f} ms  {name}")
+
+    def run_probe(self, warm_up):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE, "1" if warm_up else "0"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Start-up failed:\n{result.stderr[-2000:]}")
+        return json.loads(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
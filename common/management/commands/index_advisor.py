@@ -0,0 +1,138 @@
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.urls import URLResolver, get_resolver
+from rest_framework.filters import OrderingFilter
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from common.pagination import KeysetPagination
+from common.querycount import QueryRecorder
+
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\S+)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+
+
+def sequential_scans(vendor, plan):
+    """
+    Tables read in full according to `plan`, the rows of an EXPLAIN (PostgreSQL)
+    or EXPLAIN QUERY PLAN (SQLite).
+    """
+    if vendor == "postgresql":
+        return [table for (line,) in plan for table in _POSTGRES_SCAN.findall(line)]
+    if vendor == "sqlite":
+        # The detail is the last column; "SCAN t USING [COVERING] INDEX i"
+        # walks an index in order
+        matches = (_SQLITE_SCAN.match(row[-1]) for row in plan if "USING" not in row[-1])
+        return [match[1] for match in matches if match]
+    raise CommandError(f"Plans of {vendor} are not supported, only PostgreSQL and SQLite")
+
+
+def list_routes(patterns, prefix=""):
+    """
+    (path, name, view function) of the DRF views answering GET without URL
+    arguments.
+    """
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from list_routes(pattern.url_patterns, route)
+            continue
+        view_class = getattr(pattern.callback, "cls", None)
+        actions = getattr(pattern.callback, "actions", None)
+        handles_get = "get" in actions if actions is not None else hasattr(view_class, "get")
+        if view_class is not None and handles_get and not pattern.pattern.converters and "(" not in route:
+            yield "/" + route.lstrip("^").rstrip("$"), pattern.name, pattern.callback
+
+
+def variants(view_class):
+    """
+    Query strings a list view is requested with: its default page, a keyset
+    page and each ?ordering= field, descending.
+    """
+    params = {}
+    pagination_class = getattr(view_class, "pagination_class", None)
+    if isinstance(pagination_class, type) and issubclass(pagination_class, KeysetPagination):
+        params = {pagination_class.cursor_query_param: ""}
+        yield {}
+    yield params
+    if any(issubclass(backend, OrderingFilter) for backend in getattr(view_class, "filter_backends", [])):
+        for field in getattr(view_class, "ordering_fields", None) or []:
+            yield {**params, OrderingFilter.ordering_param: f"-{field}"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every list endpoint as a user, run EXPLAIN on the queries it makes and flag "
+        "sequential scans of tables with at least --min-rows rows. Nothing is written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="User to request as (default: the first active user).")
+        parser.add_argument("--min-rows", type=int, default=1000, help="Ignore scans of smaller tables.")
+        parser.add_argument("--routes", nargs="+", help="Only these URL names.")
+        parser.add_argument("--fail-on-scan", action="store_true", help="Exit with an error if a scan is flagged.")
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(is_active=True)
+        user = users.filter(email=options["email"]).first() if options["email"] else users.order_by("pk").first()
+        if user is None:
+            raise CommandError("No such active user")
+
+        hosts = [host for host in settings.ALLOWED_HOSTS if "*" not in host and not host.startswith(".")]
+        factory = APIRequestFactory(SERVER_NAME=hosts[0] if hosts else "localhost")
+        self.row_counts = {}
+        flagged = 0
+        explained = 0
+        for path, name, view in list_routes(get_resolver().url_patterns):
+            if options["routes"] and name not in options["routes"]:
+                continue
+            for params in variants(view.cls):
+                request = factory.get(path, params)
+                force_authenticate(request, user=user)
+                status, queries = self.run_view(view, request)
+                query_string = request.META["QUERY_STRING"]
+                self.stdout.write(f"{name} GET {path}{'?' + query_string if query_string else ''} "
+                                  f"({status}, {len(queries)} queries)")
+                for query in queries:
+                    explained += 1
+                    for table, rows in self.scans(query):
+                        if rows >= options["min_rows"]:
+                            flagged += 1
+                            self.stdout.write(f"  SEQUENTIAL SCAN of {table} ({rows} rows): {query.sql[:200]}")
+
+        self.stdout.write(f"{explained} queries explained, {flagged} sequential scans flagged")
+        if flagged and options["fail_on_scan"]:
+            raise CommandError(f"{flagged} sequential scans")
+
+    def run_view(self, view, request):
+        with transaction.atomic():
+            with QueryRecorder() as recorder:
+                response = view(request)
+                if response.streaming:
+                    # The first chunk is enough to run the export's query
+                    next(iter(response.streaming_content), None)
+                    response.close()
+                else:
+                    response.render()
+            transaction.set_rollback(True)
+        queries = [query for query in recorder.queries if query.sql.lstrip().upper().startswith("SELECT")]
+        return response.status_code, queries
+
+    def scans(self, query):
+        connection = connections[query.alias]
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {query.sql}", query.params)
+            plan = cursor.fetchall()
+        for table in sequential_scans(connection.vendor, plan):
+            yield table, self.count_rows(connection, table)
+
+    def count_rows(self, connection, table):
+        key = (connection.alias, table)
+        if key not in self.row_counts:
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+                self.row_counts[key] = cursor.fetchone()[0]
+        return self.row_counts[key]
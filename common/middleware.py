@@ -0,0 +1,105 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .querycount import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs in the handler's own mode: `sync_call()`
+    under WSGI and `async_call()` under ASGI. A sync-only middleware would
+    make Django run everything below it, async views included, on a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.async_call(request)
+        return self.sync_call(request)
+
+    def sync_call(self, request):
+        raise NotImplementedError
+
+    async def async_call(self, request):
+        raise NotImplementedError
+
+
+class StaticFilesMiddleware(HybridMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that also runs under ASGI. URLs that cannot be a
+    static file are passed on without a thread switch; static files are
+    looked up and opened on a thread.
+    """
+
+    def __init__(self, get_response):
+        WhiteNoiseMiddleware.__init__(self, get_response)
+        HybridMiddleware.__init__(self, get_response)
+        self.prefixes = tuple({self.static_prefix, *(prefix for _, prefix in self.directories)})
+
+    def sync_call(self, request):
+        return WhiteNoiseMiddleware.__call__(self, request)
+
+    async def async_call(self, request):
+        url = request.path_info
+        static_file = None
+        if not self.autorefresh:
+            static_file = self.files.get(url)
+        elif url.startswith(self.prefixes):
+            # Looked up on disk on every request
+            static_file = await sync_to_async(self.find_file)(url)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class RepeatedQueryError(Exception):
+    pass
+
+
+class QueryInspectMiddleware(HybridMiddleware):
+    """
+    DEBUG-only N+1 detector. Records the queries of each request and logs a
+    warning (or raises RepeatedQueryError when QUERY_INSPECT["RAISE"] is set)
+    when the same statement shape runs at least DUPLICATE_THRESHOLD times.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        options = getattr(settings, "QUERY_INSPECT", {})
+        self.threshold = options.get("DUPLICATE_THRESHOLD", 5)
+        self.raise_on_repeat = options.get("RAISE", False)
+
+    def sync_call(self, request):
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        self.inspect(request, recorder)
+        return response
+
+    async def async_call(self, request):
+        with QueryRecorder() as recorder:
+            response = await self.get_response(request)
+        self.inspect(request, recorder)
+        return response
+
+    def inspect(self, request, recorder):
+        if recorder.duplicates(self.threshold):
+            message = f"Repeated queries in {request.method} {request.path}: {recorder.report(self.threshold)}"
+            if self.raise_on_repeat:
+                raise RepeatedQueryError(message)
+            logger.warning(message)
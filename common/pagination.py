@@ -1,4 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
@@ -6,3 +19,321 @@ class CustomPagination(PageNumberPagination):
     page_query_param = "record"
     page_size_query_param = "records per page"
     max_page_size = 15
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        paginate_queryset() for async views: the count and the page rows are
+        fetched with the async ORM, the rest matches the sync behaviour.
+        """
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            )
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over the view's ordering plus the primary key.
+
+    Each page is fetched with a `WHERE (ordering...) > (last row)` predicate
+    instead of an OFFSET, and no COUNT(*) is run, so the cost of a page does
+    not depend on how deep it is. Cursors are opaque and tied to the ordering
+    they were issued for.
+    """
+
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    # Used when the view declares no `keyset_ordering`
+    ordering = ("-created_at",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.prepare_page(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page = self.prepare_page(queryset, request, view)
+        return self.finish_page([row async for row in page])
+
+    def prepare_page(self, queryset, request, view=None):
+        """
+        Return the lazy queryset for the requested page (one extra row is
+        fetched to detect whether another page follows).
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [self.get_field_converter(queryset, name.lstrip("-")) for name in self.ordering]
+        self.position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self.invert(name) for name in ordering)
+        return self.page_queryset(queryset, ordering, view)
+
+    def page_queryset(self, queryset, ordering, view):
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, self.position))
+        return queryset[: self.page_size + 1]
+
+    def finish_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+
+        self.next_position = self.get_position(rows[-1]) if rows and self.has_next else None
+        self.previous_position = self.get_position(rows[0]) if rows and self.has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True},
+                "previous": {"type": "string", "nullable": True},
+                "results": schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Resolve the ordering in priority order: a valid ?ordering= for views
+        using OrderingFilter, an explicit order_by() already applied to the
+        queryset (e.g. search relevance), the view's `keyset_ordering`, and
+        finally the class default. The primary key is always appended so the
+        ordering is total.
+        """
+        ordering = None
+        filter_backends = getattr(view, "filter_backends", [])
+        if any(issubclass(backend, OrderingFilter) for backend in filter_backends):
+            if request.query_params.get(OrderingFilter.ordering_param):
+                ordering = OrderingFilter().get_ordering(request, queryset, view)
+        if not ordering and queryset.query.order_by:
+            if all(isinstance(name, str) for name in queryset.query.order_by):
+                ordering = queryset.query.order_by
+        if not ordering:
+            ordering = getattr(view, "keyset_ordering", self.ordering)
+
+        pk_name = queryset.model._meta.pk.name
+        ordering = [pk_name if name.lstrip("-") == "pk" else name for name in ordering]
+        ordering = ["-" + pk_name if name == "-pk" else name for name in ordering]
+        if pk_name not in [name.lstrip("-") for name in ordering]:
+            ordering.append(("-" if ordering[-1].startswith("-") else "") + pk_name)
+        return tuple(ordering)
+
+    def get_field_converter(self, queryset, name):
+        if name in queryset.query.annotations:
+            return name, queryset.query.annotations[name].output_field.to_python
+        try:
+            return name, queryset.model._meta.get_field(name).to_python
+        except FieldDoesNotExist:
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith("-") else "-" + name
+
+    @staticmethod
+    def keyset_filter(ordering, position):
+        """
+        Build `(a, b, c) > (x, y, z)` for mixed directions as
+        `a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)`, with a
+        redundant bound on the first column so an index range scan is used.
+        """
+        first = ordering[0]
+        condition = Q()
+        equal = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{field}__{lookup}": value})
+            equal &= Q(**{field: value})
+
+        bound = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{bound}": position[0]}) & condition
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self.fields]
+        return [getattr(row, name) for name, _ in self.fields]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padding = "=" * (-len(encoded) % 4)
+            payload = json.loads(urlsafe_b64decode(encoded + padding))
+            if payload["o"] != list(self.ordering) or len(payload["p"]) != len(self.fields):
+                raise ValueError("Cursor does not match the requested ordering")
+            position = [convert(value) for (_, convert), value in zip(self.fields, payload["p"])]
+            return position, bool(payload["r"])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        payload = {
+            "o": list(self.ordering),
+            "p": [self.encode_value(value) for value in position],
+            "r": int(reverse),
+        }
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        cursor = encoded.decode("ascii").rstrip("=")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    @staticmethod
+    def encode_value(value):
+        # Keep full precision: datetimes must round-trip to the microsecond
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, UUID):
+            return str(value)
+        return value
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "The pagination cursor value.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Number of results to return per page.",
+                "schema": {"type": "integer"},
+            },
+        ]
+
+
+class CursorOrRecordPagination(KeysetPagination):
+    """
+    Keyset pages when ?cursor= is present (pass an empty value for the first
+    page), the `record` page-number mode otherwise so existing clients keep
+    working unchanged.
+    """
+
+    record_pagination_class = CustomPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.record_paginator = None
+        if self.cursor_query_param in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        if self.record_pagination_class is None:
+            return None
+
+        self.record_paginator = self.record_pagination_class()
+        return self.record_paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.record_paginator = None
+        if self.cursor_query_param in request.query_params:
+            return await super().apaginate_queryset(queryset, request, view)
+        if self.record_pagination_class is None:
+            return None
+
+        self.record_paginator = self.record_pagination_class()
+        return await self.record_paginator.apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.record_paginator is not None:
+            return self.record_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        if self.record_pagination_class is not None:
+            record_parameters = self.record_pagination_class().get_schema_operation_parameters(view)
+            parameters += [p for p in record_parameters if p["name"] == self.record_pagination_class.page_query_param]
+        return parameters
+
+
+class OptionalCursorPagination(CursorOrRecordPagination):
+    """
+    For endpoints that have always returned plain lists: keyset pages on
+    ?cursor=, the full unpaginated list otherwise.
+    """
+
+    record_pagination_class = None
+
+
+class UnionKeysetPagination(KeysetPagination):
+    """
+    Keyset pages over a list that is the union of disjoint parts, such as
+    the two sides of an OR that no single index serves. The view's
+    `get_keyset_branches(queryset)` splits the queryset into those parts;
+    each is filtered past the cursor, ordered and limited on its own so it
+    walks its own index, and the page is read from their UNION ALL with the
+    ordering and limit applied again outside.
+    """
+
+    def page_queryset(self, queryset, ordering, view):
+        # SQLite rejects ORDER BY/LIMIT inside a compound SELECT; it merges
+        # the branches in index order under the outer ORDER BY instead
+        limit_branches = connections[queryset.db].features.supports_slicing_ordering_in_compound
+        branches = []
+        for branch in view.get_keyset_branches(queryset):
+            if self.position is not None:
+                branch = branch.filter(self.keyset_filter(ordering, self.position))
+            branches.append(branch.order_by(*ordering)[: self.page_size + 1] if limit_branches else branch.order_by())
+        first, *rest = branches
+        return first.union(*rest, all=True).order_by(*ordering)[: self.page_size + 1]
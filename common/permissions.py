@@ -1,4 +1,7 @@
+from rest_framework import exceptions
 from rest_framework.permissions import BasePermission
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 
 
 class IsOwnerOrReadOnly(BasePermission):
@@ -31,3 +34,23 @@ class IsBlogOwnerOrSharedWith(BasePermission):
     def has_object_permission(self, request, view, obj):
         # Check if the user is the owner of the shared blog or the shared_with author
         return obj.owner == request.user or obj.shared_with == request.user
+
+
+def get_staff_user(request):
+    """
+    The staff user behind a plain Django request, authenticated by session
+    or by the API's authentication classes (JWT), or None.
+    """
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_staff else None
+
+    api_request = Request(request)
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(api_request)
+        except exceptions.APIException:
+            return None
+        if result is not None:
+            return result[0] if result[0].is_staff else None
+    return None
@@ -0,0 +1,212 @@
+"""
+On-demand profiling of single requests for staff users.
+
+A request carrying the X-Profile header (or ?_profile=1) from a staff user
+runs under cProfile with its SQL statements recorded. The profile is saved
+to PROFILING["DIR"], keeping the newest MAX_PROFILES, and its id returned in
+the X-Profile-Id response header. Staff list the saved profiles at
+/profiles/, see the SQL timeline and slowest functions at /profiles/<id>/
+and download the raw profile (for pstats, snakeviz, gprof2dot) from
+/profiles/<id>/download/.
+
+Requests without the header or parameter only pay for the check. The body
+of streaming responses runs outside the profiled call. Under ASGI, cProfile
+only sees the event loop thread: code run on threads by sync_to_async()
+(sync views included) is missing from the functions, though its SQL is
+recorded, and other requests served meanwhile may show up.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .middleware import HybridMiddleware
+from .permissions import get_staff_user
+from .querycount import QueryRecorder
+
+OPTIONS = {
+    "ENABLED": True,
+    "HEADER": "X-Profile",
+    "QUERY_PARAM": "_profile",
+    "DIR": os.path.join(tempfile.gettempdir(), "liberty-profiles"),
+    "MAX_PROFILES": 50,
+    "TOP_FUNCTIONS": 50,
+    **getattr(settings, "PROFILING", {}),
+}
+
+PROFILE_ID = re.compile(r"^\d{8}T\d{9}-[0-9a-f]{8}$")
+
+
+class ProfileStore:
+    """
+    Profiles on local disk: "<id>.prof" holds the cProfile stats and
+    "<id>.json" the request, its SQL timeline and the slowest functions. Ids
+    start with the UTC time (to the millisecond) so they sort oldest first.
+    """
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def new_id(self):
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        return f"{stamp}{int(now * 1000) % 1000:03d}-{uuid.uuid4().hex[:8]}"
+
+    def save(self, profiler, profile):
+        os.makedirs(self.directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.directory, f"{profile['id']}.prof"))
+        with open(os.path.join(self.directory, f"{profile['id']}.json"), "w") as f:
+            json.dump(profile, f)
+        self.prune()
+
+    def ids(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith(".json") and PROFILE_ID.match(name[:-5]))
+
+    def prune(self):
+        ids = self.ids()
+        for profile_id in ids[:max(len(ids) - self.max_profiles, 0)]:
+            for extension in ("json", "prof"):
+                try:
+                    os.remove(os.path.join(self.directory, f"{profile_id}.{extension}"))
+                except FileNotFoundError:
+                    # Already pruned by another worker
+                    pass
+
+    def get(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self):
+        """
+        Newest first, without the SQL timeline and function lists.
+        """
+        profiles = []
+        for profile_id in reversed(self.ids()):
+            profile = self.get(profile_id)
+            if profile is not None:
+                profiles.append({key: value for key, value in profile.items() if key not in ("queries", "functions")})
+        return profiles
+
+    def stats_path(self, profile_id):
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+
+profile_store = ProfileStore(OPTIONS["DIR"], OPTIONS["MAX_PROFILES"])
+
+
+def top_functions(profiler, limit):
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": pstats.func_std_string(function),
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+        }
+        for function, (_, calls, total, cumulative, _) in rows
+    ]
+
+
+class ProfiledRun:
+    """
+    cProfile and a QueryRecorder around the handling of one request.
+    """
+
+    def __enter__(self):
+        self.id = profile_store.new_id()
+        self.started_at = timezone.now()
+        self.profiler = cProfile.Profile()
+        self.recorder = QueryRecorder().__enter__()
+        self.start = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.start
+        self.recorder.__exit__(*exc_info)
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Profiles requests that ask for it when they come from a staff user,
+    authenticated by session or by the API's authentication classes (JWT).
+    Place it after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        if not OPTIONS["ENABLED"]:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.header = "HTTP_" + OPTIONS["HEADER"].upper().replace("-", "_")
+        self.param = OPTIONS["QUERY_PARAM"]
+
+    def requested(self, request):
+        return self.header in request.META or (
+            self.param in request.META.get("QUERY_STRING", "") and self.param in request.GET
+        )
+
+    def sync_call(self, request):
+        user = get_staff_user(request) if self.requested(request) else None
+        if user is None:
+            return self.get_response(request)
+        with ProfiledRun() as run:
+            response = self.get_response(request)
+        return self.save(request, user, response, run)
+
+    async def async_call(self, request):
+        # The user is only looked up, on a thread, when a profile is asked for
+        user = await sync_to_async(get_staff_user)(request) if self.requested(request) else None
+        if user is None:
+            return await self.get_response(request)
+        with ProfiledRun() as run:
+            response = await self.get_response(request)
+        return await sync_to_async(self.save)(request, user, response, run)
+
+    def save(self, request, user, response, run):
+        profile_store.save(run.profiler, {
+            "id": run.id,
+            "method": request.method,
+            "path": request.get_full_path(),
+            "status": response.status_code,
+            "user": user.get_username(),
+            "started_at": run.started_at.isoformat(),
+            "duration_ms": round(run.duration * 1000, 3),
+            "query_count": run.recorder.count,
+            "sql_ms": round(run.recorder.total_time * 1000, 3),
+            "queries": [
+                {
+                    "alias": query.alias,
+                    "sql": query.sql,
+                    "start_ms": round((query.start - run.start) * 1000, 3),
+                    "duration_ms": round(query.duration * 1000, 3),
+                }
+                for query in run.recorder.queries
+            ],
+            "functions": top_functions(run.profiler, OPTIONS["TOP_FUNCTIONS"]),
+        })
+        response["X-Profile-Id"] = run.id
+        return response
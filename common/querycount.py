@@ -0,0 +1,111 @@
+import contextvars
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*\?\s*,)+\s*\?\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape: literals and placeholders become `?`
+    and IN lists collapse, so the same query run with different parameters
+    (the signature of an N+1) normalizes to the same string.
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _PLACEHOLDER_LIST.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+@dataclass
+class RecordedQuery:
+    alias: str
+    sql: str
+    duration: float
+    # perf_counter() when the statement started
+    start: float = 0.0
+    params: object = None
+
+
+_recorders = contextvars.ContextVar("query_recorders", default=())
+
+
+def _record(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        query = RecordedQuery(context["connection"].alias, sql, time.perf_counter() - start, start, params)
+        for recorder in recorders:
+            recorder.queries.append(query)
+
+
+def _add_wrapper(connection, **kwargs):
+    # Inserted first, execute_wrapper() context managers pop the last one
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record)
+
+
+connection_created.connect(_add_wrapper)
+
+
+class QueryRecorder:
+    """
+    Context manager recording every statement executed in the current
+    context, with its duration: on any database connection of the current
+    thread and, under ASGI, of the threads sync_to_async() runs the
+    request's sync code on (Django's connections are per thread).
+
+        with QueryRecorder() as recorder:
+            ...
+        recorder.count, recorder.total_time, recorder.duplicates()
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            _add_wrapper(connection)
+        self._token = _recorders.set((*_recorders.get(), self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorders.reset(self._token)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(query.duration for query in self.queries)
+
+    def duplicates(self, threshold=2):
+        """
+        Return (normalized sql, count) pairs for statement shapes executed at
+        least `threshold` times, most repeated first.
+        """
+        shapes = Counter(normalize_sql(query.sql) for query in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def report(self, threshold=2):
+        lines = [f"{self.count} queries in {self.total_time * 1000:.1f}ms"]
+        for shape, count in self.duplicates(threshold):
+            lines.append(f"  {count}x {shape}")
+        return "\n".join(lines)
@@ -0,0 +1,251 @@
+"""
+Read replicas for the read-heavy views.
+
+Views with ReplicaReadMixin run the queries of their GET/HEAD handlers on a
+healthy replica from REPLICAS["ALIASES"], chosen at random per request.
+Everything else, and every write, goes to the primary. A user who made a
+successful write request is pinned to the primary for STICKY_SECONDS, so
+they read their own writes while the replicas catch up; the pins live in
+the default cache, which must be shared by the workers for this to hold
+across them.
+
+A replica is checked at most every HEALTH_CHECK_INTERVAL seconds, and
+left out until the next check when it cannot be reached or (PostgreSQL)
+lags more than MAX_LAG_SECONDS behind. A request whose replica fails with
+an OperationalError is run again on the primary.
+"""
+import contextlib
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = {
+    "ALIASES": [],
+    "STICKY_SECONDS": 10,
+    "HEALTH_CHECK_INTERVAL": 5,
+    "MAX_LAG_SECONDS": 5,
+    **getattr(settings, "REPLICAS", {}),
+}
+
+# Seconds since the last replayed transaction, 0 when the replica has
+# replayed everything it received or the alias is not a replica at all
+POSTGRES_LAG = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+
+
+@contextlib.contextmanager
+def reading_from(alias):
+    """
+    Route reads to `alias` (the primary when None) inside the block.
+    """
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Also for instances that were read from a replica
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_set.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in replica_set.aliases else None
+
+
+class ReplicaSet:
+    def __init__(self, aliases, check_interval=5, max_lag=None):
+        self.aliases = list(aliases)
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.status = {}  # alias -> (healthy, time.monotonic() of the check)
+        self._lock = threading.Lock()
+
+    def choose(self):
+        healthy = [alias for alias in self.aliases if self.is_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    async def achoose(self):
+        healthy = [alias for alias in self.aliases if await self.ais_healthy(alias)]
+        return random.choice(healthy) if healthy else None
+
+    def is_healthy(self, alias):
+        healthy = self.last_status(alias)
+        return self.refresh(alias) if healthy is None else healthy
+
+    async def ais_healthy(self, alias):
+        # Only a due check leaves the event loop
+        healthy = self.last_status(alias)
+        return await sync_to_async(self.refresh)(alias) if healthy is None else healthy
+
+    def last_status(self, alias):
+        """
+        The result of the last check of `alias`, None when a check is due.
+        """
+        healthy, checked_at = self.status.get(alias, (None, 0.0))
+        if healthy is None or time.monotonic() - checked_at >= self.check_interval:
+            return None
+        return healthy
+
+    def refresh(self, alias):
+        healthy = self.check(alias)
+        with self._lock:
+            self.status[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == "postgresql" and self.max_lag is not None:
+                    cursor.execute(POSTGRES_LAG)
+                    lag = cursor.fetchone()[0]
+                    if lag is not None and lag > self.max_lag:
+                        logger.warning("Replica %s is %.1fs behind, reading from the primary", alias, lag)
+                        return False
+                else:
+                    cursor.execute("SELECT 1")
+        except DatabaseError as exc:
+            logger.warning("Replica %s is unavailable, reading from the primary: %s", alias, exc)
+            connection.close()
+            return False
+        return True
+
+    def mark_down(self, alias):
+        with self._lock:
+            self.status[alias] = (False, time.monotonic())
+
+
+replica_set = ReplicaSet(OPTIONS["ALIASES"], OPTIONS["HEALTH_CHECK_INTERVAL"], OPTIONS["MAX_LAG_SECONDS"])
+
+
+def _pin_key(user):
+    return f"replicas:pinned:{user.pk}"
+
+
+def pin_to_primary(user):
+    cache.set(_pin_key(user), True, OPTIONS["STICKY_SECONDS"])
+
+
+async def apin_to_primary(user):
+    await cache.aset(_pin_key(user), True, OPTIONS["STICKY_SECONDS"])
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user)) is not None
+
+
+async def ais_pinned(user):
+    return user.is_authenticated and await cache.aget(_pin_key(user)) is not None
+
+
+def choose_read_database(request):
+    """
+    The replica `request` may read from, None for the primary.
+    """
+    if not replica_set.aliases or request.method not in SAFE_METHODS or is_pinned(request.user):
+        return None
+    return replica_set.choose()
+
+
+async def achoose_read_database(request):
+    """
+    choose_read_database() for async views, whose user is already
+    authenticated.
+    """
+    if not replica_set.aliases or request.method not in SAFE_METHODS or await ais_pinned(request.user):
+        return None
+    return await replica_set.achoose()
+
+
+class ReplicaReadMixin:
+    """
+    For API views: reads of safe requests go to a replica, chosen once
+    authentication and permission checks (which read from the primary) have
+    passed.
+    """
+
+    read_alias = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.read_alias = choose_read_database(request)
+        if self.read_alias is not None:
+            self._read_token = _read_alias.set(self.read_alias)
+
+    def handle_exception(self, exc):
+        if self.read_alias is None or not isinstance(exc, OperationalError):
+            return super().handle_exception(exc)
+
+        logger.warning("Replica %s failed, retrying on the primary", self.read_alias, exc_info=True)
+        replica_set.mark_down(self.read_alias)
+        self.read_alias = None
+        _read_alias.set(None)
+        handler = getattr(self, self.request.method.lower(), self.http_method_not_allowed)
+        try:
+            return handler(self.request, *self.args, **self.kwargs)
+        except Exception as retry_exc:
+            return super().handle_exception(retry_exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_read_token", None)
+        if token is not None:
+            self._read_token = None
+            _read_alias.reset(token)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReadYourWritesMiddleware(HybridMiddleware):
+    """
+    Pins the user of a successful write request to the primary. Place it
+    after AuthenticationMiddleware; users authenticated by the API (JWT)
+    are seen once the view has run.
+    """
+
+    def sync_call(self, request):
+        response = self.get_response(request)
+        if self.is_successful_write(request, response):
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user)
+        return response
+
+    async def async_call(self, request):
+        response = await self.get_response(request)
+        if self.is_successful_write(request, response):
+            user = getattr(request, "user", None)
+            # A session user is only loaded from the database on first use
+            if user is not None and await sync_to_async(lambda: user.is_authenticated)():
+                await apin_to_primary(user)
+        return response
+
+    def is_successful_write(self, request, response):
+        return bool(replica_set.aliases) and request.method not in SAFE_METHODS and response.status_code < 400
@@ -0,0 +1,177 @@
+"""
+The OpenAPI schema and Swagger UI page as build artifacts.
+
+`manage.py generate_schema` writes them to OPENAPI_SCHEMA["DIR"] with a
+fingerprint of the code they describe (the project's Python files, the
+versions of the API libraries and SWAGGER_SETTINGS), and only regenerates
+them when that fingerprint changes. The views serve the files from memory
+with an ETag, so a request never runs drf_yasg's introspection. Without
+the artifacts (or, with DEBUG, when the code changed since) the schema is
+generated once in the process instead. The check runs once per process:
+runserver starts a new one when the code changes.
+"""
+import hashlib
+import logging
+import os
+import threading
+from importlib import import_module
+from importlib.metadata import PackageNotFoundError, version
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import reverse
+
+from .swagger import apply_overrides
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = {
+    "DIR": os.path.join(settings.BASE_DIR, "openapi"),
+    "TITLE": "Liberty Blog API",
+    "VERSION": "v1",
+    "DESCRIPTION": "API documentation of Liberty Blog",
+    "LICENSE": "BSD License",
+    # Cache lifetime of the page and of the schema at its unversioned URL
+    "MAX_AGE": 300,
+    **getattr(settings, "OPENAPI_SCHEMA", {}),
+}
+
+SCHEMA_FILE = "openapi.json"
+UI_FILE = "swagger-ui.html"
+FINGERPRINT_FILE = "fingerprint"
+LIBRARIES = ("django", "djangorestframework", "drf-yasg", "djangorestframework-simplejwt")
+
+
+def source_fingerprint():
+    """
+    Hash of everything the schema is generated from.
+    """
+    digest = hashlib.sha256()
+    for library in LIBRARIES:
+        try:
+            digest.update(f"{library}=={version(library)}\n".encode())
+        except PackageNotFoundError:
+            digest.update(f"{library}\n".encode())
+    digest.update(repr(sorted(getattr(settings, "SWAGGER_SETTINGS", {}).items())).encode())
+    digest.update(repr([(key, value) for key, value in sorted(OPTIONS.items()) if key != "DIR"]).encode())
+
+    base_dir = os.path.realpath(settings.BASE_DIR)
+    roots = {os.path.dirname(import_module(settings.ROOT_URLCONF).__file__)}
+    roots.update(
+        app_config.path for app_config in apps.get_app_configs()
+        if os.path.realpath(app_config.path).startswith(base_dir + os.sep)
+    )
+    for root in sorted(roots):
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(name for name in dirnames if name not in ("__pycache__", "migrations"))
+            for name in sorted(filenames):
+                if name.endswith(".py"):
+                    path = os.path.join(directory, name)
+                    digest.update(os.path.relpath(path, base_dir).encode())
+                    with open(path, "rb") as f:
+                        digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+def generate():
+    """
+    Return the (schema JSON, Swagger UI page) of the current code. The page
+    loads the schema from its versioned, immutable URL.
+    """
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from drf_yasg import openapi
+    from drf_yasg.app_settings import swagger_settings
+    from drf_yasg.codecs import OpenAPICodecJson
+    from drf_yasg.generators import OpenAPISchemaGenerator
+    from drf_yasg.renderers import SwaggerUIRenderer
+    from rest_framework.request import Request
+
+    apply_overrides()
+
+    info = openapi.Info(
+        title=OPTIONS["TITLE"],
+        default_version=OPTIONS["VERSION"],
+        description=OPTIONS["DESCRIPTION"],
+        license=openapi.License(name=OPTIONS["LICENSE"]),
+    )
+    # Views see an anonymous visitor, as they did with the schema built per
+    # request. Without DEFAULT_API_URL the schema has no host: the UI uses
+    # the one it is served from.
+    request = RequestFactory().get(reverse("schema-swagger-ui"))
+    request.user = AnonymousUser()
+    generator = OpenAPISchemaGenerator(info, url=swagger_settings.DEFAULT_API_URL or "")
+    swagger = generator.get_schema(request=Request(request), public=True)
+    schema = OpenAPICodecJson(validators=[]).encode(swagger)
+    spec_url = f"{reverse('openapi-schema')}?v={content_hash(schema)}"
+
+    class Renderer(SwaggerUIRenderer):
+        def get_swagger_ui_settings(self):
+            return {**super().get_swagger_ui_settings(), "url": spec_url}
+
+    page = Renderer().render(swagger, renderer_context={"request": request}).encode()
+    return schema, page
+
+
+def write_artifacts(directory, schema, page, fingerprint):
+    os.makedirs(directory, exist_ok=True)
+    # The fingerprint goes last, so a run interrupted before it is redone
+    for name, content in ((SCHEMA_FILE, schema), (UI_FILE, page), (FINGERPRINT_FILE, fingerprint.encode())):
+        path = os.path.join(directory, name)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(content)
+        os.replace(f"{path}.tmp", path)
+
+
+def read_fingerprint(directory):
+    try:
+        with open(os.path.join(directory, FINGERPRINT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class Artifacts:
+    """
+    The schema and page served by the views, with the hashes their ETags
+    and versioned URLs are made of.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        loaded = self._loaded
+        if loaded is None:
+            with self._lock:
+                if self._loaded is None:
+                    self._loaded = self.load()
+                loaded = self._loaded
+        return loaded
+
+    def load(self):
+        fingerprint = read_fingerprint(self.directory)
+        expected = source_fingerprint() if settings.DEBUG or fingerprint is None else fingerprint
+        if fingerprint is not None and fingerprint == expected:
+            with open(os.path.join(self.directory, SCHEMA_FILE), "rb") as f:
+                schema = f.read()
+            with open(os.path.join(self.directory, UI_FILE), "rb") as f:
+                page = f.read()
+        else:
+            logger.warning("OpenAPI schema in %s is missing or stale, run manage.py generate_schema", self.directory)
+            schema, page = generate()
+        return {
+            "schema": schema,
+            "schema_hash": content_hash(schema),
+            "page": page,
+            "page_hash": content_hash(page),
+        }
+
+
+artifacts = Artifacts(OPTIONS["DIR"])
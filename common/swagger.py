@@ -0,0 +1,54 @@
+"""
+drf_yasg's swagger_auto_schema without importing drf_yasg with the views.
+
+drf_yasg imports pkg_resources, which makes it the slowest import of a
+worker, and is only needed to generate the schema (common.schema). The
+decorator below records its arguments on the view method; they are handed
+to the real decorator by `apply_overrides()` right before the schema is
+generated. Arguments built from drf_yasg's openapi module go in `build`, a
+function of that module returning them:
+
+    @swagger_auto_schema(lambda openapi: {"manual_parameters": [
+        openapi.Parameter("q", openapi.IN_QUERY, type=openapi.TYPE_STRING),
+    ]})
+"""
+import inspect
+
+from django.urls import URLResolver, get_resolver
+
+DEFERRED_ATTRIBUTE = "_deferred_swagger_auto_schema"
+
+
+def swagger_auto_schema(build=None, **overrides):
+    def decorator(view_method):
+        setattr(view_method, DEFERRED_ATTRIBUTE, (build, overrides))
+        return view_method
+
+    return decorator
+
+
+def view_classes(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from view_classes(pattern.url_patterns)
+            continue
+        view_class = getattr(pattern.callback, "cls", None) or getattr(pattern.callback, "view_class", None)
+        if view_class is not None:
+            yield view_class
+
+
+def apply_overrides(urlconf=None):
+    """
+    Apply the deferred decorators of the views in `urlconf` (ROOT_URLCONF by
+    default). Methods shared by several views are decorated once.
+    """
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema as decorate
+
+    for view_class in set(view_classes(get_resolver(urlconf).url_patterns)):
+        for name, view_method in inspect.getmembers(view_class, inspect.isfunction):
+            deferred = getattr(view_method, DEFERRED_ATTRIBUTE, None)
+            if deferred is None or hasattr(view_method, "_swagger_auto_schema"):
+                continue
+            build, overrides = deferred
+            decorate(**overrides, **(build(openapi) if build is not None else {}))(view_method)
@@ -0,0 +1,427 @@
+"""
+Per-request performance telemetry: latency, SQL count and time, serializer
+time, response size and status per route, exported in the Prometheus text
+format by the /metrics view.
+
+Serializer time is what views and renderers report with `serializing()`:
+the row mappers of the fast read path, the async views' serializers and
+the JSON renderer.
+
+Every worker process keeps its own registry. With METRICS_DIR set, workers
+write a snapshot of it to "<pid>.json" in that directory every
+FLUSH_INTERVAL seconds and remove it on exit, and /metrics merges the
+snapshots of the live workers, so any worker can answer a scrape for the
+whole server. An exited worker's counts leave the totals, which Prometheus
+handles as a counter reset.
+"""
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import import_string
+
+from .middleware import HybridMiddleware
+
+OPTIONS = {
+    "ENABLED": True,
+    "SERVER_TIMING": True,
+    "METRICS_DIR": None,
+    "FLUSH_INTERVAL": 10,
+    "METRICS_TOKEN": None,
+    "LATENCY_BUCKETS": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    "SIZE_BUCKETS": (256, 1024, 4096, 16384, 65536, 262144, 1048576),
+    "COLLECTORS": [],
+    **getattr(settings, "TELEMETRY", {}),
+}
+
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+
+class RequestTimings:
+    """
+    Time spent in the database and in serializers by the current request.
+    """
+
+    __slots__ = ("queries", "db_time", "serializer_time", "serializing")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+
+    def server_timing(self, duration):
+        return (
+            f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serializer_time * 1000:.2f}, "
+            f"total;dur={duration * 1000:.2f}"
+        )
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_time += time.perf_counter() - start
+        timings.queries += 1
+
+
+def _add_query_wrapper(connection, **kwargs):
+    # Inserted first rather than appended: execute_wrapper() context
+    # managers pop the last wrapper.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+@contextmanager
+def serializing():
+    """
+    Count the block as serializer time of the current request. Nested
+    blocks are counted once; outside a request this does nothing.
+    """
+    timings = _current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+    timings.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializing = False
+        timings.serializer_time += time.perf_counter() - start
+
+
+_installed = False
+
+
+def install():
+    """
+    Hook query timing in once per process. The wrapper does nothing outside
+    a request seen by TelemetryMiddleware.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_add_query_wrapper)
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+
+
+class Histogram:
+    """
+    Observation counts per bucket, the last slot counting values above the
+    highest bound.
+    """
+
+    def __init__(self, bounds, counts=None, total=0.0):
+        self.bounds = bounds
+        self.counts = counts or [0] * (len(bounds) + 1)
+        self.total = total
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.total += value
+
+    def merge(self, counts, total):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.total += total
+
+
+class RouteStats:
+    def __init__(self, latency_buckets, size_buckets):
+        self.statuses = {}
+        self.duration = Histogram(latency_buckets)
+        self.size = Histogram(size_buckets)
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+
+    def to_dict(self):
+        return {
+            "statuses": self.statuses,
+            "duration": [self.duration.counts, self.duration.total],
+            "size": [self.size.counts, self.size.total],
+            "queries": self.queries,
+            "db_time": self.db_time,
+            "serializer_time": self.serializer_time,
+        }
+
+    def merge(self, data):
+        for status, count in data["statuses"].items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.duration.merge(*data["duration"])
+        self.size.merge(*data["size"])
+        self.queries += data["queries"]
+        self.db_time += data["db_time"]
+        self.serializer_time += data["serializer_time"]
+
+
+class MetricsRegistry:
+    """
+    Request metrics of this process, keyed by (method, route pattern), plus
+    the samples of the COLLECTORS (dotted paths to functions returning
+    (name, type, help, value) tuples for process-level counters, gauges and
+    histograms). The value of a histogram is a dict of its "bounds", the
+    "counts" per bucket with a last slot for values above the highest bound,
+    and the "sum" of the observed values.
+    """
+
+    def __init__(
+        self,
+        latency_buckets=OPTIONS["LATENCY_BUCKETS"],
+        size_buckets=OPTIONS["SIZE_BUCKETS"],
+        directory=OPTIONS["METRICS_DIR"],
+        flush_interval=OPTIONS["FLUSH_INTERVAL"],
+        collectors=OPTIONS["COLLECTORS"],
+    ):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.collectors = collectors
+        self.routes = {}
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, method, route, status, duration, timings, size=None):
+        with self._lock:
+            stats = self.routes.get((method, route))
+            if stats is None:
+                stats = self.routes[(method, route)] = RouteStats(self.latency_buckets, self.size_buckets)
+            key = str(status)
+            stats.statuses[key] = stats.statuses.get(key, 0) + 1
+            stats.duration.observe(duration)
+            if size is not None:
+                stats.size.observe(size)
+            stats.queries += timings.queries
+            stats.db_time += timings.db_time
+            stats.serializer_time += timings.serializer_time
+            due = self.directory and time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def collect_samples(self):
+        samples = []
+        for path in self.collectors:
+            samples += import_string(path)()
+        return samples
+
+    def snapshot(self):
+        with self._lock:
+            routes = [[method, route, stats.to_dict()] for (method, route), stats in self.routes.items()]
+        return {"pid": os.getpid(), "routes": routes, "samples": self.collect_samples()}
+
+    def flush(self):
+        """
+        Write this process's snapshot to METRICS_DIR, replacing the previous
+        one in a single rename so a scrape never reads half a file.
+        """
+        if not self.directory:
+            return
+        self.last_flush = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(temporary, path)
+
+    def discard(self):
+        """
+        Remove this process's snapshot, when the worker exits.
+        """
+        if self.directory:
+            _remove(os.path.join(self.directory, f"{os.getpid()}.json"))
+
+    def snapshots(self):
+        if not self.directory:
+            return [self.snapshot()]
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            pid, extension = os.path.splitext(name)
+            if extension != ".json" or not pid.isdigit():
+                continue
+            if not _is_alive(int(pid)):
+                # Left by a worker that was killed before it could remove it
+                _remove(os.path.join(self.directory, name))
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed or replaced while listing
+                continue
+        return snapshots
+
+    def render(self):
+        """
+        The live workers' metrics in the Prometheus text exposition format.
+        """
+        routes, samples = {}, {}
+        for snapshot in self.snapshots():
+            for method, route, data in snapshot["routes"]:
+                stats = routes.get((method, route))
+                if stats is None:
+                    stats = routes[(method, route)] = RouteStats(self.latency_buckets, self.size_buckets)
+                stats.merge(data)
+            for name, kind, help_text, value in snapshot["samples"]:
+                if kind == "histogram":
+                    sample = samples.setdefault(name, [kind, help_text, Histogram(tuple(value["bounds"]))])
+                    sample[2].merge(value["counts"], value["sum"])
+                    continue
+                sample = samples.setdefault(name, [kind, help_text, 0])
+                sample[2] += value
+
+        lines = []
+        families = [
+            ("http_requests_total", "counter", "Requests by route, method and status."),
+            ("http_request_duration_seconds", "histogram", "Time to produce the response."),
+            ("http_response_size_bytes", "histogram", "Response body size, streamed responses excluded."),
+            ("http_db_queries_total", "counter", "SQL statements executed."),
+            ("http_db_duration_seconds_total", "counter", "Time spent executing SQL."),
+            ("http_serializer_duration_seconds_total", "counter", "Time spent building and rendering response data."),
+        ]
+        for family, kind, help_text in families:
+            name = f"liberty_{family}"
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (method, route), stats in sorted(routes.items()):
+                labels = f'method="{method}",route="{_escape(route)}"'
+                if family == "http_requests_total":
+                    for status, count in sorted(stats.statuses.items()):
+                        lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+                elif family == "http_request_duration_seconds":
+                    lines += _histogram(name, labels, self.latency_buckets, stats.duration)
+                elif family == "http_response_size_bytes":
+                    lines += _histogram(name, labels, self.size_buckets, stats.size)
+                else:
+                    value = {
+                        "http_db_queries_total": stats.queries,
+                        "http_db_duration_seconds_total": stats.db_time,
+                        "http_serializer_duration_seconds_total": stats.serializer_time,
+                    }[family]
+                    lines.append(f"{name}{{{labels}}} {_number(value)}")
+
+        for name, (kind, help_text, value) in sorted(samples.items()):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if kind == "histogram":
+                lines += _histogram(name, "", value.bounds, value)
+            else:
+                lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _histogram(name, labels, bounds, histogram):
+    label_set = f"{{{labels}}}" if labels else ""
+    bucket_labels = f"{labels}," if labels else ""
+    lines, cumulative = [], 0
+    for bound, count in zip([*bounds, "+Inf"], histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{bucket_labels}le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{label_set} {_number(histogram.total)}")
+    lines.append(f"{name}_count{label_set} {cumulative}")
+    return lines
+
+
+def _number(value):
+    return f"{value:.6f}".rstrip("0").rstrip(".") if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _is_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+metrics = MetricsRegistry()
+
+# Gunicorn also discards from its worker_exit hook (see gunicorn.conf.py)
+atexit.register(metrics.discard)
+
+
+class TelemetryMiddleware(HybridMiddleware):
+    """
+    Records every request in `metrics` and, with SERVER_TIMING, reports the
+    request's SQL, serializer and total time in a Server-Timing header.
+    Should be first in MIDDLEWARE so the total covers the whole stack.
+
+    Streaming responses are measured up to the first byte: their size and
+    any queries run while streaming are not included.
+    """
+
+    def __init__(self, get_response):
+        if not OPTIONS["ENABLED"]:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.server_timing = OPTIONS["SERVER_TIMING"]
+        install()
+
+    def sync_call(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    async def async_call(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    def record(self, request, response, timings, duration):
+        match = request.resolver_match
+        route = "/" + match.route if match is not None else "unmatched"
+        method = request.method if request.method in METHODS else "other"
+        size = None if response.streaming else len(response.content)
+        metrics.observe(method, route, response.status_code, duration, timings, size)
+
+        if self.server_timing:
+            response["Server-Timing"] = timings.server_timing(duration)
+        return response
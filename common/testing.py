@@ -0,0 +1,55 @@
+from django.urls import reverse
+
+from .pagination import CustomPagination
+from .querycount import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin declaring the maximum number of queries each named URL
+    may issue per request, either for every method or per method:
+
+        query_budgets = {"blog-list": {"get": 2, "post": 3}, "shared-blogs": 1}
+    """
+
+    query_budgets = {}
+
+    def assertQueryBudget(self, url_name, method="get", args=None, data=None, **extra):
+        budget = self.query_budgets[url_name]
+        if isinstance(budget, dict):
+            budget = budget[method]
+        url = reverse(url_name, args=args)
+        with QueryRecorder() as recorder:
+            response = getattr(self.client, method)(url, data, format="json", **extra)
+            if response.streaming:
+                # Streamed rows are only queried as the body is consumed
+                response.streaming_content = [b"".join(response.streaming_content)]
+
+        if recorder.count > budget:
+            self.fail(
+                f"{method.upper()} {url_name} ran {recorder.count} queries, "
+                f"its budget is {budget}.\n{recorder.report()}"
+            )
+        return response
+
+    def assertQueryCountIndependentOfPageSize(self, url_name, data=None, page_sizes=(1, CustomPagination.max_page_size)):
+        counts = []
+        for page_size in page_sizes:
+            params = {**(data or {}), CustomPagination.page_size_query_param: page_size}
+            with QueryRecorder() as recorder:
+                response = self.client.get(reverse(url_name), params)
+            counts.append((page_size, recorder))
+            self.assertLess(response.status_code, 400, response.content)
+
+        (_, first), *others = counts
+        for page_size, recorder in others:
+            if recorder.count != first.count:
+                self.fail(
+                    f"{url_name} ran {first.count} queries with page size {page_sizes[0]} "
+                    f"and {recorder.count} with page size {page_size}.\n{recorder.report()}"
+                )
+
+    def assertQueryBudgetsCover(self, urlpatterns):
+        names = {pattern.name for pattern in urlpatterns if getattr(pattern, "name", None)}
+        missing = names - set(self.query_budgets)
+        self.assertFalse(missing, f"URLs without a query budget: {sorted(missing)}")
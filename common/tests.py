@@ -0,0 +1,626 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+import pstats
+import random
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connections
+from django.db.models import F
+from django.test import AsyncClient, AsyncRequestFactory, TestCase, override_settings
+from django.urls import get_resolver, resolve, reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from account.models import OutboxEmail, UserProfile
+from blog.models import Blog, BlogSharing
+from blog.search import get_search_backend
+from blog.views import BlogViewset
+from config.warmup import warm_up
+
+from .benchmark import BENCH_DOMAIN, SCENARIOS, SKIPPED_ROUTES, InProcessDriver, compare, remove_dataset, seed_dataset
+from .datagen import DataGenerator, Distribution
+from .db.backends.pooled_postgresql import base as pooled_postgresql
+from .db.pool import ConnectionPool, PoolTimeout, collect as collect_pool_metrics, get_pool
+from .management.commands.index_advisor import sequential_scans
+from .profiling import profile_store
+from .renderers import FastJSONRenderer
+from .replicas import ReplicaRouter, achoose_read_database, apin_to_primary, reading_from, replica_set
+from .schema import FINGERPRINT_FILE, artifacts, source_fingerprint
+from .telemetry import OPTIONS, MetricsRegistry, RequestTimings
+
+User = get_user_model()
+
+
+class BenchmarkTestCase(TestCase):
+    def test_every_scenario_succeeds_in_process(self):
+        dataset = seed_dataset(users=4, blogs_per_user=3, shares_per_user=2)
+        driver = InProcessDriver()
+        with override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']):
+            for scenario in SCENARIOS:
+                if scenario.name == 'login':
+                    # The seeded hash is PBKDF2 whatever the hashers are
+                    continue
+                for i in range(2):
+                    status, queries = driver.send(scenario.build(dataset, i))
+                    self.assertLess(status, 400, scenario.name)
+                    self.assertIsNotNone(queries)
+
+        remove_dataset()
+        self.assertFalse(User.objects.filter(email__endswith=f'@{BENCH_DOMAIN}').exists())
+
+    def test_every_route_is_benchmarked_or_skipped(self):
+        dataset = seed_dataset(users=2, blogs_per_user=1, shares_per_user=1)
+        benchmarked = {resolve(urlsplit(scenario.build(dataset, 0).path).path).url_name for scenario in SCENARIOS}
+        names = {name for name in get_resolver().reverse_dict if isinstance(name, str)}
+        self.assertEqual(names - benchmarked - set(SKIPPED_ROUTES), set())
+
+    def test_compare_flags_regressions(self):
+        baseline = {'blog-list': {'throughput': 100.0, 'p95_ms': 10.0, 'queries': 2.0}}
+        results = {
+            'blog-list': {'throughput': 95.0, 'p95_ms': 12.0, 'queries': 3.0},
+            'blog-detail': {'throughput': 50.0},
+        }
+        regressed = {metric: flag for _, metric, _, _, flag in compare(baseline, results, threshold=0.1)}
+        self.assertEqual(regressed, {'throughput': False, 'p95_ms': True, 'queries': True})
+
+
+class DataGeneratorTestCase(TestCase):
+    def test_generates_related_rows_without_signals(self):
+        generator = DataGenerator(
+            30,
+            posts_per_author='fixed:2',
+            shares_per_blog='fixed:3',
+            content_words='uniform:20:40',
+            inactive_ratio=0,
+            batch_size=7,
+            seed=1,
+        )
+        counts = generator.run()
+        self.assertEqual(
+            {key: counts[key] for key in ('users', 'profiles', 'blogs', 'shares')},
+            {'users': 30, 'profiles': 30, 'blogs': 60, 'shares': 180},
+        )
+
+        users = User.objects.filter(email__startswith=f'{generator.prefix}-')
+        self.assertEqual(users.count(), 30)
+        self.assertEqual(UserProfile.objects.filter(user__in=users, published_posts=2).count(), 30)
+        self.assertEqual(BlogSharing.objects.filter(owner__in=users).exclude(shared_with__in=users).count(), 0)
+        self.assertFalse(BlogSharing.objects.filter(owner=F('shared_with')).exists())
+        self.assertFalse(OutboxEmail.objects.exists())
+
+        # Dates are spread out rather than all set to now
+        blogs = Blog.objects.filter(author__in=users)
+        self.assertGreater(users.values('created_at').distinct().count(), 1)
+        self.assertGreater(blogs.values('created_at').distinct().count(), 1)
+        self.assertFalse(blogs.filter(updated_at__lt=F('created_at')).exists())
+
+        # Generated blogs are searchable
+        blog = blogs.first()
+        backend = get_search_backend()
+        if backend is not None:
+            word = blog.title.split()[-1]
+            self.assertIn(blog, backend.search(Blog.objects.all(), [word]))
+
+    def test_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(Distribution('fixed:3').sample(rng), 3)
+        self.assertTrue(all(2 <= Distribution('uniform:2:4').sample(rng) <= 4 for _ in range(100)))
+        self.assertTrue(all(Distribution('normal:1:5').sample(rng) >= 0 for _ in range(100)))
+        self.assertTrue(all(0 <= Distribution('zipf:1.5:10').sample(rng) <= 10 for _ in range(100)))
+        for spec in ('fixed', 'uniform:1', 'poisson:3', 'normal:a:b'):
+            with self.assertRaises(ValueError):
+                Distribution(spec)
+
+
+class TelemetryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='Passw0rd!')
+        Blog.objects.create(title='Hello', content='World', author=self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        self.registry = MetricsRegistry(collectors=['account.metrics.collect'])
+        patcher = mock.patch('common.telemetry.metrics', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_records_request_and_sets_server_timing(self):
+        response = self.client.get(reverse('blog-list'), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, total;dur=')
+
+        stats = self.registry.routes[('GET', '/blog/')]
+        self.assertEqual(stats.statuses, {'200': 1})
+        self.assertEqual(sum(stats.duration.counts), 1)
+        self.assertGreater(stats.queries, 0)
+        self.assertGreater(stats.serializer_time, 0)
+        self.assertEqual(stats.size.total, len(response.content))
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('blog-list'), **self.auth)
+        self.client.get('/no-such-page/')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), **self.auth).status_code, 403)
+
+        staff = User.objects.create_user(email='staff@example.com', password='Passw0rd!', is_staff=True)
+        staff_auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(staff).access_token}'}
+        response = self.client.get(reverse('metrics'), **staff_auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('liberty_http_requests_total{method="GET",route="/blog/",status="200"} 1', text)
+        self.assertIn('liberty_http_requests_total{method="GET",route="unmatched",status="404"} 1', text)
+        self.assertIn('liberty_http_request_duration_seconds_bucket{method="GET",route="/blog/",le="+Inf"} 1', text)
+        self.assertIn('# TYPE liberty_auth_token_cache_hits_total counter', text)
+        self.assertIn('liberty_password_hashing_rejected_total ', text)
+        self.assertIn('# TYPE liberty_password_hashing_duration_seconds histogram', text)
+        self.assertIn('liberty_password_hashing_duration_seconds_bucket{le="+Inf"} ', text)
+        self.assertIn('liberty_password_hashing_duration_seconds_sum ', text)
+
+    def test_metrics_token(self):
+        with mock.patch.dict(OPTIONS, {'METRICS_TOKEN': 's3cret'}):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+
+    def test_merges_worker_snapshots(self):
+        directory = tempfile.mkdtemp()
+        registry = MetricsRegistry(directory=directory, collectors=[])
+        timings = RequestTimings()
+        timings.queries = 2
+        registry.observe('GET', '/blog/', 200, 0.02, timings, size=100)
+
+        def write_snapshot(pid, registry, samples):
+            with open(os.path.join(directory, f'{pid}.json'), 'w') as f:
+                json.dump({**registry.snapshot(), 'pid': pid, 'samples': samples}, f)
+
+        # Another live worker
+        other = MetricsRegistry(collectors=[])
+        other.observe('GET', '/blog/', 200, 3.0, timings, size=100)
+        other.observe('POST', '/blog/', 201, 0.05, timings, size=100)
+        write_snapshot(os.getppid(), other, [
+            ['liberty_example_total', 'counter', 'Example.', 5],
+            ['liberty_example_entries', 'gauge', 'Example.', 7],
+            ['liberty_example_seconds', 'histogram', 'Example.', {'bounds': [0.1, 1], 'counts': [1, 2, 1], 'sum': 4.5}],
+        ])
+        # A killed worker that left its snapshot behind
+        dead = MetricsRegistry(collectors=[])
+        dead.observe('DELETE', '/blog/', 204, 0.05, timings)
+        write_snapshot(2 ** 30, dead, [['liberty_example_total', 'counter', 'Example.', 100]])
+
+        text = registry.render()
+        self.assertIn('liberty_http_requests_total{method="GET",route="/blog/",status="200"} 2', text)
+        self.assertIn('liberty_http_requests_total{method="POST",route="/blog/",status="201"} 1', text)
+        self.assertIn('liberty_http_request_duration_seconds_bucket{method="GET",route="/blog/",le="0.025"} 1', text)
+        self.assertIn('liberty_http_request_duration_seconds_count{method="GET",route="/blog/"} 2', text)
+        self.assertIn('liberty_http_db_queries_total{method="GET",route="/blog/"} 4', text)
+        self.assertIn('liberty_example_total 5', text)
+        self.assertIn('liberty_example_entries 7', text)
+        self.assertIn('liberty_example_seconds_bucket{le="1"} 3', text)
+        self.assertIn('liberty_example_seconds_bucket{le="+Inf"} 4', text)
+        self.assertIn('liberty_example_seconds_sum 4.5', text)
+        self.assertIn('liberty_example_seconds_count 4', text)
+        self.assertNotIn('DELETE', text)
+        self.assertEqual(sorted(os.listdir(directory)), sorted([f'{os.getpid()}.json', f'{os.getppid()}.json']))
+
+        registry.discard()
+        self.assertEqual(os.listdir(directory), [f'{os.getppid()}.json'])
+
+
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='writer@example.com', password='Passw0rd!')
+        self.staff = User.objects.create_user(email='staff@example.com', password='Passw0rd!', is_staff=True)
+        Blog.objects.create(title='Hello', content='World', author=self.user)
+        for name, value in (('directory', tempfile.mkdtemp()), ('max_profiles', 2)):
+            patcher = mock.patch.object(profile_store, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def auth(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+
+    def test_only_staff_requests_are_profiled(self):
+        response = self.client.get(reverse('blog-list'), HTTP_X_PROFILE='1', **self.auth(self.user))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertNotIn('X-Profile-Id', self.client.get(reverse('blog-list'), **self.auth(self.staff)))
+        self.assertEqual(profile_store.ids(), [])
+
+    def test_profile_list_detail_and_download(self):
+        response = self.client.get(reverse('blog-list'), {'_profile': '1'}, **self.auth(self.staff))
+        self.assertEqual(response.status_code, 200)
+        profile_id = response['X-Profile-Id']
+
+        listed = self.client.get(reverse('profile-list'), **self.auth(self.staff)).json()
+        self.assertEqual([profile['id'] for profile in listed], [profile_id])
+        self.assertEqual(listed[0]['path'], '/blog/?_profile=1')
+        self.assertEqual(listed[0]['user'], 'staff@example.com')
+        self.assertNotIn('queries', listed[0])
+
+        profile = self.client.get(reverse('profile-detail', args=[profile_id]), **self.auth(self.staff)).json()
+        self.assertEqual(len(profile['queries']), profile['query_count'])
+        self.assertTrue(any('blog_blog' in query['sql'] for query in profile['queries']))
+        self.assertTrue(profile['functions'])
+
+        response = self.client.get(reverse('profile-download', args=[profile_id]), **self.auth(self.staff))
+        path = os.path.join(tempfile.mkdtemp(), 'download.prof')
+        with open(path, 'wb') as f:
+            f.write(b''.join(response.streaming_content))
+        self.assertTrue(pstats.Stats(path).total_calls)
+
+        self.assertEqual(self.client.get(reverse('profile-list'), **self.auth(self.user)).status_code, 403)
+        response = self.client.get(reverse('profile-detail', args=['..']), **self.auth(self.staff))
+        self.assertEqual(response.status_code, 404)
+
+    def test_keeps_newest_profiles(self):
+        ids = [
+            self.client.get(reverse('blog-list'), HTTP_X_PROFILE='1', **self.auth(self.staff))['X-Profile-Id']
+            for _ in range(3)
+        ]
+        self.assertEqual(len(profile_store.ids()), 2)
+        self.assertIn(max(ids), profile_store.ids())
+
+    # Async all the way to the handler, which runs the sync view on a thread
+    @override_settings(MIDDLEWARE=['common.profiling.ProfilingMiddleware'])
+    async def test_profiles_async_requests(self):
+        client = AsyncClient()
+        headers = {'X-Profile': '1', 'Authorization': self.auth(self.user)['HTTP_AUTHORIZATION']}
+        response = await client.get(reverse('blog-list'), headers=headers)
+        self.assertNotIn('X-Profile-Id', response)
+
+        headers['Authorization'] = self.auth(self.staff)['HTTP_AUTHORIZATION']
+        response = await client.get(reverse('blog-list'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        profile = profile_store.get(response['X-Profile-Id'])
+        self.assertTrue(any('blog_blog' in query['sql'] for query in profile['queries']))
+
+
+class FastJSONRendererTestCase(TestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            'id': uuid.UUID(int=1),
+            'at': datetime(2023, 8, 1, 12, 30, 5, 123456, tzinfo=dt_timezone.utc),
+            'price': Decimal('1.50'),
+            'text': 'caf\u00e9 \u2028 \u2029 "quoted"',
+            'lazy': gettext_lazy('Not found.'),
+            'nested': [{'a': 1, 'b': None, 'c': True}, [1.5, -2]],
+            3: 'non-string key',
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+
+
+class ReplicaRoutingTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='reader@example.com', password='testpassword')
+        self.blog = Blog.objects.create(title='Blog', content='Content', author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        # The primary's own alias stands in for a replica
+        patcher = mock.patch.multiple(replica_set, aliases=['default'], status={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(cache.clear)
+
+    def test_router(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Blog))
+        with reading_from('replica1'):
+            self.assertEqual(router.db_for_read(Blog), 'replica1')
+        self.assertIsNone(router.db_for_read(Blog))
+        self.assertEqual(router.db_for_write(Blog), 'default')
+        self.assertFalse(router.allow_migrate('default', 'blog'))
+        self.assertIsNone(router.allow_migrate('other', 'blog'))
+
+    def test_reads_pinned_to_primary_after_write(self):
+        with mock.patch.object(replica_set, 'choose', wraps=replica_set.choose) as choose:
+            self.assertEqual(self.client.get(reverse('blog-list')).status_code, 200)
+            self.assertEqual(choose.call_count, 1)
+
+            url = reverse('blog-detail', kwargs={'pk': self.blog.pk})
+            response = self.client.patch(url, {'title': 'Changed'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(choose.call_count, 1)
+            self.assertEqual(self.client.get(url).data['title'], 'Changed')
+            self.assertEqual(choose.call_count, 1)
+
+            cache.clear()
+            self.client.get(reverse('shared-blogs'))
+            self.assertEqual(choose.call_count, 2)
+
+    async def test_async_read_database(self):
+        request = AsyncRequestFactory().get('/')
+        request.user = self.user
+        with mock.patch.object(replica_set, 'check', return_value=True) as check:
+            self.assertEqual(await achoose_read_database(request), 'default')
+            self.assertEqual(await achoose_read_database(request), 'default')
+        self.assertEqual(check.call_count, 1)
+
+        await apin_to_primary(self.user)
+        self.assertIsNone(await achoose_read_database(request))
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.assertEqual(replica_set.choose(), 'default')
+        replica_set.mark_down('default')
+        self.assertIsNone(replica_set.choose())
+
+        replica_set.status.clear()
+        with mock.patch.object(replica_set, 'check', return_value=False) as check:
+            self.assertIsNone(replica_set.choose())
+            self.assertIsNone(replica_set.choose())
+        self.assertEqual(check.call_count, 1)
+
+    def test_failed_replica_read_retried_on_primary(self):
+        list_view = BlogViewset.list
+        aliases = []
+
+        def failing_list(view, request, *args, **kwargs):
+            aliases.append(view.read_alias)
+            if view.read_alias is not None:
+                raise OperationalError('replica went away')
+            return list_view(view, request, *args, **kwargs)
+
+        with mock.patch.object(BlogViewset, 'list', failing_list), self.assertLogs('common.replicas', 'WARNING'):
+            response = self.client.get(reverse('blog-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(aliases, ['default', None])
+        self.assertFalse(replica_set.status['default'][0])
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePsycopgConnection(FakeConnection):
+    """
+    Tracks the transaction psycopg would open without autocommit.
+    """
+
+    def __init__(self, autocommit=True):
+        super().__init__()
+        self.autocommit = autocommit
+        self.info = mock.Mock(transaction_status=pooled_postgresql.TRANSACTION_IDLE)
+
+    def cursor(self):
+        if not self.autocommit:
+            self.info.transaction_status = pooled_postgresql.TRANSACTION_IDLE + 2
+        return mock.MagicMock()
+
+    def rollback(self):
+        self.info.transaction_status = pooled_postgresql.TRANSACTION_IDLE
+
+
+class ConnectionPoolTestCase(TestCase):
+    def test_reuses_connections(self):
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        second = pool.acquire(FakeConnection)
+        self.assertIsNot(second, first)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['connects'], snapshot['checkouts'], snapshot['in_use']), (2, 3, 2))
+
+    def test_waits_for_a_free_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        connection = pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+
+        pool.timeout = 5
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        timer.join()
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['waits'], snapshot['timeouts']), (2, 1))
+        self.assertGreater(snapshot['wait_time'], 0.04)
+
+    def test_discards_old_broken_and_failed_connections(self):
+        pool = ConnectionPool(max_size=1, max_lifetime=60, check=lambda connection: not connection.closed)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection, discard=True)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.size, 0)
+
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        connection.closed = True
+        replacement = pool.acquire(FakeConnection)
+        self.assertIsNot(replacement, connection)
+        self.assertEqual(pool.snapshot()['health_check_failures'], 1)
+
+        with mock.patch('common.db.pool.time.monotonic', return_value=time.monotonic() + 61):
+            pool.release(replacement)
+        self.assertTrue(replacement.closed)
+        self.assertEqual(pool.size, 0)
+
+        with self.assertRaises(OperationalError):
+            pool.acquire(mock.Mock(side_effect=OperationalError('refused')))
+        self.assertEqual(pool.size, 0)
+
+    def test_pooled_backend_hands_out_autocommit_connections(self):
+        connection = FakePsycopgConnection(autocommit=False)
+        self.assertTrue(pooled_postgresql._is_usable(connection))
+        self.assertEqual(connection.info.transaction_status, pooled_postgresql.TRANSACTION_IDLE)
+
+        pool = ConnectionPool(max_size=1)
+        wrapper = pooled_postgresql.DatabaseWrapper({**connections['default'].settings_dict, 'CONN_MAX_AGE': 0})
+        wrapper.connection = pool.acquire(lambda: connection)
+        connection.cursor()
+        with mock.patch.object(pooled_postgresql.DatabaseWrapper, 'pool', pool):
+            wrapper._close()
+        self.assertTrue(connection.autocommit)
+        self.assertEqual(connection.info.transaction_status, pooled_postgresql.TRANSACTION_IDLE)
+        self.assertIs(pool.acquire(FakeConnection), connection)
+
+    def test_collect(self):
+        with mock.patch.dict('common.db.pool._pools', clear=True):
+            self.assertEqual(collect_pool_metrics(), [])
+            pool = get_pool('default', {'max_size': 3})
+            self.assertIs(get_pool('default', {'max_size': 3}), pool)
+            pool.acquire(FakeConnection)
+            samples = {name: value for name, _, _, value in collect_pool_metrics()}
+        self.assertEqual(samples['liberty_db_pool_connections_in_use'], 1)
+        self.assertEqual(samples['liberty_db_pool_max_connections'], 3)
+        self.assertEqual(samples['liberty_db_pool_connects_total'], 1)
+
+
+class OpenAPISchemaTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.multiple(artifacts, directory=self.directory, _loaded=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def generate_schema(self, *args):
+        out = StringIO()
+        call_command("generate_schema", *args, dir=self.directory, stdout=out)
+        return out.getvalue()
+
+    def test_generated_only_when_code_changes(self):
+        self.assertIn("Wrote the OpenAPI schema", self.generate_schema())
+        with open(os.path.join(self.directory, "openapi.json")) as f:
+            paths = json.load(f)["paths"]
+        # Parameters declared with common.swagger.swagger_auto_schema
+        self.assertIn("summary", [parameter["name"] for parameter in paths["/blog/"]["get"]["parameters"]])
+        self.assertIn("updated_since", [parameter["name"] for parameter in paths["/blog/export/"]["get"]["parameters"]])
+        self.assertIn("up to date", self.generate_schema())
+        self.assertIn("up to date", self.generate_schema("--check"))
+
+        with open(os.path.join(self.directory, FINGERPRINT_FILE), "w") as f:
+            f.write("stale")
+        with self.assertRaises(CommandError):
+            self.generate_schema("--check")
+        self.assertIn("Wrote the OpenAPI schema", self.generate_schema())
+
+    def test_serves_artifacts_with_validators(self):
+        self.generate_schema()
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("schema-swagger-ui"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("max-age=300", response["Cache-Control"])
+        response = self.client.get(reverse("schema-swagger-ui"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+        schema_hash = artifacts.get()["schema_hash"]
+        versioned_url = f"{reverse('openapi-schema')}?v={schema_hash}"
+        self.assertIn(versioned_url, artifacts.get()["page"].decode())
+        response = self.client.get(versioned_url)
+        self.assertEqual(response["ETag"], f'"{schema_hash}"')
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+
+        # The URL drf_yasg's view served the schema at
+        response = self.client.get(reverse("schema-swagger-ui"), {"format": "openapi"})
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertNotIn("immutable", response["Cache-Control"])
+        self.assertIn("/blog/", response.json()["paths"])
+
+    @override_settings(DEBUG=True)
+    def test_code_checked_once_per_process(self):
+        self.generate_schema()
+        with mock.patch('common.schema.source_fingerprint', wraps=source_fingerprint) as fingerprint:
+            for _ in range(3):
+                self.assertEqual(self.client.get(reverse("schema-swagger-ui")).status_code, 200)
+        self.assertEqual(fingerprint.call_count, 1)
+
+    def test_healthz(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("healthz"))
+        self.assertEqual(response.content, b"ok")
+        self.assertIn("no-store", response["Cache-Control"])
+
+
+class WarmUpTestCase(TestCase):
+    def test_warm_up(self):
+        with mock.patch.object(BlogViewset.summary_row_mapper, "_compiled", None), \
+                mock.patch.dict(Blog._meta._get_fields_cache, clear=True), \
+                mock.patch("config.warmup.artifacts") as artifacts_mock, \
+                mock.patch("config.warmup.connections") as connections_mock, \
+                self.assertNumQueries(0):
+            warm_up()
+            self.assertIsNotNone(BlogViewset.summary_row_mapper._compiled)
+            self.assertTrue(Blog._meta._get_fields_cache)
+        artifacts_mock.get.assert_called_once_with()
+        connections_mock.close_all.assert_called_once_with()
+
+    def test_import_report(self):
+        out = StringIO()
+        call_command("import_report", "--no-warm-up", "--repeat", "1", "--json", stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(list(report["phases_ms"]), ["setup", "middleware", "urls"])
+        self.assertIn("django", report["packages_ms"])
+        # Only imported to generate the schema
+        self.assertNotIn("drf_yasg", report["packages_ms"])
+
+
+class IndexAdvisorTestCase(TestCase):
+    def test_sequential_scans(self):
+        plan = [
+            (2, 0, 0, "SCAN blog_blog"),
+            (3, 0, 0, "SCAN blog_blogsharing USING INDEX blog_sharing_shared_with_idx"),
+            (4, 0, 0, "SEARCH account_user USING INTEGER PRIMARY KEY (rowid=?)"),
+            (5, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+        ]
+        self.assertEqual(sequential_scans("sqlite", plan), ["blog_blog"])
+        plan = [
+            ("Hash Join  (cost=1.04..2.10 rows=1 width=8)",),
+            ("  ->  Seq Scan on blog_blog  (cost=0.00..1.03 rows=3 width=8)",),
+            ("  ->  Index Scan using blog_sharing_owner_idx on blog_blogsharing  (cost=0.15..8.17 rows=1 width=8)",),
+        ]
+        self.assertEqual(sequential_scans("postgresql", plan), ["blog_blog"])
+        with self.assertRaises(CommandError):
+            sequential_scans("mysql", plan)
+
+    def test_index_advisor(self):
+        user = User.objects.create_user(email="advisor@example.com", password="Passw0rd!")
+        Blog.objects.create(title="Title", content="Content", author=user)
+        out = StringIO()
+        call_command("index_advisor", "--email", user.email, "--min-rows", "0", stdout=out)
+        output = out.getvalue()
+        self.assertIn("blog-feed GET /blog/feed/?cursor= (200, 1 queries)", output)
+        self.assertIn("SEQUENTIAL SCAN", output)
+        # Requests are rolled back
+        self.assertEqual(Blog.objects.count(), 1)
+
+        with self.assertRaises(CommandError):
+            call_command("index_advisor", "--email", user.email, "--min-rows", "0", "--fail-on-scan", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("index_advisor", "--email", "nobody@example.com", stdout=StringIO())
+
+
+class HybridMiddlewareTestCase(TestCase):
+    # The project's whole MIDDLEWARE
+    @override_settings(DEBUG=True)
+    async def test_runs_without_adapting_the_handler(self):
+        # Django logs every sync/async adaptation when DEBUG is on
+        with self.assertNoLogs('django.request', level='DEBUG'):
+            client = AsyncClient()
+            response = await client.get(reverse('healthz'))
+            self.assertEqual(response.content, b'ok')
+            self.assertIn('total;dur=', response['Server-Timing'])
+            response = await client.get('/static/drf-yasg/swagger-ui-dist/swagger-ui.css')
+            self.assertEqual(response.status_code, 200)
+            response.close()
@@ -0,0 +1,118 @@
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET, require_safe
+from rest_framework import permissions
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import telemetry
+from .permissions import IsAdminOrReadOnly, get_staff_user
+from .profiling import profile_store
+from .schema import OPTIONS as SCHEMA_OPTIONS, artifacts
+
+
+@require_safe
+def healthz(request):
+    """
+    Liveness probe: answers without touching the database or drf_yasg.
+    """
+    response = HttpResponse("ok", content_type="text/plain")
+    patch_cache_control(response, no_store=True)
+    return response
+
+
+def _artifact_response(request, content, content_hash, content_type, max_age, **cache_control):
+    etag = f'"{content_hash}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=max_age, **cache_control)
+    return response
+
+
+@require_safe
+def schema_view(request):
+    """
+    The pre-generated OpenAPI schema (see common.schema). Cacheable for
+    good at the versioned URL the Swagger UI page links to.
+    """
+    loaded = artifacts.get()
+    if request.GET.get("v") == loaded["schema_hash"]:
+        return _artifact_response(
+            request, loaded["schema"], loaded["schema_hash"], "application/json", 365 * 24 * 3600, immutable=True
+        )
+    return _artifact_response(
+        request, loaded["schema"], loaded["schema_hash"], "application/json", SCHEMA_OPTIONS["MAX_AGE"]
+    )
+
+
+@require_safe
+def swagger_ui_view(request):
+    """
+    The pre-generated Swagger UI page. ?format=openapi returns the schema,
+    as drf_yasg's view did.
+    """
+    if request.GET.get("format") == "openapi":
+        return schema_view(request)
+    loaded = artifacts.get()
+    return _artifact_response(
+        request, loaded["page"], loaded["page_hash"], "text/html; charset=utf-8", SCHEMA_OPTIONS["MAX_AGE"]
+    )
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Requires "Authorization: Bearer <token>"
+    when TELEMETRY["METRICS_TOKEN"] is set, a staff user otherwise.
+    """
+    token = telemetry.OPTIONS["METRICS_TOKEN"]
+    if token:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            return HttpResponse(status=401)
+    elif get_staff_user(request) is None:
+        return HttpResponse(status=403)
+    return HttpResponse(telemetry.metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileListView(APIView):
+    """
+    Saved request profiles, newest first. Staff only.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+    def get(self, request):
+        return Response(profile_store.list())
+
+
+class ProfileDetailView(APIView):
+    """
+    A saved profile with its SQL timeline and slowest functions. Staff only.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+    def get(self, request, profile_id):
+        profile = profile_store.get(profile_id)
+        if profile is None:
+            raise NotFound
+        return Response(profile)
+
+
+class ProfileDownloadView(APIView):
+    """
+    The raw cProfile stats of a saved profile, readable with pstats. Staff
+    only.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+
+    def get(self, request, profile_id):
+        path = profile_store.stats_path(profile_id)
+        if path is None:
+            raise NotFound
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=f"{profile_id}.prof")
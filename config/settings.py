@@ -11,6 +11,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import tempfile
+from importlib.util import find_spec
 from datetime import timedelta
 from pathlib import Path
 from dotenv import load_dotenv
@@ -45,9 +47,9 @@ INSTALLED_APPS = [
     # local apps
     'account.apps.AccountConfig',
     'blog.apps.BlogConfig',
+    'common.apps.CommonConfig',
 
     # Third party apps
-    'drf_yasg',
     'rest_framework',
     'rest_framework_simplejwt',
     'django_rest_passwordreset',
@@ -55,22 +57,62 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'common.telemetry.TelemetryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'common.middleware.StaticFilesMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'common.profiling.ProfilingMiddleware',
+    'common.replicas.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'common.middleware.QueryInspectMiddleware',
 ]
 
+# N+1 detection, only active when DEBUG is on
+QUERY_INSPECT = {
+    'DUPLICATE_THRESHOLD': 5,
+    'RAISE': False,
+}
+
+# Per-route latency, SQL, serializer time and response size, exposed at
+# /metrics. Set METRICS_DIR to a directory shared by the gunicorn workers
+# (e.g. on tmpfs) so each scrape covers all of them.
+TELEMETRY = {
+    'ENABLED': True,
+    'SERVER_TIMING': True,
+    'METRICS_DIR': os.getenv('METRICS_DIR'),
+    'FLUSH_INTERVAL': 10,
+    'METRICS_TOKEN': os.getenv('METRICS_TOKEN'),
+    'COLLECTORS': ['account.metrics.collect', 'common.db.pool.collect'],
+}
+
+# Staff requests sent with an X-Profile header (or ?_profile=1) run under
+# cProfile; the newest MAX_PROFILES are kept in DIR and listed at /profiles/.
+PROFILING = {
+    'ENABLED': True,
+    'DIR': os.getenv('PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'liberty-profiles')),
+    'MAX_PROFILES': 50,
+}
+
 ROOT_URLCONF = 'config.urls'
 
+# Blog read routes served by their async views (comma-separated url names,
+# e.g. "blog-list,blog-detail"). Only worth it when running under ASGI.
+ASYNC_VIEWS = [name for name in os.getenv('ASYNC_VIEWS', '').split(',') if name]
+
+# drf_yasg is not an installed app: importing the package imports
+# pkg_resources, the slowest import of a worker, and it is only needed to
+# generate the schema (see common.schema). Its templates and static files
+# are located without importing it.
+DRF_YASG_DIR = find_spec('drf_yasg').submodule_search_locations[0]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [os.path.join(DRF_YASG_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -86,14 +128,64 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (       
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'account.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'common.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 
+# List endpoints with a row mapper render straight from values() rows
+# (see common.fastpath). Turn off to go through the serializers instead.
+FAST_READ_PATH = True
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Point this at a shared backend (Redis, Memcached) in production so
+# cached users and their invalidation are shared by all workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Users resolved from JWTs are cached per process (LOCAL_TTL seconds) and
+# in the shared cache (SHARED_TTL seconds), without their password hash.
+# They are invalidated on User save/delete and by User.objects update() and
+# bulk_update(); rows changed by raw SQL stay stale up to SHARED_TTL.
+AUTH_USER_CACHE = {
+    'LOCAL_MAX_SIZE': 1024,
+    'LOCAL_TTL': 5,
+    'SHARED_TTL': 300,
+    'CACHE_ALIAS': 'default',
+}
+
+# Per-process cache of already verified JWTs (keyed by a SHA-256 digest of
+# the token, expiring at the token's exp claim).
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': 4096,
+}
+
 
 AUTH_USER_MODEL = 'account.User'
 
+AUTHENTICATION_BACKENDS = [
+    'account.backends.PooledModelBackend',
+]
+
+# Password hashing runs on a bounded pool: WORKERS hashes at once (MODE
+# 'thread' or 'process') and MAX_QUEUE waiting, further requests get a 429.
+PASSWORD_HASHING = {
+    'MODE': 'thread',
+    'WORKERS': int(os.getenv('PASSWORD_HASHING_WORKERS', os.cpu_count() or 1)),
+    'MAX_QUEUE': int(os.getenv('PASSWORD_HASHING_MAX_QUEUE', 16)),
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@liberty'
 SITE_DOMAIN = 'liberty'
@@ -119,6 +211,48 @@ DATABASES = {
     }
 }
 
+# Connection reuse. DB_POOL_SIZE > 0 keeps up to that many connections per
+# worker process in a pool, handed out per request and health-checked on
+# checkout. Otherwise DB_CONN_MAX_AGE keeps each thread's connection open for
+# that many seconds (0 closes it after every request). Behind a
+# transaction-pooling PgBouncer set DB_TRANSACTION_POOLING=1.
+if int(os.getenv('DB_POOL_SIZE', 0)):
+    DATABASES['default']['ENGINE'] = 'common.db.backends.pooled_postgresql'
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': int(os.getenv('DB_POOL_SIZE')),
+        'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 5)),
+        'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+        'HEALTH_CHECKS': os.getenv('DB_HEALTH_CHECKS', '1') == '1',
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv('DB_CONN_MAX_AGE', 0))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = os.getenv('DB_HEALTH_CHECKS', '1') == '1'
+# Server-side cursors (used by the streaming exports) do not survive
+# transaction pooling; exports then fetch each query's rows at once.
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = os.getenv('DB_TRANSACTION_POOLING', '') == '1'
+
+# Read replicas as comma-separated host[:port], using the primary's name and
+# credentials, e.g. DB_REPLICAS=replica1,replica2:5433. The primary's own
+# host is enough to try the routing locally.
+for number, replica in enumerate(filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    host, _, port = replica.partition(':')
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'OPTIONS': {'connect_timeout': 2},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['common.replicas.ReplicaRouter']
+
+REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'STICKY_SECONDS': int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10)),
+    'HEALTH_CHECK_INTERVAL': float(os.getenv('DB_REPLICA_HEALTH_CHECK_INTERVAL', 5)),
+    'MAX_LAG_SECONDS': float(os.getenv('DB_REPLICA_MAX_LAG_SECONDS', 5)),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -162,19 +296,39 @@ SWAGGER_SETTINGS = {
     "USE_SESSION_AUTH": False,
 }
 
+# The schema and Swagger UI page served at / are generated at build time by
+# `manage.py generate_schema` (see common.schema)
+OPENAPI_SCHEMA = {
+    'DIR': os.getenv('OPENAPI_SCHEMA_DIR', str(BASE_DIR / 'openapi')),
+    # 'MAX_AGE': 300,
+}
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'UPDATE_LAST_LOGIN': True,
+    # last_login is written by account.last_login instead (see LAST_LOGIN)
+    'UPDATE_LAST_LOGIN': False,
     'SIGNING_KEY': os.getenv('SIGNING_KEY')
 }
 
 
+# Logins less than MIN_INTERVAL seconds after the stored last_login are not
+# recorded. With WRITE_BEHIND the rest are buffered per worker and written in
+# bulk every FLUSH_INTERVAL seconds (or once MAX_PENDING users are waiting).
+LAST_LOGIN = {
+    'WRITE_BEHIND': True,
+    'FLUSH_INTERVAL': 30,
+    'MIN_INTERVAL': 300,
+    'MAX_PENDING': 1000,
+}
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_DIRS = [os.path.join(DRF_YASG_DIR, 'static')]
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
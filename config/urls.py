@@ -19,26 +19,28 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Liberty Blog API",
-        default_version="v1",
-        description="API documentation of Liberty Blog",
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=[permissions.AllowAny],
+from common.views import (
+    ProfileDetailView,
+    ProfileDownloadView,
+    ProfileListView,
+    healthz,
+    metrics_view,
+    schema_view,
+    swagger_ui_view,
 )
 
+# The schema is generated ahead of time by `manage.py generate_schema`
+# (see common.schema) instead of on every request.
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('account.urls')),
     path('blog/', include('blog.urls')),
+    path('healthz', healthz, name='healthz'),
+    path('metrics', metrics_view, name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('profiles/<str:profile_id>/download/', ProfileDownloadView.as_view(), name='profile-download'),
 
-    path('', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('openapi.json', schema_view, name='openapi-schema'),
+    path('', swagger_ui_view, name='schema-swagger-ui'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,92 @@
+"""
+One-off work of a worker's first requests, done ahead of time.
+
+gunicorn.conf.py loads the app in the master (preload_app) and calls
+`warm_up()` there, so the forked workers start with it done: URL patterns
+compiled and reverse lookups populated, the models' field lookup caches
+filled, row mappers compiled, the email templates compiled and the OpenAPI
+artifacts loaded. Serializer fields are not: they are built again for every
+serializer instance.
+Database connections opened by then are closed, as the workers must not
+share them.
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import URLResolver, get_resolver
+
+from common.db.pool import close_pools
+from common.fastpath import RowMapper
+from common.schema import artifacts
+from common.swagger import view_classes
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = {
+    "TEMPLATES": ["account/email_confirmation.html", "account/reset_password.html"],
+    **getattr(settings, "WARMUP", {}),
+}
+
+
+def _compile(patterns):
+    for pattern in patterns:
+        # Compiled lazily, per language, on first resolve
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            # Populated lazily on first reverse()
+            pattern.reverse_dict
+            _compile(pattern.url_patterns)
+
+
+def warm_up_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict
+    _compile(resolver.url_patterns)
+    return set(view_classes(resolver.url_patterns))
+
+
+def warm_up_models():
+    # Filled on the first field lookups, by ModelSerializer among others,
+    # and kept on the model's Options
+    for model in apps.get_models():
+        model._meta.get_fields()
+        model._meta.fields_map
+        model._meta._forward_fields_map
+
+
+def warm_up_row_mappers(views):
+    row_mappers = {
+        id(value): value
+        for view_class in views
+        for klass in view_class.__mro__
+        for value in vars(klass).values()
+        if isinstance(value, RowMapper)
+    }
+    for row_mapper in row_mappers.values():
+        row_mapper.compile()
+
+
+def warm_up_templates():
+    for name in OPTIONS["TEMPLATES"]:
+        get_template(name)
+
+
+def warm_up_schema():
+    artifacts.get()
+
+
+def warm_up():
+    start = time.perf_counter()
+    views = warm_up_urls()
+    warm_up_models()
+    warm_up_row_mappers(views)
+    warm_up_templates()
+    warm_up_schema()
+
+    connections.close_all()
+    close_pools()
+    logger.info("Warmed up in %.1f ms", (time.perf_counter() - start) * 1000)
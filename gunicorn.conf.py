@@ -0,0 +1,46 @@
+# Gunicorn settings, picked up automatically when gunicorn is started from
+# the project root (e.g. `gunicorn config.wsgi`).
+import os
+
+# Load the app once in the master and warm it up before forking, so new
+# workers serve their first requests at full speed (see config.warmup).
+# Code changes then need a restart rather than a HUP.
+preload_app = True
+
+
+def on_starting(server):
+    # Metrics snapshots of a previous run's workers would be merged into
+    # this run's /metrics (see common.telemetry)
+    directory = os.getenv("METRICS_DIR")
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from config.warmup import warm_up
+
+        warm_up()
+
+
+def post_worker_init(worker):
+    # Without preload_app (e.g. --reload) every worker warms up on its own
+    if not worker.cfg.preload_app:
+        from config.warmup import warm_up
+
+        warm_up()
+
+
+def worker_exit(server, worker):
+    # Write buffered last_login timestamps before the worker goes away
+    from account.last_login import last_login_recorder
+
+    last_login_recorder.flush()
+
+    # Its counts must not stay in /metrics, nor be taken over by a later
+    # worker given the same PID
+    from common.telemetry import metrics
+
+    metrics.discard()